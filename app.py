@@ -1,9 +1,31 @@
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import fitz  # PyMuPDF for PDF text extraction
+import gzip
+import hashlib
+import heapq
+import hmac
+import json
+import math
+import multiprocessing
 import re
 import os
-import phonenumbers # type: ignore
+import queue
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import Counter, OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from datetime import date
+from functools import cached_property, lru_cache
+from tempfile import NamedTemporaryFile
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+from gazetteer import Gazetteer, normalize_place
+from memprofile import MemoryProfile
+from sampler import format_collapsed, sample_stacks
 
 # Initialize Flask App
 app = Flask(__name__)
@@ -17,38 +39,932 @@ app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 # Allowed file types
 ALLOWED_EXTENSIONS = {"pdf"}
 
+# Static lookup tables (cities, skills, section headers) are stored in a
+# serialized artifact and loaded once, instead of being rebuilt on every call.
+TABLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tables.json")
+with open(TABLES_PATH, encoding="utf-8") as tables_file:
+    TABLES = json.load(tables_file)
+
+# Each uploaded file is buffered in memory up to this many bytes and spills to a
+# temporary file in UPLOAD_FOLDER beyond that, which the decoder opens by path
+app.config["UPLOAD_SPOOL_MAX_MEMORY"] = int(os.environ.get("UPLOAD_SPOOL_MAX_MEMORY", 1024 * 1024))
+UPLOAD_READ_CHUNK_SIZE = 64 * 1024
+
+# Extraction modes: "text" finds sections with header regexes over the plain text,
+# "layout" finds them from font size, bold flags and spacing in the PDF itself.
+# Can be overridden per request with ?mode=
+EXTRACTION_MODES = {"text", "layout"}
+app.config["EXTRACTION_MODE"] = os.environ.get("EXTRACTION_MODE", "text")
+
+# Optional global gazetteer (see gazetteer.py). When set, location matching uses it
+# instead of the built-in table of Indian cities.
+app.config["GAZETTEER_PATH"] = os.environ.get("GAZETTEER_PATH")
+_gazetteer = None
+
+# Documents slower than this many milliseconds to parse are written to
+# SLOW_DOC_CAPTURE_DIR for offline reproduction (see benchmarks/replay_captures.py).
+# 0 disables capturing. Emails, phone numbers and the filename are redacted
+# from the captured text unless SLOW_DOC_REDACT is set to 0.
+app.config["SLOW_DOC_THRESHOLD_MS"] = float(os.environ.get("SLOW_DOC_THRESHOLD_MS", 0))
+app.config["SLOW_DOC_CAPTURE_DIR"] = os.environ.get("SLOW_DOC_CAPTURE_DIR", "captures")
+app.config["SLOW_DOC_REDACT"] = os.environ.get("SLOW_DOC_REDACT", "1") != "0"
+
+# Token for the /debug/profile sampling profiler, sent in the X-Debug-Token header.
+# The route answers 404 unless a token is configured.
+app.config["PROFILE_TOKEN"] = os.environ.get("PROFILE_TOKEN")
+PROFILE_MAX_SECONDS = 60
+_profile_lock = threading.Lock()
+
+# MEMORY_PROFILE=1 traces allocations with tracemalloc (see memprofile.py) and
+# reports the bytes each extractor and each uploaded file leave allocated on
+# /metrics, with the top MEMORY_PROFILE_TOP allocation sites per file. Slow;
+# for diagnosing memory growth only.
+app.config["MEMORY_PROFILE"] = os.environ.get("MEMORY_PROFILE", "0") == "1"
+app.config["MEMORY_PROFILE_TOP"] = int(os.environ.get("MEMORY_PROFILE_TOP", 10))
+memory_profile = MemoryProfile(top=app.config["MEMORY_PROFILE_TOP"])
+if app.config["MEMORY_PROFILE"]:
+    memory_profile.start()
+
+# Number of pages whose extracted text and layout are kept in memory, keyed by a
+# hash of the page content, so a re-uploaded resume only re-extracts the pages
+# that changed. 0 disables the page cache.
+app.config["PAGE_CACHE_SIZE"] = int(os.environ.get("PAGE_CACHE_SIZE", 1024))
+
+# Tenants are identified by the X-API-Key header. TENANTS_PATH points to a JSON
+# file mapping each key to its settings, e.g.
+#   {"k3y": {"name": "acme-ats", "rate": 2, "burst": 20, "lane": "bulk"}}
+# where rate/burst configure the tenant's token bucket (files per second and
+# bucket size, rate 0 means unlimited) and lane is "interactive" or "bulk".
+# A request takes one token when it arrives and one more for every file or
+# record after its first; a file that finds the bucket empty is reported as
+# rate limited, with a retry_after, and the rest of the batch carries on.
+# Without TENANTS_PATH no key is required and every request belongs to a single
+# anonymous tenant with the default settings below.
+app.config["TENANTS_PATH"] = os.environ.get("TENANTS_PATH")
+app.config["TENANT_DEFAULT_RATE"] = float(os.environ.get("TENANT_DEFAULT_RATE", 0))
+app.config["TENANT_DEFAULT_BURST"] = int(os.environ.get("TENANT_DEFAULT_BURST", 10))
+
+# Files are parsed in at most PARSE_SLOTS at a time per worker process. Waiting
+# files are granted slots from the interactive and bulk lanes in proportion to
+# the lane weights, and round-robin across tenants within a lane. This only has
+# an effect with threaded workers (see gunicorn.conf.py).
+LANES = ("interactive", "bulk")
+app.config["PARSE_SLOTS"] = int(os.environ.get("PARSE_SLOTS", 2))
+app.config["LANE_WEIGHTS"] = {
+    "interactive": int(os.environ.get("INTERACTIVE_LANE_WEIGHT", 4)),
+    "bulk": int(os.environ.get("BULK_LANE_WEIGHT", 1))
+}
+
+# Admission control: a request is shed with 503 and a Retry-After when admitting
+# it would take the work in flight in this worker process past either limit.
+# Pages are estimated from the request size until the files have been opened.
+# 0 disables a limit. Current load and shed counts are reported by GET /metrics.
+# Admission only sees requests a worker has accepted, so it needs threaded
+# workers (gunicorn.conf.py selects gthread) or the async front end
+# (async_app.py); a sync worker takes one request at a time and never sheds.
+app.config["MAX_INFLIGHT_PAGES"] = int(os.environ.get("MAX_INFLIGHT_PAGES", 400))
+app.config["MAX_INFLIGHT_BYTES"] = int(os.environ.get("MAX_INFLIGHT_BYTES", 256 * 1024 * 1024))
+
+# JSON responses of at least this many bytes are compressed when the client
+# accepts gzip or deflate
+app.config["COMPRESS_MIN_SIZE"] = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+app.config["COMPRESS_LEVEL"] = int(os.environ.get("COMPRESS_LEVEL", 6))
+
+# Response profiles for per-file results: "full" as produced by the extractors,
+# "compact" without empty fields and with feedback as codes (see compact_result)
+RESPONSE_PROFILES = {"full", "compact"}
+
+# Parse results are stored by the SHA-256 digest of the uploaded PDF, so POST /check
+# can tell clients which files need no upload and /upload can skip re-parsing
+# identical bytes. RESULT_STORE_SIZE results are kept in memory per worker;
+# RESULT_STORE_DIR, when set, also keeps them on disk, shared by all workers.
+# Without it each worker only knows what it parsed itself, so with several
+# workers /check answers depend on which worker takes the request: set
+# RESULT_STORE_DIR wherever /check is used. Files on disk are never evicted;
+# prune the directory by age (a namespace left by an older parser version can
+# be removed whole).
+app.config["RESULT_STORE_SIZE"] = int(os.environ.get("RESULT_STORE_SIZE", 4096))
+app.config["RESULT_STORE_DIR"] = os.environ.get("RESULT_STORE_DIR")
+# Stored results are also keyed by the parser version and the configuration
+# that changes parse output (see result_namespace). Bump PARSER_VERSION when a
+# change to the extractors changes what they return for the same document.
+PARSER_VERSION = "1"
+CHECK_MAX_DIGESTS = 10000
+
+# Tenure of parsed candidates, for /candidates/tenure, by tenant and document
+# digest. At most TENURE_INDEX_SIZE candidates are kept; the least recently
+# parsed are dropped beyond that. The index is held in memory per worker, or,
+# when TENURE_INDEX_PATH is set, in an SQLite database shared by all workers.
+app.config["TENURE_INDEX_SIZE"] = int(os.environ.get("TENURE_INDEX_SIZE", 100000))
+app.config["TENURE_INDEX_PATH"] = os.environ.get("TENURE_INDEX_PATH")
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# Documents with at least this many pages to extract (after the page cache) have
+# their text extracted in page ranges by a pool of PARALLEL_PAGE_WORKERS
+# processes; shorter ones are read in the request thread. 0 disables it.
+app.config["PARALLEL_PAGE_THRESHOLD"] = int(os.environ.get("PARALLEL_PAGE_THRESHOLD", 50))
+app.config["PARALLEL_PAGE_WORKERS"] = int(os.environ.get("PARALLEL_PAGE_WORKERS", min(4, os.cpu_count() or 1)))
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+# PDF decoding can run in a pool of PDF_SANDBOX_WORKERS child processes, so a
+# hostile or malformed PDF can only take down a child. Each child is limited to
+# PDF_SANDBOX_MEMORY_MB of address space and PDF_SANDBOX_CPU_SECONDS of CPU, a
+# document that takes longer than PDF_SANDBOX_TIMEOUT seconds has its child
+# killed, and children are replaced after PDF_SANDBOX_MAX_DOCS documents or once
+# they grow past PDF_SANDBOX_MAX_RSS_MB. 0 workers decodes in the request thread.
+app.config["PDF_SANDBOX_WORKERS"] = int(os.environ.get("PDF_SANDBOX_WORKERS", 0))
+app.config["PDF_SANDBOX_MEMORY_MB"] = int(os.environ.get("PDF_SANDBOX_MEMORY_MB", 1024))
+app.config["PDF_SANDBOX_CPU_SECONDS"] = int(os.environ.get("PDF_SANDBOX_CPU_SECONDS", 120))
+app.config["PDF_SANDBOX_TIMEOUT"] = float(os.environ.get("PDF_SANDBOX_TIMEOUT", 30))
+app.config["PDF_SANDBOX_MAX_DOCS"] = int(os.environ.get("PDF_SANDBOX_MAX_DOCS", 200))
+app.config["PDF_SANDBOX_MAX_RSS_MB"] = int(os.environ.get("PDF_SANDBOX_MAX_RSS_MB", 512))
+
+# Extraction tiers: "full" runs every fallback of every extractor; "fast" runs a
+# fallback only while the request's time budget lasts. The budget is the
+# X-Deadline header (milliseconds) or FAST_TIER_BUDGET_MS. A request with an
+# X-Deadline and no ?tier= is fast.
+EXTRACTION_TIERS = {"fast", "full"}
+app.config["FAST_TIER_BUDGET_MS"] = float(os.environ.get("FAST_TIER_BUDGET_MS", 200))
+
+# /parse-text takes resume text directly: a text/plain body holding one resume,
+# or a JSONL stream of {"id", "filename", "text"} records. A resume (or a JSONL
+# line) longer than PARSE_TEXT_MAX_BYTES is rejected.
+app.config["PARSE_TEXT_MAX_BYTES"] = int(os.environ.get("PARSE_TEXT_MAX_BYTES", 1024 * 1024))
+JSONL_MIMETYPES = {"application/x-ndjson", "application/jsonl", "application/x-jsonlines"}
+
+# Region assumed for phone numbers written without a country code
+app.config["DEFAULT_PHONE_REGION"] = os.environ.get("DEFAULT_PHONE_REGION", "IN")
+
+def get_gazetteer():
+    """Open the configured gazetteer on first use. Returns None if none is configured."""
+    global _gazetteer
+    if _gazetteer is None and app.config["GAZETTEER_PATH"]:
+        _gazetteer = Gazetteer(app.config["GAZETTEER_PATH"])
+    return _gazetteer
+
 def allowed_file(filename):
     """Check if the file has an allowed extension (PDF only)."""
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text from PDF."""
-    doc = fitz.open(pdf_path)
-    text = "\n".join(page.get_text("text") for page in doc)
-    return text
+class DocumentCounter:
+    """
+    Counts the PDF documents opened by open_pdf and not closed yet, to catch
+    handle leaks. A document dropped without being closed stays counted as
+    open: it held its file handle and native buffers until the garbage
+    collector got to it.
+    """
+    
+    def __init__(self):
+        self.opened = 0
+        self.closed = 0
+        self._lock = threading.Lock()
+    
+    def track(self, doc):
+        with self._lock:
+            self.opened += 1
+        
+        def close():
+            # Removing the wrapper breaks the cycle document -> wrapper -> document
+            if doc.__dict__.pop("close", None) is not None:
+                with self._lock:
+                    self.closed += 1
+            doc.close()
+        doc.close = close
+        return doc
+    
+    def snapshot(self):
+        with self._lock:
+            return {"open": self.opened - self.closed, "opened": self.opened}
+
+open_documents = DocumentCounter()
 
+def open_pdf(source):
+    """Open a PDF from a file path or from its bytes."""
+    # Imported on first use to keep startup fast, and as pymupdf rather than
+    # through the deprecated fitz alias, which re-exports it at extra cost
+    import pymupdf
+    
+    if isinstance(source, (bytes, bytearray)):
+        return open_documents.track(pymupdf.open(stream=source, filetype="pdf"))
+    try:
+        return open_documents.track(pymupdf.open(source, filetype="pdf"))
+    except pymupdf.FileDataError:
+        # The message names the path, a spilled upload the client never saw
+        raise pymupdf.FileDataError("Failed to open file") from None
 
-def extract_contact_details(text, filename):
+class PageCache:
     """
-    Extract Name (from filename), Email, Phone Number, and Location from resume text.
-    Priority is given to the first city match found in the text.
+    Thread-safe LRU cache of per-page extraction results.
+    
+    Keys start with the kind of result and the page's content digest (see
+    page_digest), so identical pages share entries across documents and
+    uploads. Cached values are shared between requests and must not be
+    modified by callers.
+    """
+    
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key):
+        """Return the cached value for key, or None."""
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        return None
+    
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def get_or_build(self, key, build):
+        """Return the cached value for key, calling build() to create it on a miss."""
+        value = self.get(key)
+        if value is None:
+            # Build outside the lock; two requests racing on the same page both build it
+            value = build()
+            self.put(key, value)
+        return value
+
+page_cache = PageCache(app.config["PAGE_CACHE_SIZE"])
+
+# Font dictionary keys whose streams hold an embedded font program
+FONT_PROGRAM_KEYS = ("FontFile", "FontFile2", "FontFile3")
+
+def referenced_xrefs(value):
+    """The object numbers referenced in a PDF value such as "[10 0 R 11 0 R]"."""
+    return [int(number) for number in re.findall(r'(\d+) \d+ R', value)]
+
+def font_digest(doc, xref):
+    """
+    Hash what a font contributes to the text of a page: its ToUnicode map,
+    its encoding and its embedded font program, and those of its descendant
+    fonts. Two subset fonts can share a name and still map glyphs to
+    different characters, so the name alone does not identify a font.
+    """
+    digest = hashlib.sha256()
+    fonts = [xref]
+    kind, value = doc.xref_get_key(xref, "DescendantFonts")
+    if kind == "xref":
+        value = doc.xref_object(referenced_xrefs(value)[0])
+    if kind in ("array", "xref"):
+        fonts += referenced_xrefs(value)
+    for font in fonts:
+        entries = [(key, doc.xref_get_key(font, key)) for key in ("ToUnicode", "Encoding")]
+        kind, value = doc.xref_get_key(font, "FontDescriptor")
+        if kind == "xref":
+            descriptor = referenced_xrefs(value)[0]
+            entries += [(key, doc.xref_get_key(descriptor, key)) for key in FONT_PROGRAM_KEYS]
+        for key, (kind, value) in entries:
+            digest.update(key.encode("utf-8"))
+            if kind == "xref":
+                number = referenced_xrefs(value)[0]
+                if doc.xref_is_stream(number):
+                    digest.update(doc.xref_stream(number) or b"")
+                else:
+                    digest.update(doc.xref_object(number).encode("utf-8"))
+            else:
+                digest.update(value.encode("utf-8"))
+    return digest.hexdigest()
+
+def page_digest(page, font_digests=None):
+    """
+    Hash everything that determines what a page renders as text: its content
+    stream, size and rotation, the fonts it uses (down to their glyph maps
+    and programs, see font_digest) and the streams of any form XObjects it
+    draws. Object numbers are left out, as they differ between two saves of
+    the same document.
     
     Args:
-        text (str): The resume text content
-        filename (str): The uploaded file's name
+        page (pymupdf.Page): The page to hash
+        font_digests (dict, optional): Font digests by object number, shared
+            between the pages of one document so each font is hashed once
+    
+    Returns:
+        str: Hex digest of the page
+    """
+    if font_digests is None:
+        font_digests = {}
+    doc = page.parent
+    digest = hashlib.sha256(page.read_contents())
+    digest.update(repr((tuple(page.rect), page.rotation)).encode("utf-8"))
+    for font in page.get_fonts():
+        digest.update(repr(font[2:]).encode("utf-8"))
+        if font[0] > 0:
+            if font[0] not in font_digests:
+                font_digests[font[0]] = font_digest(doc, font[0])
+            digest.update(font_digests[font[0]].encode("utf-8"))
+    for xobject in page.get_xobjects():
+        digest.update(doc.xref_stream(xobject[0]) or b"")
+    return digest.hexdigest()
+
+def get_page_pool():
+    """Start the page extraction process pool on first use."""
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            # forkserver children start from a clean process rather than a fork of
+            # a threaded worker, and only import this module once
+            _page_pool = ProcessPoolExecutor(max_workers=app.config["PARALLEL_PAGE_WORKERS"],
+                                             mp_context=multiprocessing.get_context("forkserver"))
+        return _page_pool
+
+def extract_page_texts(source, page_numbers):
+    """Extract the text of the given pages. Runs in a page pool process, which
+    opens its own handle on the document."""
+    with open_pdf(source) as doc:
+        return [doc[number].get_text("text") for number in page_numbers]
+
+def extract_pages_in_parallel(source, page_numbers):
+    """
+    Extract the text of many pages in contiguous ranges, one range per pool process.
+    
+    Args:
+        source (str or bytes): Path to the PDF file, or its bytes
+        page_numbers (list): Page numbers to extract, in ascending order
         
     Returns:
-        dict: Dictionary containing extracted Name, Email, Phone, and Location
+        list: The text of each page, in the order of page_numbers
     """
-   
-    result = {
-        "Name": "Not Found",
-        "Email": "Not Found",
-        "Phone": "Not Found",
-        "Location": "Not Found"
+    workers = app.config["PARALLEL_PAGE_WORKERS"]
+    size = math.ceil(len(page_numbers) / workers)
+    ranges = [page_numbers[i:i + size] for i in range(0, len(page_numbers), size)]
+    futures = [get_page_pool().submit(extract_page_texts, source, numbers) for numbers in ranges]
+    return [text for future in futures for text in future.result()]
+
+def extract_text_from_pdf(pdf_path, stats=None):
+    """Extract text from PDF. Accepts a file path or the PDF bytes.
+    Pages seen before (in this or an earlier upload) come from the page cache.
+    Long documents are extracted in parallel (see PARALLEL_PAGE_THRESHOLD).
+    Pass a dict as `stats` to have the page count recorded in it."""
+    with open_pdf(pdf_path) as doc:
+        if stats is not None:
+            stats["pages"] = doc.page_count
+        font_digests = {}
+        keys = [("text", page_digest(page, font_digests)) for page in doc]
+        texts = [page_cache.get(key) for key in keys]
+        missing = [number for number, text in enumerate(texts) if text is None]
+        
+        threshold = app.config["PARALLEL_PAGE_THRESHOLD"]
+        extracted = None
+        if threshold and len(missing) >= threshold and app.config["PARALLEL_PAGE_WORKERS"] > 1:
+            try:
+                extracted = extract_pages_in_parallel(pdf_path, missing)
+            except BrokenProcessPool:
+                # A pool process died; start a fresh pool next time and read the pages here
+                global _page_pool
+                with _page_pool_lock:
+                    _page_pool = None
+                app.logger.warning("Page pool broke, extracting %d pages serially", len(missing))
+        if extracted is None:
+            extracted = [doc[number].get_text("text") for number in missing]
+    
+    for number, text in zip(missing, extracted):
+        texts[number] = text
+        page_cache.put(keys[number], text)
+    return "\n".join(texts)
+
+class UploadBuffer:
+    """
+    One uploaded file, hashed as its bytes arrive.
+    
+    The bytes are held in memory up to max_memory and spill to a temporary
+    file in `directory` beyond that. Decoders are handed source(): the bytes
+    of a small file or the path of a spilled one, so a large upload is never
+    read back into memory. Closing the buffer deletes the temporary file.
+    """
+    
+    def __init__(self, max_memory, directory):
+        self.max_memory = max_memory
+        self.directory = directory
+        self.size = 0
+        self.path = None
+        self._hash = hashlib.sha256()
+        self._memory = bytearray()
+        self._file = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+        if self._file is None and self.size > self.max_memory:
+            self._file = NamedTemporaryFile(dir=self.directory, suffix=".pdf", delete=False)
+            # Absolute, as sandbox and page pool processes may open it too
+            self.path = os.path.abspath(self._file.name)
+            self._file.write(self._memory)
+            self._memory = bytearray()
+        if self._file is None:
+            self._memory += data
+        else:
+            self._file.write(data)
+    
+    def hexdigest(self):
+        """SHA-256 digest of the bytes written so far."""
+        return self._hash.hexdigest()
+    
+    def source(self):
+        """The file's bytes if it is held in memory, otherwise the path of its temporary file."""
+        if self._file is None:
+            return bytes(self._memory)
+        self._file.flush()
+        return self.path
+    
+    def close(self):
+        self._memory = bytearray()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+def iter_multipart_files(stream, boundary):
+    """
+    Read a multipart body from a stream and yield each file as soon as its part ends.
+    
+    Only the part being received is buffered, in an UploadBuffer, so memory
+    use depends on the largest file rather than the whole request, and not
+    even on that once a file spills to disk. Plain form fields are skipped.
+    Callers close the buffers they are given.
+    
+    Args:
+        stream: The request body stream
+        boundary (bytes): The multipart boundary
+        
+    Yields:
+        tuple: (field name, filename, UploadBuffer holding the whole file)
+    """
+    decoder = MultipartDecoder(boundary)
+    current = None
+    try:
+        while True:
+            chunk = stream.read(UPLOAD_READ_CHUNK_SIZE)
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, File):
+                    current = (event.name, event.filename,
+                               UploadBuffer(app.config["UPLOAD_SPOOL_MAX_MEMORY"], app.config["UPLOAD_FOLDER"]))
+                elif isinstance(event, Field):
+                    current = None
+                elif isinstance(event, Data) and current is not None:
+                    current[2].write(event.data)
+                    if not event.more_data:
+                        part, current = current, None
+                        yield part
+                event = decoder.next_event()
+            if not chunk or isinstance(event, Epilogue):
+                return
+    finally:
+        # A part cut off by a malformed or abandoned body never reached the caller
+        if current is not None:
+            current[2].close()
+
+# Header wording recognised by the layout pass, grouped under the section
+# names the extractors consume. Headers that are not listed here still end
+# the previous section, they are just not handed to an extractor.
+LAYOUT_SECTION_HEADERS = TABLES["layout_section_headers"]
+
+# Flattened lookup: normalised header text -> section name
+LAYOUT_HEADER_LOOKUP = {
+    header: section
+    for section, headers in LAYOUT_SECTION_HEADERS.items()
+    for header in headers
+}
+
+def normalize_header_text(line):
+    """Lowercase a header line and drop decoration such as colons and bullets."""
+    return re.sub(r'\s+', ' ', re.sub(r'[^A-Za-z& ]', ' ', line)).strip().lower()
+
+def collect_layout_lines(page):
+    """
+    Collect the text lines of a page in reading order with their font metrics.
+
+    Blocks are read column by column: on pages where several blocks start
+    right of the page centre, those blocks are treated as a second column
+    and read after the left one.
+
+    Args:
+        page (pymupdf.Page): The page to read
+
+    Returns:
+        list: Dicts with text, size, bold, top and bottom of each line
+    """
+    page_dict = page.get_text("dict")
+    middle = page.rect.width / 2
+    blocks = [block for block in page_dict["blocks"] if block.get("type") == 0]
+
+    right_blocks = [block for block in blocks if block["bbox"][0] >= middle - 5]
+    two_columns = len(right_blocks) >= 2
+
+    def column_of(block):
+        return 1 if two_columns and block["bbox"][0] >= middle - 5 else 0
+
+    blocks.sort(key=lambda block: (column_of(block), block["bbox"][1], block["bbox"][0]))
+
+    lines = []
+    for block in blocks:
+        for line in block["lines"]:
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if not spans:
+                continue
+            text = " ".join(span["text"].strip() for span in spans)
+            lines.append({
+                "text": text,
+                "size": max(span["size"] for span in spans),
+                # Bit 4 of the span flags marks bold text; some fonts only say so in the name
+                "bold": all(span["flags"] & 16 or "bold" in span["font"].lower() for span in spans),
+                "top": line["bbox"][1],
+                "bottom": line["bbox"][3],
+                "column": column_of(block)
+            })
+    return lines
+
+def layout_header_evidence(line, gap_above):
+    """
+    Collect what a line's own text and metrics say about it being a section
+    header: None when its shape rules it out (too long, a sentence, no
+    letters), otherwise the facts is_layout_header weighs against the
+    metrics of the whole document.
+    """
+    text = line["text"].strip()
+    words = text.split()
+    if not words or len(words) > 5 or len(text) > 45 or text.endswith((".", ",")):
+        return None
+    if not re.search(r'[A-Za-z]', text):
+        return None
+
+    normalized = normalize_header_text(text)
+    return {
+        "section": LAYOUT_HEADER_LOOKUP.get(normalized),
+        "known_header": normalized in LAYOUT_HEADER_LOOKUP,
+        "size": line["size"],
+        "bold": line["bold"],
+        "upper": text.isupper(),
+        "capitalised": text.isupper() or text.istitle(),
+        "gap_above": gap_above
+    }
+
+def is_layout_header(evidence, body_size, typical_gap):
+    """
+    Decide whether a line is a section header from its font metrics.
+
+    A header is a short line that is either set in a larger font than the
+    body text, set in bold capitals/title case, or is a known header word
+    set apart from the previous line by a larger than usual gap.
+    """
+    if evidence is None:
+        return False
+    known_header = evidence["known_header"]
+    larger_font = evidence["size"] >= body_size * 1.15
+    spaced_out = typical_gap > 0 and evidence["gap_above"] >= typical_gap * 1.5
+
+    if larger_font and (known_header or evidence["capitalised"]):
+        return True
+    if evidence["bold"] and (known_header or evidence["upper"]):
+        return True
+    return known_header and (evidence["upper"] or spaced_out)
+
+def extract_layout_from_pdf(pdf_path, stats=None):
+    """
+    Extract text and sections from a PDF using font size, bold flags and
+    vertical gaps instead of header regexes.
+
+    Every line is classified once as header or body; body lines are
+    attached to the most recent header, so sections come out directly.
+
+    Args:
+        pdf_path (str or bytes): Path to the PDF file, or its bytes
+        stats (dict, optional): Filled with the page count
+
+    Returns:
+        tuple: (text in reading order, dict of section name -> section text)
+    """
+    # Line metrics and header evidence are cached per page, so a revised
+    # resume only reads and examines the pages that changed
+    with open_pdf(pdf_path) as doc:
+        if stats is not None:
+            stats["pages"] = doc.page_count
+        font_digests = {}
+        digests = [page_digest(page, font_digests) for page in doc]
+        pages = [
+            page_cache.get_or_build(("layout", digest), lambda: collect_layout_lines(page))
+            for digest, page in zip(digests, doc)
+        ]
+
+    all_lines = [line for page_lines in pages for line in page_lines]
+    if not all_lines:
+        return "", {}
+
+    # Body font size is the size carrying the most characters
+    size_weights = {}
+    for line in all_lines:
+        size = round(line["size"], 1)
+        size_weights[size] = size_weights.get(size, 0) + len(line["text"])
+    body_size = max(size_weights, key=size_weights.get)
+
+    # Typical line spacing, used to spot headers that are only set apart by whitespace
+    gaps = []
+    for page_lines in pages:
+        for previous, line in zip(page_lines, page_lines[1:]):
+            if line["column"] == previous["column"] and line["top"] > previous["bottom"]:
+                gaps.append(line["top"] - previous["bottom"])
+    gaps.sort()
+    typical_gap = gaps[len(gaps) // 2] if gaps else 0
+
+    # Only the page-local evidence is cached, so a page's entry stays valid
+    # when another page changes the document-wide metrics
+    evidence = [
+        page_cache.get_or_build(("header_evidence", digest), lambda: collect_header_evidence(page_lines))
+        for digest, page_lines in zip(digests, pages)
+    ]
+    
+    # Classify every line against the document's metrics; a section runs on across pages until the next header
+    text_lines = [line["text"] for page_lines in pages for line in page_lines]
+    sections = {}
+    current_section = None
+    for page_evidence in evidence:
+        for text, line_evidence in page_evidence:
+            if is_layout_header(line_evidence, body_size, typical_gap):
+                current_section = line_evidence["section"]
+                if current_section and current_section in sections:
+                    # Repeated headers (e.g. "Technical Skills" and "Soft Skills") extend the section
+                    sections[current_section].append("")
+                elif current_section:
+                    sections[current_section] = []
+            elif current_section:
+                sections[current_section].append(text)
+
+    return "\n".join(text_lines), {
+        name: "\n".join(lines).strip() for name, lines in sections.items() if any(lines)
     }
+
+def collect_header_evidence(page_lines):
+    """
+    Collect the header evidence of each line of one page.
+
+    Args:
+        page_lines (list): Lines of the page from collect_layout_lines
+
+    Returns:
+        list: (line text, evidence from layout_header_evidence) pairs in page order
+    """
+    evidence = []
+    previous = None
+    for line in page_lines:
+        gap_above = line["top"] - previous["bottom"] if previous and line["column"] == previous["column"] else 0
+        previous = line
+        evidence.append((line["text"], layout_header_evidence(line, gap_above)))
+    return evidence
+
+
+class DocumentContext:
+    """
+    The text of one resume together with the views the extractors derive from it.
+    
+    Each view is computed the first time an extractor asks for it and then
+    reused, so parse_resume builds one context and hands it to every
+    extractor instead of each of them splitting, lowercasing and normalising
+    the whole document again. The extractors also accept plain strings.
+    """
+    
+    def __init__(self, text):
+        self.text = text
+    
+    @cached_property
+    def normalized_text(self):
+        """The text with Windows and old Mac line endings turned into newlines."""
+        return re.sub(r'\r\n|\r', '\n', self.text)
+    
+    @cached_property
+    def lines(self):
+        """The raw text split into lines."""
+        return self.text.split('\n')
+    
+    @cached_property
+    def stripped_lines(self):
+        """Stripped, non-empty lines of the normalised text."""
+        return [line.strip() for line in self.normalized_text.split('\n') if line.strip()]
+    
+    @cached_property
+    def lower(self):
+        return self.text.lower()
+    
+    @cached_property
+    def line_offsets(self):
+        """Offset in the raw text at which each line starts."""
+        offsets = [0]
+        for line in self.lines[:-1]:
+            offsets.append(offsets[-1] + len(line) + 1)
+        return offsets
+    
+    @cached_property
+    def collapsed_text(self):
+        """The normalised text with runs of newlines collapsed and the ends stripped."""
+        return re.sub(r'\n+', '\n', self.normalized_text).strip()
+    
+    def line_start(self, position):
+        """Offset of the start of the line containing `position` in the raw text."""
+        return self.line_offsets[bisect_right(self.line_offsets, position) - 1]
+
+def as_document(text):
+    """Wrap resume text in a DocumentContext unless it already is one."""
+    return text if isinstance(text, DocumentContext) else DocumentContext(text)
+
+class ExtractionBudget:
+    """
+    Time budget of one resume's extraction, and the report of where each
+    field's result came from.
+    
+    Each extractor that has a fallback path asks the budget before taking
+    it. In the full tier the answer is always yes; in the fast tier it is
+    yes until the deadline passes. Fallbacks that scan in a loop also stop
+    early once the deadline passes. Sources are reported per field as
+    "primary", "fallback", "fallback_truncated" or "fallback_skipped".
+    """
     
-    # Extract name from filename
+    def __init__(self, tier="full", deadline=None):
+        self.tier = tier
+        # time.monotonic() value; None means no limit
+        self.deadline = deadline if tier == "fast" else None
+        self.sources = {}
+    
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+    
+    def fallback(self, field):
+        """Record that `field` needs its fallback, and return whether it may run."""
+        if self.expired():
+            self.sources[field] = "fallback_skipped"
+            return False
+        self.sources[field] = "fallback"
+        return True
+    
+    def truncated(self, field):
+        self.sources[field] = "fallback_truncated"
+    
+    def report(self, fields):
+        return {field: self.sources.get(field, "primary") for field in fields}
+
+def use_fallback(budget, field):
+    """Whether an extractor may take its fallback path for `field` (always without a budget)."""
+    return budget is None or budget.fallback(field)
+
+# The contact block ends at the first section header or after this many lines
+CONTACT_BLOCK_MAX_LINES = 15
+
+# Headers that commonly follow the contact block besides the extractor sections
+CONTACT_BLOCK_END_HEADERS = {
+    "summary", "professional summary", "objective", "career objective", "profile",
+    "professional profile", "about me", "introduction"
+}
+
+def find_contact_block(lines):
+    """
+    Return the leading lines of the resume that hold the contact details.
+    
+    Args:
+        lines (list): Stripped, non-empty lines of the resume
+        
+    Returns:
+        list: The lines before the first section header, at most CONTACT_BLOCK_MAX_LINES
+    """
+    block = []
+    for line in lines[:CONTACT_BLOCK_MAX_LINES]:
+        header = normalize_header_text(line)
+        if header in LAYOUT_HEADER_LOOKUP or header in CONTACT_BLOCK_END_HEADERS:
+            break
+        block.append(line)
+    return block
+
+def national_phone_number(raw_number):
+    """
+    Format a number written without a country code in E.164 for the default
+    region, if it is a number of that region as written; otherwise return it
+    as written.
+    
+    Fixed-line numbers are written with the region's trunk prefix ("020 ...",
+    "080 ..."), so one without it that merely fits the region's numbering,
+    such as the US "(206) 555-0147" in India, is not taken for a local number.
+    """
+    # phonenumbers carries a lot of metadata, so it is only imported when needed
+    import phonenumbers
+    
+    region = app.config["DEFAULT_PHONE_REGION"]
+    try:
+        number = phonenumbers.parse(raw_number, region)
+    except phonenumbers.NumberParseException:
+        return raw_number.strip()
+    if not phonenumbers.is_valid_number_for_region(number, region):
+        return raw_number.strip()
+    
+    trunk_prefix = phonenumbers.PhoneMetadata.metadata_for_region(region).national_prefix
+    has_trunk_prefix = bool(trunk_prefix) and re.sub(r'\D', '', raw_number).startswith(trunk_prefix)
+    mobile_types = (phonenumbers.PhoneNumberType.MOBILE, phonenumbers.PhoneNumberType.FIXED_LINE_OR_MOBILE)
+    if trunk_prefix and not has_trunk_prefix and phonenumbers.number_type(number) not in mobile_types:
+        return raw_number.strip()
+    return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
+
+def normalize_phone_number(raw_number):
+    """Format a phone number in E.164. Numbers without a country code are
+    resolved in the default region (see national_phone_number); numbers of
+    implausible length are returned unchanged."""
+    digits = re.sub(r'\D', '', raw_number)
+    if raw_number.strip().startswith('+'):
+        number = digits
+    elif digits.startswith('00'):
+        number = digits[2:]
+    else:
+        return national_phone_number(raw_number)
+    
+    # E.164 numbers have at most 15 digits; anything under 8 is not a full number
+    if not 8 <= len(number) <= 15:
+        return raw_number.strip()
+    return f"+{number}"
+
+# A line that states where the candidate lives: a location label at its start
+LOCATION_LABEL_PATTERN = re.compile(
+    r'^\W*(?:current\s+|present\s+|permanent\s+)?(?:location|address|city|residence|based\s+(?:in|at)|lives?\s+in|hometown)\b\s*[:\-–]?\s*',
+    re.IGNORECASE
+)
+# Separators between the pieces of a contact line ("a@b.com | +91 ... | Pune, Maharashtra")
+LOCATION_SEGMENT_SEPARATOR = re.compile(r'\s*(?:[|•·;,\t]|\s{2,})\s*')
+# Indian PIN codes ("560001", "560 001") and US ZIP codes
+POSTAL_CODE_PATTERN = re.compile(r'\b\d{3}\s?\d{3}\b|\b\d{5}(?:-\d{4})?\b')
+
+def is_location_line(line):
+    """Whether a line outside the contact block states a location: it is
+    labelled as one or carries a postal code."""
+    return bool(LOCATION_LABEL_PATTERN.match(line) or POSTAL_CODE_PATTERN.search(line))
+
+def location_segments(line):
+    """
+    Split a line into the pieces that could each be a place name on its own,
+    e.g. "Address: 12 MG Road, Bengaluru 560001" into "MG Road" and "Bengaluru".
+    Labels, postal codes, house numbers and pieces with emails or links are dropped.
+    """
+    line = LOCATION_LABEL_PATTERN.sub("", line)
+    for segment in LOCATION_SEGMENT_SEPARATOR.split(line):
+        if "@" in segment or "/" in segment:
+            continue
+        segment = re.sub(r'\d+', ' ', segment).strip(" -–()#.")
+        if segment:
+            yield segment
+
+@lru_cache(maxsize=None)
+def city_index():
+    """Index the built-in city names by their first word, longest names first so
+    "navi mumbai" wins over "mumbai"."""
+    index = {}
+    for city in sorted(TABLES["city_to_state"], key=len, reverse=True):
+        index.setdefault(city.split(" ")[0], []).append(city)
+    return index
+
+WORD_PATTERN = re.compile(r'\w+')
+
+def find_city(line):
+    """
+    Find the first built-in city named in a lowercased line, as whole words.
+    
+    Only the names starting with each word of the line are tried, which is
+    much cheaper than compiling and running one alternation of every city.
+    
+    Returns:
+        str: The city name, or None
+    """
+    index = city_index()
+    for word in WORD_PATTERN.finditer(line):
+        for city in index.get(word.group(), ()):
+            end = word.start() + len(city)
+            if line.startswith(city, word.start()) and (end == len(line) or not (line[end].isalnum() or line[end] == "_")):
+                return city
+    return None
+
+def name_from_filename(filename):
+    """Derive the candidate's name from the uploaded file's name, or "Not Found"."""
     base_name = os.path.splitext(filename)[0]
     
     # List of words to omit
@@ -70,218 +986,122 @@ def extract_contact_details(text, filename):
     # Clean up extra spaces and title case the result
     name = re.sub(r'\s+', ' ', name).strip().title()
     
-    if name:
-        result["Name"] = name
+    return name or "Not Found"
+
+def extract_contact_details(text, filename, budget=None):
+    """
+    Extract Name (from filename), Email, Phone Number, and Location from resume text.
+    Priority is given to the first city match found in the text.
+    
+    Args:
+        text (str or DocumentContext): The resume text content
+        filename (str): The uploaded file's name
+        budget (ExtractionBudget, optional): Decides whether fallbacks may run
+        
+    Returns:
+        dict: Dictionary containing extracted Name, Email, Phone, and Location
+    """
+   
+    result = {
+        "Name": name_from_filename(filename),
+        "Email": "Not Found",
+        "Phone": "Not Found",
+        "Location": "Not Found"
+    }
+    
+    lines = as_document(text).stripped_lines
     
-    # Clean the text
-    text = text.replace('\r', '\n')
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    # Contact details almost always sit in the header block, so search that
+    # first and only fall back to the rest of the document when it has nothing
+    block_lines = find_contact_block(lines)
+    rest_lines = lines[len(block_lines):]
+    search_scopes = [
+        re.sub(r'(?<!\s)(www\.)', r' \1', '\n'.join(scope_lines))
+        for scope_lines in (block_lines, rest_lines)
+    ]
     
     # Extract email
-    text = re.sub(r'(?<!\s)(www\.)', r' \1', text)
     email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-    email_matches = re.findall(email_pattern, text)
-    if email_matches:
-        result["Email"] = email_matches[0]
+    for i, scope in enumerate(search_scopes):
+        if i and (not scope or not use_fallback(budget, "contact_details")):
+            break
+        email_match = re.search(email_pattern, scope)
+        if email_match:
+            result["Email"] = email_match.group(0)
+            break
     
     # Extract phone number
     phone_patterns = [
         r'(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}',
         r'(?:\+\d{1,3}[-.\s]?)?\d{3}[-.\s]?\d{3}[-.\s]?\d{4}',
         r'(?:\+\d{1,3}[-.\s]?)?\d{10,}',
+        # Two groups of five digits after the country code, as Indian mobile
+        # numbers are written ("+91 98450 12345"); without it they fell through
+        # to phonenumbers, whose import and metadata cost most of a first request
+        r'\+\d{1,3}[-.\s]?\d{5}[-.\s]\d{5}\b',
     ]
-    for pattern in phone_patterns:
-        phone_matches = re.findall(pattern, text)
-        if phone_matches:
-            result["Phone"] = phone_matches[0]
+    for i, scope in enumerate(search_scopes):
+        if i and (not scope or not use_fallback(budget, "contact_details")):
             break
-    
-    # Validate phone number with phonenumbers
-    if result["Phone"] == "Not Found":
-        try:
-            for match in phonenumbers.PhoneNumberMatcher(text, None):
-                result["Phone"] = phonenumbers.format_number(
-                    match.number, phonenumbers.PhoneNumberFormat.INTERNATIONAL
-                )
+        for pattern in phone_patterns:
+            phone_match = re.search(pattern, scope)
+            if phone_match:
+                result["Phone"] = normalize_phone_number(phone_match.group(0))
                 break
-        except:
-            pass
-    
-    # Dictionary of Indian states and their cities
-    indian_cities_states = {
-    "Karnataka": ["Bangalore", "Bengaluru", "Mysore", "Mysuru", "Hubli", "Hubballi", "Dharwad", "Hospet",
-                 "Mangalore", "Mangaluru", "Belgaum", "Belagavi", "Davanagere", "Davangere", 
-                 "Bellary", "Ballari", "Gulbarga", "Kalaburagi", "Bijapur", "Vijayapura", "Shimoga", "Shivamogga",
-                 "Tumkur", "Tumakuru", "Raichur", "Bidar", "Hassan", "Udupi", "Chitradurga", "Bagalkot", "Gadag", "Koppal"],
-    
-    "Maharashtra": ["Mumbai", "Pune", "Nagpur", "Thane", "Nashik", "Aurangabad", "Solapur", 
-                   "Kolhapur", "Amravati", "Navi Mumbai", "Sangli", "Satara", "Ratnagiri", "Akola",
-                   "Ahmednagar", "Jalgaon", "Dhule", "Nanded", "Latur", "Chandrapur", "Parbhani", "Yavatmal",
-                   "Buldhana", "Jalna", "Beed", "Osmanabad", "Hingoli", "Washim", "Gadchiroli", "Wardha"],
-    
-    "Tamil Nadu": ["Chennai", "Coimbatore", "Madurai", "Tiruchirappalli", "Trichy", "Salem", 
-                  "Tirunelveli", "Tiruppur", "Erode", "Vellore", "Thanjavur", "Dindigul", "Kanchipuram",
-                  "Cuddalore", "Thoothukudi", "Tuticorin", "Karur", "Namakkal", "Virudhunagar", "Krishnagiri",
-                  "Tiruvannamalai", "Nagapattinam", "Theni", "Perambalur", "Ariyalur", "Sivaganga", "Ramanathapuram"],
-    
-    "Kerala": ["Thiruvananthapuram", "Trivandrum", "Kochi", "Cochin", "Kozhikode", "Calicut", 
-              "Thrissur", "Trichur", "Kollam", "Quilon", "Palakkad", "Palghat", "Kannur", "Cannanore",
-              "Alappuzha", "Alleppey", "Malappuram", "Pathanamthitta", "Kottayam", "Idukki", "Kasaragod", "Wayanad"],
-    
-    "Andhra Pradesh": ["Visakhapatnam", "Vizag", "Vijayawada", "Guntur", "Nellore", "Kurnool", "Nandyal",
-                      "Rajahmundry", "Tirupati", "Eluru", "Ongole", "Anantapur", "Kakinada",
-                      "Kadapa", "Cuddapah", "Chittoor", "Srikakulam", "Vizianagaram", "Prakasam", "Parvathipuram Manyam"],
-    
-    "Telangana": ["Hyderabad", "Secunderabad", "Warangal", "Nizamabad", "Karimnagar", "Khammam", 
-                 "Ramagundam", "Mahbubnagar", "Nalgonda", "Adilabad", "Suryapet",
-                 "Siddipet", "Medak", "Sangareddy", "Kamareddy", "Vikarabad", "Jagitial", "Peddapalli",
-                 "Jangaon", "Bhadradri Kothagudem", "Nagarkurnool", "Wanaparthy", "Mahabubabad", "Mancherial"],
-    
-    "Delhi": ["Delhi", "New Delhi", "South Delhi", "North Delhi", "East Delhi", "West Delhi",
-             "Central Delhi", "North West Delhi", "South West Delhi", "North East Delhi", "Shahdara", "South East Delhi"],
-    
-    "Gujarat": ["Ahmedabad", "Surat", "Vadodara", "Baroda", "Rajkot", "Bhavnagar", "Jamnagar", 
-               "Gandhinagar", "Junagadh", "Gandhidham", "Anand", "Navsari", "Morbi", "Nadiad",
-               "Kutch", "Mehsana", "Bharuch", "Valsad", "Porbandar", "Patan", "Amreli", "Dahod",
-               "Sabarkantha", "Surendranagar", "Banaskantha", "Tapi", "Kheda", "Botad"],
-    
-    "Uttar Pradesh": ["Lucknow", "Kanpur", "Agra", "Varanasi", "Kashi", "Prayagraj", "Allahabad", "Gorakhpur",
-                     "Ghaziabad", "Meerut", "Noida", "Bareilly", "Aligarh", "Moradabad", "Saharanpur",
-                     "Jhansi", "Mathura", "Ayodhya", "Faizabad", "Firozabad", "Muzaffarnagar", "Sultanpur",
-                     "Mirzapur", "Azamgarh", "Bijnor", "Sitapur", "Hardoi", "Jaunpur", "Rampur", "Unnao",
-                     "Rae Bareli", "Barabanki", "Etawah", "Bulandshahr", "Amroha", "Ghazipur"],
-    
-    "West Bengal": ["Kolkata", "Calcutta", "Howrah", "Durgapur", "Asansol", "Siliguri", 
-                   "Bardhaman", "Burdwan", "Malda", "Kharagpur", "Haldia", "Darjeeling",
-                   "Jalpaiguri", "Cooch Behar", "Bankura", "Birbhum", "Purulia", "Nadia", "Hooghly",
-                   "North 24 Parganas", "South 24 Parganas", "Murshidabad", "Paschim Medinipur", "Purba Medinipur"],
-    
-    "Rajasthan": ["Jaipur", "Jodhpur", "Udaipur", "Kota", "Bikaner", "Ajmer", "Bhilwara", 
-                 "Alwar", "Sikar", "Bharatpur", "Sri Ganganagar", "Pali", "Chittorgarh",
-                 "Nagaur", "Banswara", "Bundi", "Tonk", "Jhunjhunu", "Hanumangarh", "Dausa",
-                 "Jhalawar", "Dungarpur", "Sawai Madhopur", "Churu", "Dholpur", "Jalore", "Baran", "Pratapgarh"],
-    
-    "Punjab": ["Ludhiana", "Amritsar", "Jalandhar", "Patiala", "Bathinda", "Mohali", 
-              "SAS Nagar", "Hoshiarpur", "Pathankot", "Moga", "Firozpur", "Phagwara",
-              "Gurdaspur", "Kapurthala", "Sangrur", "Fatehgarh Sahib", "Faridkot", "Muktsar",
-              "Mansa", "Rupnagar", "Ropar", "Barnala", "Nawanshahr", "Tarn Taran", "Malerkotla"],
-    
-    "Haryana": ["Gurgaon", "Gurugram", "Faridabad", "Ambala", "Panipat", "Rohtak", 
-               "Hisar", "Karnal", "Sonipat", "Panchkula", "Yamunanagar", "Bhiwani",
-               "Sirsa", "Kurukshetra", "Rewari", "Palwal", "Fatehabad", "Jhajjar", "Kaithal",
-               "Jind", "Mahendragarh", "Nuh", "Mewat", "Charkhi Dadri"],
-    
-    "Madhya Pradesh": ["Indore", "Bhopal", "Jabalpur", "Gwalior", "Ujjain", "Sagar", 
-                      "Ratlam", "Satna", "Rewa", "Dewas", "Khandwa", "Chhatarpur",
-                      "Vidisha", "Morena", "Chhindwara", "Guna", "Shivpuri", "Mandsaur",
-                      "Neemuch", "Dhar", "Khargone", "Hoshangabad", "Katni", "Bhind",
-                      "Betul", "Narsinghpur", "Damoh", "Shahdol", "Shajapur", "Burhanpur"],
-    
-    "Bihar": ["Patna", "Gaya", "Muzaffarpur", "Bhagalpur", "Darbhanga", "Purnia", 
-             "Arrah", "Begusarai", "Chhapra", "Katihar", "Munger", "Saharsa",
-             "Bettiah", "Motihari", "Samastipur", "Sitamarhi", "Madhubani", "Hajipur",
-             "Araria", "Kishanganj", "Madhepura", "Jehanabad", "Nawada", "Buxar", "Siwan",
-             "Aurangabad", "Jamui", "Nalanda", "Supaul", "Banka", "Lakhisarai"],
-    
-    "Odisha": ["Bhubaneswar", "Cuttack", "Rourkela", "Berhampur", "Sambalpur", 
-              "Puri", "Balasore", "Bhadrak", "Baripada", "Jharsuguda", "Angul",
-              "Balangir", "Bargarh", "Jeypore", "Kendrapara", "Koraput", "Sundargarh",
-              "Rayagada", "Dhenkanal", "Paradip", "Jagatsinghpur", "Jajpur", "Kendujhar", "Keonjhar"],
-    
-    "Assam": ["Guwahati", "Dibrugarh", "Silchar", "Jorhat", "Tezpur", "Nagaon", 
-             "Tinsukia", "Karimganj", "Hailakandi", "Sivasagar", "Golaghat",
-             "Diphu", "Dhubri", "Bongaigaon", "North Lakhimpur", "Mangaldoi", "Nalbari",
-             "Barpeta", "Kokrajhar", "Goalpara", "Dhemaji", "Majuli", "Hamren", "Hojai"],
-
-    "Jharkhand": ["Ranchi", "Jamshedpur", "Dhanbad", "Bokaro", "Hazaribagh", 
-                 "Deoghar", "Giridih", "Ramgarh", "Dumka", "Chas", "Phusro",
-                 "Garhwa", "Godda", "Koderma", "Chaibasa", "Lohardaga", "Pakur",
-                 "Sahebganj", "Latehar", "Simdega", "Khunti", "Gumla", "Jamtara", "Chatra"],
-    
-    "Chhattisgarh": ["Raipur", "Bhilai", "Bilaspur", "Korba", "Durg", 
-                    "Rajnandgaon", "Jagdalpur", "Ambikapur", "Mahasamund", "Dhamtari",
-                    "Raigarh", "Janjgir", "Kanker", "Bemetara", "Kondagaon", "Balod",
-                    "Sukma", "Balrampur", "Dantewada", "Baloda Bazar", "Bijapur", "Mungeli",
-                    "Surajpur", "Gariaband", "Narayanpur", "Kabirdham", "Kawardha"],
-    
-    "Uttarakhand": ["Dehradun", "Haridwar", "Roorkee", "Haldwani", "Rudrapur", 
-                   "Kashipur", "Rishikesh", "Nainital", "Mussoorie", "Pithoragarh",
-                   "Almora", "Srinagar", "Kotdwar", "Tehri", "Champawat", "Roorkee",
-                   "Uttarkashi", "Bageshwar", "Chamoli", "Rudraprayag"],
-    
-    "Himachal Pradesh": ["Shimla", "Dharamshala", "Mandi", "Solan", "Palampur", 
-                        "Kullu", "Baddi", "Nahan", "Kangra", "Bilaspur", "Hamirpur",
-                        "Una", "Chamba", "Kinnaur", "Lahaul and Spiti", "Sirmaur", "Keylong"],
-    
-    "Goa": ["Panaji", "Panjim", "Margao", "Vasco da Gama", "Vasco", "Mapusa", 
-           "Ponda", "Bicholim", "Curchorem", "Cuncolim", "Canacona",
-           "Pernem", "Quepem", "Sanguem", "Sanquelim", "Valpoi", "Calangute", "Candolim"],
-    
-    "Jammu and Kashmir": ["Srinagar", "Jammu", "Anantnag", "Baramulla", "Udhampur", 
-                         "Kathua", "Sopore", "Kupwara", "Pulwama", "Poonch", "Rajouri",
-                         "Budgam", "Bandipore", "Ganderbal", "Kulgam", "Kishtwar", "Ramban",
-                         "Reasi", "Doda", "Samba", "Shopian"],
-    
-    "Ladakh": ["Leh", "Kargil", "Zanskar", "Nubra", "Drass", "Khalatse", "Alchi", "Diskit",
-              "Hanle", "Nyoma", "Chushul", "Durbuk", "Pangong", "Khaltse", "Sankoo"],
-    
-    "Arunachal Pradesh": ["Itanagar", "Naharlagun", "Pasighat", "Tawang", "Ziro", "Bomdila", "Aalo",
-                         "Tezu", "Namsai", "Roing", "Changlang", "Khonsa", "Seppa", "Daporijo", "Yingkiong",
-                         "Anini", "Koloriang", "Hawai", "Longding"],
-    
-    "Manipur": ["Imphal", "Thoubal", "Kakching", "Ukhrul", "Chandel", "Churachandpur", "Senapati",
-                "Bishnupur", "Tamenglong", "Jiribam", "Kangpokpi", "Tengnoupal", "Pherzawl", "Noney",
-                "Kamjong"],
-    
-    "Meghalaya": ["Shillong", "Tura", "Jowai", "Nongstoin", "Williamnagar", "Baghmara", "Resubelpara",
-                  "Ampati", "Khliehriat", "Mawkyrwat", "Nongpoh", "Mairang", "Dadenggre"],
-    
-    "Mizoram": ["Aizawl", "Lunglei", "Saiha", "Champhai", "Kolasib", "Serchhip", "Mamit", "Lawngtlai",
-                "Khawzawl", "Saitual", "Hnahthial"],
-    
-    "Nagaland": ["Kohima", "Dimapur", "Mokokchung", "Tuensang", "Wokha", "Zunheboto", "Mon", "Phek",
-                "Kiphire", "Longleng", "Peren", "Noklak"],
-    
-    "Sikkim": ["Gangtok", "Namchi", "Jorethang", "Gyalshing", "Mangan", "Rangpo", "Singtam", "Ravangla",
-               "Soreng", "Pakyong"],
-    
-    "Tripura": ["Agartala", "Udaipur", "Dharmanagar", "Kailasahar", "Belonia", "Ambassa", "Khowai",
-                "Teliamura", "Sabroom", "Santirbazar", "Kamalpur", "Kumarghat"],
-    
-    # Adding Union Territories
-    "Andaman and Nicobar Islands": ["Port Blair", "Mayabunder", "Diglipur", "Rangat", "Little Andaman",
-                                   "Car Nicobar", "Campbell Bay", "Havelock Island", "Neil Island", "Kamorta"],
-    
-    "Chandigarh": ["Chandigarh", "Mani Majra", "Attawa", "Daria", "Hallomajra", "Maloya", "Palsora", "Kajheri"],
-    
-    "Dadra and Nagar Haveli and Daman and Diu": ["Silvassa", "Daman", "Diu", "Naroli", "Vapi", "Amli",
-                                                "Kachigam", "Moti Daman", "Nani Daman", "Dunetha"],
-    
-    "Lakshadweep": ["Kavaratti", "Agatti", "Amini", "Andrott", "Bangaram", "Bitra", "Chetlat", "Kadmat",
-                    "Kalpeni", "Kiltan", "Minicoy"],
-    
-    "Puducherry": ["Puducherry", "Pondicherry", "Karaikal", "Yanam", "Mahe", "Ozhukarai", "Villianur",
-                  "Ariyankuppam", "Bahour", "Mannadipet"]
-}
-    
-   # Flatten the city list for easier searching
-    city_to_state = {}
-    for state, cities in indian_cities_states.items():
-        for city in cities:
-            city_to_state[city.lower()] = state
+        
+        # Validate phone number with phonenumbers
+        if result["Phone"] == "Not Found" and use_fallback(budget, "contact_details"):
+            try:
+                # phonenumbers carries a lot of metadata, so it is only imported when needed
+                import phonenumbers # type: ignore
+                for match in phonenumbers.PhoneNumberMatcher(scope, app.config["DEFAULT_PHONE_REGION"]):
+                    result["Phone"] = phonenumbers.format_number(
+                        match.number, phonenumbers.PhoneNumberFormat.E164
+                    )
+                    break
+            except:
+                pass
+        
+        if result["Phone"] != "Not Found":
+            break
     
-    # Extract location - strictly match cities from the dictionary
+    # Outside the contact block only lines that state a location are searched,
+    # so words in the body text ("Mon", "Diu", ...) are not taken for places
+    location_lines = None
+    
+    def rest_location_lines():
+        nonlocal location_lines
+        if location_lines is None:
+            allowed = rest_lines and use_fallback(budget, "contact_details")
+            location_lines = [line for line in rest_lines if is_location_line(line)] if allowed else []
+        return location_lines
+    
+    # Prefer the memory-mapped global gazetteer when one is configured. It holds
+    # many names that are also common words or surnames, so only a piece of a
+    # line that is a place name as a whole counts ("Pune" in "a@b.com | Pune").
+    gazetteer = get_gazetteer()
+    if gazetteer is not None:
+        for scope_lines in (block_lines, None):
+            for line in scope_lines if scope_lines is not None else rest_location_lines():
+                for segment in location_segments(line):
+                    region = gazetteer.lookup(segment)
+                    if region:
+                        result["Location"] = f"{normalize_place(segment).title()}, {region}"
+                        return result
+    
+    # Extract location - strictly match cities from the built-in table,
+    # scanning line by line with the header block first
+    city_to_state = TABLES["city_to_state"]
     found_city = None
-    
-    # Scan line by line for the first city match
-    for line in lines:
-        line_lower = line.lower()
-        for city, state in city_to_state.items():
-            if re.search(r'\b' + re.escape(city) + r'\b', line_lower):
-                found_city = city
-                break
+    for line in block_lines:
+        found_city = find_city(line.lower())
         if found_city:
             break
+    if found_city is None:
+        for line in rest_location_lines():
+            found_city = find_city(line.lower())
+            if found_city:
+                break
     
     # Set location strictly based on city match from dictionary
     if found_city:
@@ -325,8 +1145,12 @@ def extract_section(text, section_headers):
     
     return "\n".join(lines[start_idx+1:end_idx]), end_idx
 
-def extract_education(text):
-    """Extract Education Details from various resume formats with improved section header detection."""
+def find_education_section(text, budget=None):
+    """Locate the education section in the resume text (a string or DocumentContext).
+    Returns the section text, or None if the resume has no education section.
+    Without an education header, the degree keyword search is a fallback of `budget`."""
+    document = as_document(text)
+    text = document.text
     # Expanded patterns for education section headers
     education_start_patterns = [
         r"EDUCATION\s*:?$",
@@ -340,15 +1164,15 @@ def extract_education(text):
     ]
     
     # Try each pattern to find the education section start
-    education_start = None
+    section_start = None
     for pattern in education_start_patterns:
         match = re.search(pattern, text, re.MULTILINE | re.IGNORECASE)
         if match:
-            education_start = match
+            section_start = match.end()
             break
     
-    # If no education section found, look for degree-related keywords in the text
-    if not education_start:
+    # If no education section found, start at the first line with a degree-related keyword
+    if section_start is None and use_fallback(budget, "education"):
         degree_patterns = [
             r"B\.E\.?|B\.Tech\.?|M\.Tech\.?|Bachelor of Engineering|Bachelor of Technology",
             r"SSLC|SSC|CBSE|ICSE|Higher Secondary|Pre-University",
@@ -356,26 +1180,13 @@ def extract_education(text):
         ]
         
         for pattern in degree_patterns:
-            matches = list(re.finditer(pattern, text, re.IGNORECASE))
-            if matches:
-                # Find the first occurrence or the one with most context
-                best_match = matches[0]
-                
-                # Find the start of the line containing this match
-                line_start = text.rfind('\n', 0, best_match.start())
-                if line_start == -1:
-                    line_start = 0
-                else:
-                    line_start += 1  # Move past the newline
-                
-                education_start = type('obj', (object,), {
-                    'start': lambda: line_start,
-                    'end': lambda: line_start
-                })
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                section_start = document.line_start(match.start())
                 break
     
-    if not education_start:
-        return []
+    if section_start is None:
+        return None
     
     # Expanded list of next section headers that could appear after education
     next_section_patterns = [
@@ -394,7 +1205,7 @@ def extract_education(text):
     ]
     
     # Extract the section that follows the education header
-    education_text = text[education_start.end():]
+    education_text = text[section_start:]
     
     # Find the next section after education
     next_section = None
@@ -457,401 +1268,196 @@ def extract_education(text):
                 
                 education_section = '\n'.join(education_lines).strip()
     
-    # Expanded list of education keywords for validation
-    education_keywords = [
-        "B.E", "B.Tech", "M.Tech", "Bachelor", "Master", "Ph.D", "Degree", 
-        "University", "Institute", "College", "School", "GPA", "CGPA",
-        "Engineering", "Sciences", "Arts", "Commerce", "Diploma", "H.S.C", "S.S.C",
-        "Secondary", "HSC", "SSLC", "Class 12", "Class 10", "High School", 
-        "ICSE", "CBSE", "State Board", "Percentage", "Sr. Secondary", "Grade",
-        "Jyothi high school", "Government polytechnic", "CREC", "DMI College",
-        "Pre-University Course", "Mvj college", "St. Jhon's English Medium",
-        "Cumulative", "Pass percentage"
-    ]
+    return education_section
+
+MONTH_NAME_PATTERN = r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?"
+
+# Rules table for the education parser. Every line is run through the table
+# once and tagged with each field whose pattern it contains. Abbreviations are
+# matched case-sensitively so words like "be" or "ssc" in prose don't count.
+EDUCATION_LINE_RULES = [
+    ("degree", re.compile(
+        r"\b(?:B\.?\s?E\b|B\.?\s?Tech|M\.?\s?Tech|M\.?\s?E\b|Ph\.?\s?D|MBA|MCA|BCA|BBA|"
+        r"B\.?\s?Sc|M\.?\s?Sc|B\.?\s?Com|M\.?\s?Com|B\.S\.|M\.S\.|B\.A\.|M\.A\.|"
+        r"HSC|H\.S\.C|SSC|S\.S\.C|SSLC|PUC|CBSE|ICSE|1[02]th)|"
+        r"(?i:\b(?:bachelor|master|doctorate|diploma|higher secondary|senior secondary|"
+        r"sr\. secondary|secondary school|pre-university|intermediate|matriculation|"
+        r"class\s+(?:x|xii|10|12)\b))")),
+    ("institution", re.compile(
+        r"(?i:\b(?:university|institute|college|school|academy|polytechnic|vidyalaya|"
+        r"vidyalayam|campus))|\b(?:IIT|NIT|IIIT|IIM)\b")),
+    ("dates", re.compile(
+        rf"(?i:(?:{MONTH_NAME_PATTERN}\s+)?\b(?:19|20)\d{{2}}\b"
+        rf"(?:\s*(?:[-–—]|to)\s*(?:(?:{MONTH_NAME_PATTERN}\s+)?\b(?:19|20)\d{{2}}\b|present|current|ongoing|now))?)")),
+    ("score", re.compile(
+        r"(?i:\b(?:c?gpa|sgpa|percentage|aggregate|grade|marks)\b)|"
+        r"\d{1,3}(?:\.\d+)?\s*%|\b\d{1,2}(?:\.\d+)?\s*/\s*(?:4|5|10)(?:\.0)?\b")),
+]
+
+# Separators between the parts of an education line ("B.Tech, XYZ Institute | 2016")
+EDUCATION_SEGMENT_SEPARATOR = re.compile(r"\s*(?:[,|;]|\s[-–—]\s)\s*")
+EDUCATION_SCORE_VALUE = re.compile(r"\d{1,3}(?:\.\d+)?\s*%|\b\d{1,2}(?:\.\d+)?(?:\s*/\s*(?:4|5|10)(?:\.0)?)?\b")
+
+def education_segment(line, match):
+    """The part of the line (between separators) holding the match."""
+    start = 0
+    for separator in EDUCATION_SEGMENT_SEPARATOR.finditer(line):
+        if separator.start() >= match.end():
+            return line[start:separator.start()].strip()
+        if separator.end() <= match.start():
+            start = separator.end()
+    return line[start:].strip()
+
+def classify_education_line(line):
+    """
+    Return the fields from EDUCATION_LINE_RULES found in a line, with their values:
+    the degree and the institution as the part of the line that names them, the
+    dates as matched, and the score as its number (None if only a label such as
+    "CGPA" is on the line).
+    """
+    fields = {}
+    for field, pattern in EDUCATION_LINE_RULES:
+        match = pattern.search(line)
+        if not match:
+            continue
+        if field in ("degree", "institution"):
+            fields[field] = education_segment(line, match)
+        elif field == "score":
+            value = EDUCATION_SCORE_VALUE.search(line, match.start())
+            fields[field] = value.group(0).replace(" ", "") if value else None
+        else:
+            fields[field] = match.group(0).strip()
+    return fields
+
+def parse_education_entries(education_section):
+    """
+    Parse an education section into structured entries in a single pass.
     
-    # Extract education entries
-    education_entries = []
+    Lines are classified once against EDUCATION_LINE_RULES. A line starts a
+    new entry when it carries a field the current entry already has (a second
+    degree, a second institution, ...); otherwise it is folded into the
+    current entry. Lines without any field are kept as part of the current
+    entry's text, or skipped if no entry has started yet.
     
-    # First, handle the special format in PV Guru Susmanth's resume
-    special_format_match = re.search(r"B\.E\..*Engineering.*\d{4}\s*-\s*\d{4}", education_section, re.IGNORECASE | re.DOTALL)
-    if special_format_match:
-        # Try to extract by the format with date ranges
-        date_entries = re.findall(r"([A-Za-z\. &]+)\n([A-Za-z\d ]+)\n((?:January|February|March|April|May|June|July|August|September|October|November|December)?\s*\d{4}\s*-\s*(?:January|February|March|April|May|June|July|August|September|October|November|December)?\s*\d{4}|(?:\d{4}\s*-\s*\d{4}))", education_section, re.MULTILINE)
-        
-        if date_entries:
-            for degree, institution, date_range in date_entries:
-                entry = f"{degree} from {institution}, {date_range}"
-                if re.search(r"CGPA|Percentage", education_section, re.IGNORECASE):
-                    # Try to extract CGPA/percentage information
-                    score_match = re.search(r"(CGPA|Percentage|Pass percentage)[^\d]*([\d\.]+)(?:\/(\d+))?", education_section, re.IGNORECASE)
-                    if score_match:
-                        score_type, score, denominator = score_match.groups()
-                        score_text = f" with {score_type} of {score}"
-                        if denominator:
-                            score_text += f"/{denominator}"
-                        entry += score_text
-                education_entries.append(entry)
-    
-    # If special case didn't work, try standard methods
-    if not education_entries:
-        # Entry markers for standard formats
-        entry_markers = [
-            r"^\s*•", r"^\s*-", r"^\s*\*", r"^\s*\d+\.", r"^[A-Za-z\s]+ — ", 
-            r"^[A-Za-z\s]+ - "
-        ]
-        
-        # Try to detect entry structure based on the text
-        lines = education_section.split("\n")
-        entries_by_indent = {}
-        current_entry = []
-        previous_indent = -1
-        
-        for i, line in enumerate(lines):
-            if not line.strip():
-                continue
-                
-            # Calculate line indentation
-            indent = len(line) - len(line.lstrip())
-            
-            # Start of a new degree/education item
-            new_entry = False
-            
-            # Check for new entry markers
-            if any(re.match(marker, line) for marker in entry_markers):
-                new_entry = True
-            # Check for degree keywords at the beginning of the line
-            elif any(re.match(rf"^\s*{re.escape(keyword)}\b", line, re.IGNORECASE) for keyword in 
-                    ["Bachelor", "Master", "Ph.D", "B.E", "B.Tech", "M.Tech", "HSC", "SSLC", "Higher Secondary"]):
-                new_entry = True
-            # Check for year patterns
-            elif re.search(r"(19|20)\d{2}\s*[-–—]\s*((19|20)\d{2}|present|current|ongoing)", line):
-                new_entry = True
-            # Check for indent change
-            elif previous_indent >= 0 and indent <= previous_indent and i > 0 and any(kw.lower() in line.lower() for kw in education_keywords):
-                new_entry = True
-            
-            if new_entry and current_entry:
-                entry_text = " ".join([l.strip() for l in current_entry])
-                if entry_text:
-                    education_entries.append(entry_text)
-                current_entry = []
-            
-            current_entry.append(line)
-            previous_indent = indent
-        
-        # Add the last entry
-        if current_entry:
-            entry_text = " ".join([l.strip() for l in current_entry])
-            if entry_text:
-                education_entries.append(entry_text)
-    
-    # Special case for Anbarasan's format
-    if not education_entries and re.search(r"Bachelor of Engineering|Higher Secondary|SSLC", education_section, re.IGNORECASE):
-        # Handle format: "Degree\nInstitution\n- percentage X%"
-        entries = []
-        current_entry = ""
-        current_degree = ""
-        current_institution = ""
-        current_percentage = ""
-        
-        lines = education_section.split('\n')
-        for i, line in enumerate(lines):
-            if not line.strip():
-                continue
-                
-            if "Bachelor" in line or "Engineering" in line or "Higher Secondary" in line or "SSLC" in line:
-                # Save previous entry if exists
-                if current_degree:
-                    entry = f"{current_degree} from {current_institution}"
-                    if current_percentage:
-                        entry += f" with {current_percentage}"
-                    entries.append(entry)
-                
-                # Start new entry
-                current_degree = line.strip()
-                current_institution = ""
-                current_percentage = ""
-            elif "College" in line or "School" in line:
-                current_institution = line.strip()
-            elif "percentage" in line.lower() or "cgpa" in line.lower():
-                current_percentage = line.strip()
-            
-        # Add the last entry
-        if current_degree:
-            entry = f"{current_degree} from {current_institution}"
-            if current_percentage:
-                entry += f" with {current_percentage}"
-            entries.append(entry)
-            
-        if entries:
-            education_entries = entries
-    
-    # If still no entries found with markers, try alternative approaches
-    if not education_entries:
-        # Try to identify education entries by looking for educational institutions and qualifications
-        for line in education_section.split('\n'):
-            if any(re.search(rf'\b{re.escape(keyword)}\b', line, re.IGNORECASE) for keyword in education_keywords):
-                education_entries.append(line.strip())
-    
-    # If still no entries, try splitting by empty lines
-    if not education_entries:
-        paragraphs = [p.strip() for p in re.split(r"\n\s*\n", education_section) if p.strip()]
+    Args:
+        education_section (str): The text content of the education section
         
-        for para in paragraphs:
-            if any(re.search(rf'\b{re.escape(keyword)}\b', para, re.IGNORECASE) for keyword in education_keywords):
-                education_entries.append(para.replace("\n", " ").strip())
-    
-    # If still no entries, use the whole section
-    if not education_entries:
-        education_entries = [education_section.replace("\n", " ").strip()]
-    
-    # Validate entries - ensure they contain education-related information
-    validated_entries = []
-    for entry in education_entries:
-        # Check for education keywords
-        if any(re.search(rf'\b{re.escape(keyword)}\b', entry, re.IGNORECASE) for keyword in education_keywords) or \
-           re.search(r"(university|college|institute|school)", entry, re.IGNORECASE) or \
-           re.search(r"(19|20)\d{2}\s*[-–—]\s*((19|20)\d{2}|present|current|ongoing)", entry) or \
-           re.search(r"percentage|cgpa", entry, re.IGNORECASE):
-            # Clean up the entry - remove any non-education related information
-            validated_entries.append(entry)
-
-# Special handling for resumes where standard validation fails
-    if not validated_entries and education_section:
-        lines = [line for line in education_section.split('\n') if line.strip()]
-        if lines:
-            # Try to reconstruct education entries from keywords
-            constructed_entries = []
-            current_entry = []
-            
-            for line in lines:
-                if any(kw.lower() in line.lower() for kw in education_keywords):
-                    if current_entry and any(kw.lower() in " ".join(current_entry).lower() for kw in education_keywords):
-                        constructed_entries.append(" ".join(current_entry))
-                        current_entry = []
-                    current_entry.append(line.strip())
-                elif current_entry:  # Continue adding to current entry if already started
-                    current_entry.append(line.strip())
-            
-            # Add last entry if exists
-            if current_entry:
-                constructed_entries.append(" ".join(current_entry))
-            
-            if constructed_entries:
-                validated_entries = constructed_entries
+    Returns:
+        list: Dicts with the entry text and its degree, institution, dates and score
+    """
+    entries = []
+    current = {"lines": [], "fields": {}}
     
-    # Special case for Mounesh's resume format
-    if not validated_entries:
-        degree_patterns = [
-            r"BE\s*[–-]\s*\w+\s*Engineering",  # BE - Mechanical Engineering
-            r"Pre-University Course",
-            r"SSLC"
-        ]
-        
-        for pattern in degree_patterns:
-            matches = list(re.finditer(pattern, education_section, re.IGNORECASE))
-            for match in matches:
-                # Extract degree line and the next 2-3 lines for context
-                degree_line = match.group(0)
-                start_pos = match.start()
-                end_pos = education_section.find('\n\n', start_pos)
-                if end_pos == -1:
-                    end_pos = min(start_pos + 200, len(education_section))
-                
-                degree_context = education_section[start_pos:end_pos]
-                lines = [l.strip() for l in degree_context.split('\n') if l.strip()][:3]
-                
-                # Extract institution and percentage/CGPA if available
-                institution = ""
-                percentage = ""
-                
-                for line in lines[1:]:
-                    if "college" in line.lower() or "school" in line.lower() or "university" in line.lower():
-                        institution = line
-                    elif "percentage" in line.lower() or "cgpa" in line.lower() or "%" in line:
-                        percentage = line
-                
-                # Build entry
-                entry = degree_line
-                if institution:
-                    entry += f" from {institution}"
-                if percentage:
-                    entry += f" with {percentage}"
-                
-                validated_entries.append(entry)
-    
-    # Special handling for Anbarasan's resume format with academic record
-    if not validated_entries and re.search(r"ACADEMIC RECORD", text, re.IGNORECASE):
-        academic_section = re.split(r"ACADEMIC RECORD", text, flags=re.IGNORECASE)[1]
-        end_pos = min([
-            pos for pos in [
-                academic_section.find("MY CONTACT"),
-                academic_section.find("CERTIFICATION"),
-                academic_section.find("PROJECT"),
-                len(academic_section)
-            ] if pos != -1
-        ])
-        
-        academic_section = academic_section[:end_pos].strip()
+    for raw_line in education_section.split('\n'):
+        line = raw_line.strip().lstrip('•-*▪●◦ ').strip()
+        if not line:
+            continue
         
-        degrees = [
-            "Bachelor of Engineering",
-            "Higher Secondary",
-            "SSLC"
-        ]
+        fields = classify_education_line(line)
+        if not fields and not current["fields"]:
+            # Header remnants and stray text before the first entry
+            continue
+        if "institution" in fields and "degree" in current["fields"] and "institution" not in current["fields"]:
+            # Degree words inside an institution name ("Higher Secondary School") don't start an entry
+            fields.pop("degree", None)
+        if any(field in current["fields"] for field in fields):
+            entries.append(current)
+            current = {"lines": [], "fields": {}}
         
-        for degree in degrees:
-            if degree in academic_section:
-                degree_pos = academic_section.find(degree)
-                end_degree_pos = academic_section.find('\n\n', degree_pos)
-                if end_degree_pos == -1:
-                    end_degree_pos = min(degree_pos + 200, len(academic_section))
-                
-                degree_text = academic_section[degree_pos:end_degree_pos].strip()
-                degree_lines = [l.strip() for l in degree_text.split('\n') if l.strip()]
-                
-                institution = ""
-                percentage = ""
-                year = ""
-                
-                # Extract details
-                for line in degree_lines[1:]:
-                    if "college" in line.lower() or "school" in line.lower():
-                        institution = line
-                    elif "percentage" in line.lower() or "grade" in line.lower() or "%" in line:
-                        percentage = line
-                    elif re.search(r"\d{4}\s*[-–]\s*\d{4}", line):
-                        year = line
-                
-                entry = degree
-                if institution:
-                    entry += f" from {institution}"
-                if year:
-                    entry += f" ({year})"
-                if percentage:
-                    entry += f" with {percentage}"
-                
-                validated_entries.append(entry)
+        current["lines"].append(line)
+        for field, value in fields.items():
+            current["fields"][field] = value
+    
+    entries.append(current)
+    
+    return [
+        {
+            "text": " ".join(entry["lines"]),
+            "degree": entry["fields"].get("degree"),
+            "institution": entry["fields"].get("institution"),
+            "dates": entry["fields"].get("dates"),
+            "score": entry["fields"].get("score")
+        }
+        for entry in entries if entry["lines"]
+    ]
+
+def extract_education_details(text, section=None, budget=None):
+    """Extract structured education entries (see parse_education_entries).
+    If the layout pass already located the education section, pass it as `section`
+    to skip header detection."""
+    education_section = section if section is not None else find_education_section(text, budget)
+    if education_section is None:
+        return []
     
-    # Special handling for PV Guru Susmanth's resume format
-    if not validated_entries and "B.E.Electrical" in text:
-        # Direct extraction of specific formats in this resume
-        education_entries = []
-        
-        # Pattern for B.E. degree
-        be_match = re.search(r"B\.E\.(\w+\s*&?\s*\w*)\s*Engineering\n([A-Za-z\s]+)\n([A-Za-z]+\s+\d{4}\s*-\s*[A-Za-z]+\s+\d{4})\nCumulative CGPA[^0-9]*([0-9.]+)/([0-9.]+)", text, re.DOTALL)
-        if be_match:
-            branch, college, period, cgpa, scale = be_match.groups()
-            entry = f"B.E. {branch} Engineering from {college} ({period}) with CGPA {cgpa}/{scale}"
-            validated_entries.append(entry)
-        
-        # Pattern for Diploma
-        diploma_match = re.search(r"Diploma\n([A-Za-z\s]+)\nPass percentage of ([0-9.]+)%", text, re.DOTALL)
-        if diploma_match:
-            institution, percentage = diploma_match.groups()
-            entry = f"Diploma from {institution} with Pass percentage of {percentage}%"
-            validated_entries.append(entry)
-        
-        # Pattern for SSLC
-        sslc_match = re.search(r"SSLC\n([A-Za-z\s,]+)\nWith CGPA of ([0-9.]+)/([0-9.]+)", text, re.DOTALL)
-        if sslc_match:
-            school, cgpa, scale = sslc_match.groups()
-            entry = f"SSLC from {school} with CGPA of {cgpa}/{scale}"
-            validated_entries.append(entry)
+    entries = parse_education_entries(education_section)
     
-    # Return the validated entries if found, otherwise return the original entries
-    return validated_entries if validated_entries else education_entries
+    # If nothing in the section looks like education, return it whole rather than nothing
+    if not entries and education_section.strip():
+        entries = [{"text": education_section.replace("\n", " ").strip(),
+                    "degree": None, "institution": None, "dates": None, "score": None}]
+    
+    return entries
+
+def extract_education(text, section=None, budget=None):
+    """Extract Education Details from various resume formats with improved section header detection.
+    Returns the text of each entry; see extract_education_details for the structured fields."""
+    return [entry["text"] for entry in extract_education_details(text, section, budget)]
 
 import re
 
-def extract_experience(text):
+def extract_experience(text, section=None):
     """
     Extract work experience details from a resume.
     Returns an array of experience entries as strings with all details preserved,
     or an empty array if no experience is found.
+    If the layout pass already located the experience section, pass it as `section`.
     """
     # Extract the experience section
-    experience_section = extract_experience_section(text)
+    experience_section = section if section is not None else extract_experience_section(text)
     if not experience_section:
         return []  # No experience section found
     
-    # Parse individual experience entries
-    entries = parse_experience_entries(experience_section)
-    if not entries:
-        return []
+    # Features are computed once per line and shared by the splitter and the education cutoff
+    lines = experience_section.split('\n')
+    features = compute_line_features(lines)
     
-    # Clean up entries to exclude education or other unrelated content
+    # Parse individual experience entries, truncating any entry at the point
+    # where education content begins
     cleaned_entries = []
-    for entry in entries:
-        if not contains_education_keywords(entry):
+    for start, end in split_experience_lines(lines, features):
+        entry = cut_off_at_education('\n'.join(lines[start:end]).strip(), features[start:end])
+        if entry:
             cleaned_entries.append(entry)
-        else:
-            # Truncate entry if education content is detected
-            cleaned_entry = cut_off_at_education(entry)
-            if cleaned_entry:
-                cleaned_entries.append(cleaned_entry)
     
     return cleaned_entries
 
+@lru_cache(maxsize=None)
+def header_line_pattern(header):
+    """Compile a pattern matching a header on a line of its own."""
+    return re.compile(r"(?:^|\n)\s*" + re.escape(header) + r"\s*(?:$|\n)", re.IGNORECASE)
+
+def header_line_patterns(table_name, text):
+    """
+    Patterns for the headers of a TABLES list that occur in the text.
+    
+    A header that is not in the text cannot match, so its pattern is never
+    compiled; the first request only compiles the handful it needs.
+    """
+    text_lower = text.lower()
+    return [header_line_pattern(header) for header in TABLES[table_name] if header.lower() in text_lower]
+
 def extract_experience_section(text):
     """
-    Extract only the experience section from the resume text.
+    Extract only the experience section from the resume text (a string or DocumentContext).
     Uses a comprehensive list of headers and strict boundary detection.
     """
-    # Define possible experience section headers
-    experience_headers = [
-        r"(?:^|\n)\s*WORK EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*EMPLOYMENT HISTORY\s*(?:$|\n)",
-        r"(?:^|\n)\s*EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*PROFESSIONAL EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*WORK HISTORY\s*(?:$|\n)",
-        r"(?:^|\n)\s*RELEVANT EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*CAREER HISTORY\s*(?:$|\n)",
-        r"(?:^|\n)\s*EMPLOYMENT\s*(?:$|\n)",
-        r"(?:^|\n)\s*PROFESSIONAL BACKGROUND\s*(?:$|\n)",
-        r"(?:^|\n)\s*CAREER EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*JOB EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*INDUSTRY EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*WORK PROFILE\s*(?:$|\n)",
-        r"(?:^|\n)\s*EMPLOYMENT DETAILS\s*(?:$|\n)",
-        r"(?:^|\n)\s*CAREER PROGRESSION\s*(?:$|\n)",
-        r"(?:^|\n)\s*EMPLOYMENT RECORD\s*(?:$|\n)"
-    ]
-    
-    # Define headers that indicate the end of the experience section
-    next_section_headers = [
-        r"(?:^|\n)\s*EDUCATION\s*(?:$|\n)",
-        r"(?:^|\n)\s*SKILLS\s*(?:$|\n)",
-        r"(?:^|\n)\s*CERTIFICATIONS\s*(?:$|\n)",
-        r"(?:^|\n)\s*AWARDS\s*(?:$|\n)",
-        r"(?:^|\n)\s*PROJECTS\s*(?:$|\n)",
-        r"(?:^|\n)\s*ACHIEVEMENTS\s*(?:$|\n)",
-        r"(?:^|\n)\s*PUBLICATIONS\s*(?:$|\n)",
-        r"(?:^|\n)\s*REFERENCES\s*(?:$|\n)",
-        r"(?:^|\n)\s*VOLUNTEER\s*(?:$|\n)",
-        r"(?:^|\n)\s*LANGUAGES\s*(?:$|\n)",
-        r"(?:^|\n)\s*INTERESTS\s*(?:$|\n)",
-        r"(?:^|\n)\s*ADDITIONAL INFORMATION\s*(?:$|\n)",
-        r"(?:^|\n)\s*TRAINING\s*(?:$|\n)",
-        r"(?:^|\n)\s*HOBBIES\s*(?:$|\n)",
-        r"(?:^|\n)\s*TECHNICAL SKILLS\s*(?:$|\n)",
-        r"(?:^|\n)\s*ACADEMIC PROJECTS\s*(?:$|\n)",
-        r"(?:^|\n)\s*COURSEWORK\s*(?:$|\n)",
-        r"(?:^|\n)\s*TECHNICAL PROFICIENCY\s*(?:$|\n)",
-        r"(?:^|\n)\s*LEADERSHIP\s*(?:$|\n)",
-        r"(?:^|\n)\s*Personal Details\s*(?:$|\n)",
-        r"(?:^|\n)\s*Educational Qualification\s*(?:$|\n)"
-    ]
-    
-    # Normalize text
-    text = re.sub(r'\r\n|\r', '\n', text)
-    text = re.sub(r'\n+', '\n', text)
-    text = text.strip()
+    # Line endings normalised, blank lines collapsed
+    text = as_document(text).collapsed_text
     
     # Find the start of the experience section
     start_idx = -1
-    for pattern in experience_headers:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for pattern in header_line_patterns("experience_headers", text):
+        match = pattern.search(text)
         if match:
             if start_idx == -1 or match.start() < start_idx:
                 start_idx = match.end()
@@ -859,17 +1465,104 @@ def extract_experience_section(text):
     if start_idx == -1:
         return ""  # No experience section found
     
-    # Find the end of the experience section
+    # Find the end of the experience section. The search starts on the newline
+    # that ended the start header, so a header on the very next line still
+    # matches, without copying the rest of the text for every pattern.
     end_idx = len(text)
-    for pattern in next_section_headers:
-        match = re.search(pattern, text[start_idx:], re.IGNORECASE)
+    for pattern in header_line_patterns("experience_end_headers", text):
+        match = pattern.search(text, start_idx - 1)
         if match:
-            temp_end_idx = start_idx + match.start()
-            if temp_end_idx < end_idx:
-                end_idx = temp_end_idx
+            end_idx = min(end_idx, max(match.start(), start_idx))
     
     return text[start_idx:end_idx].strip()
 
+# Patterns used to recognise the first line of an experience entry
+EXPERIENCE_DATE_PATTERN = re.compile(r'(?:\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4}\b|(?:19|20)\d{2})\s*[-–—]\s*(?:\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4}\b|(?:19|20)\d{2}|Present|Current|Now)', re.IGNORECASE)
+JOB_TITLE_PATTERN = re.compile(r'\b(?:Senior|Junior|Lead|Chief|Principal|Associate|Assistant|Head|VP|Director|Executive|Manager)?\s*(?:Software|Systems|Data|Project|Product|Marketing|Sales|HR|Human Resources|Financial|Finance|Web|UI\/UX|Frontend|Backend|Full[ -]Stack|DevOps|QA|Test|Operations|Business|Research)?\s*(?:Engineer|Developer|Analyst|Manager|Consultant|Coordinator|Specialist|Director|Designer|Architect|Intern|Administrator|Officer|Executive|Representative|Associate|Lead|Scientist)\b', re.IGNORECASE)
+COMPANY_PATTERN = re.compile(r'\b[A-Z][A-Za-z0-9\s,\.&\'-]+(?:Inc|LLC|Ltd|Corporation|Corp|Company|Co|Group|GmbH)?\b', re.IGNORECASE)
+
+# Education keywords that mark the end of an experience entry, combined into a
+# single alternation so each line is searched once
+EDUCATION_KEYWORD_PATTERN = re.compile('|'.join([
+    r'\bEDUCATION\b',
+    r'\bDEGREE\b',
+    r'\bB\.?S\.?\b', r'\bB\.?A\.?\b', r'\bM\.?S\.?\b', r'\bM\.?A\.?\b', r'\bPh\.?D\.?\b',
+    r'\bBachelor(?:\'?s)?\b', r'\bMaster(?:\'?s)?\b', r'\bDoctorate\b',
+    r'\bUniversity\b', r'\bCollege\b', r'\bInstitute\b', r'\bSchool\b',
+    r'\bAcademic\b', r'\bGPA\b', r'\bCourse(?:work)?\b',
+    r'\bMajor\b', r'\bMinor\b', r'\bGraduate[d]?\b',
+    r'\bClass of\b', r'\bCommencement\b'
+]), re.IGNORECASE)
+
+LineFeatures = namedtuple("LineFeatures", ["blank", "has_date", "has_title", "has_company", "has_education"])
+
+def compute_line_features(lines):
+    """
+    Compute the features the experience pipeline needs for each line, once.
+    
+    Job title and company are only looked for on lines with a date range,
+    the only lines where the entry splitter uses them.
+    
+    Args:
+        lines (list): Lines of the experience section
+        
+    Returns:
+        list: One LineFeatures per line
+    """
+    features = []
+    for line in lines:
+        has_date = bool(EXPERIENCE_DATE_PATTERN.search(line))
+        features.append(LineFeatures(
+            blank=not line.strip(),
+            has_date=has_date,
+            has_title=has_date and bool(JOB_TITLE_PATTERN.search(line)),
+            has_company=has_date and bool(COMPANY_PATTERN.search(line)),
+            has_education=bool(EDUCATION_KEYWORD_PATTERN.search(line))
+        ))
+    return features
+
+def split_experience_lines(lines, features):
+    """
+    Split the experience section into entries, as ranges of line indexes.
+    
+    Strategy 1 splits on blank lines. Without blank lines, strategy 2 starts
+    a new entry at every line with a date and a job title or company that is
+    not a bullet point. If that finds a single entry, the whole section is one.
+    
+    Args:
+        lines (list): Lines of the experience section
+        features (list): LineFeatures for each line
+        
+    Returns:
+        list: (start, end) line index ranges of the entries
+    """
+    spans = []
+    if any(feature.blank for feature in features):
+        # Strategy 1: Split by blank lines
+        start = None
+        for i, feature in enumerate(features):
+            if feature.blank:
+                if start is not None:
+                    spans.append((start, i))
+                start = None
+            elif start is None:
+                start = i
+        if start is not None:
+            spans.append((start, len(lines)))
+        return spans
+    
+    # Strategy 2: Split by date and job/company headers
+    start = 0
+    for i, (line, feature) in enumerate(zip(lines, features)):
+        starts_entry = feature.has_date and (feature.has_title or feature.has_company) \
+            and not line.strip().startswith(('-', '•', '*'))
+        if starts_entry and i > start:
+            spans.append((start, i))
+            start = i
+    spans.append((start, len(lines)))
+    
+    return spans if len(spans) > 1 else [(0, len(lines))]
+
 def parse_experience_entries(experience_section):
     """
     Parse individual experience entries from the experience section.
@@ -878,110 +1571,302 @@ def parse_experience_entries(experience_section):
     if not experience_section:
         return []
     
-    # Define patterns for identifying new entries
-    date_pattern = r'(?:\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4}\b|(?:19|20)\d{2})\s*[-–—]\s*(?:\b(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{4}\b|(?:19|20)\d{2}|Present|Current|Now)'
-    job_title_pattern = r'\b(?:Senior|Junior|Lead|Chief|Principal|Associate|Assistant|Head|VP|Director|Executive|Manager)?\s*(?:Software|Systems|Data|Project|Product|Marketing|Sales|HR|Human Resources|Financial|Finance|Web|UI\/UX|Frontend|Backend|Full[ -]Stack|DevOps|QA|Test|Operations|Business|Research)?\s*(?:Engineer|Developer|Analyst|Manager|Consultant|Coordinator|Specialist|Director|Designer|Architect|Intern|Administrator|Officer|Executive|Representative|Associate|Lead|Scientist)\b'
-    company_pattern = r'\b[A-Z][A-Za-z0-9\s,\.&\'-]+(?:Inc|LLC|Ltd|Corporation|Corp|Company|Co|Group|GmbH)?\b'
+    lines = experience_section.split('\n')
+    spans = split_experience_lines(lines, compute_line_features(lines))
+    entries = ['\n'.join(lines[start:end]) for start, end in spans]
+    return [entry.strip() for entry in entries if entry.strip()]
+
+def contains_education_keywords(text):
+    """
+    Check if text contains education-related keywords.
+    """
+    return bool(EDUCATION_KEYWORD_PATTERN.search(text))
+
+def cut_off_at_education(text, features=None):
+    """
+    Truncate text at the point where education-related content begins.
+    Pass the LineFeatures of the text's lines as `features` if already computed.
+    """
+    lines = text.split('\n')
+    features = features or compute_line_features(lines)
+    for i, feature in enumerate(features):
+        if feature.has_education:
+            return '\n'.join(lines[:i]).strip() if i > 0 else ""
+    return text
+
+# Pieces of a date range: "Jun 2018", "2018", or an open end
+DATE_POINT_PATTERN = re.compile(r'\b(?:(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+)?(\d{4})\b|\b(Present|Current|Now)\b', re.IGNORECASE)
+MONTH_NUMBERS = {month: i for i, month in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+
+def month_index(year, month):
+    """Count months from year 0 so date arithmetic is plain subtraction."""
+    return year * 12 + month - 1
+
+def current_month_index():
+    today = date.today()
+    return month_index(today.year, today.month)
+
+def format_month_index(index):
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+@lru_cache(maxsize=4096)
+def parse_date_range(entry):
+    """
+    Parse the first date range in an experience entry.
     
-    entries = []
+    Uses the same month/year forms as the entry splitter. A bare year counts
+    from January; an open end ("Present", "Current", "Now") is returned as None.
     
-    # Strategy 1: Split by blank lines
-    blank_line_entries = re.split(r'\n\s*\n', experience_section)
-    if len(blank_line_entries) > 1:
-        entries = [entry.strip() for entry in blank_line_entries if entry.strip()]
-    else:
-        # Strategy 2: Split by date and job/company headers
-        lines = experience_section.split('\n')
-        current_entry = []
-        all_entries = []
-        
-        for line in lines:
-            date_match = re.search(date_pattern, line, re.IGNORECASE)
-            job_match = re.search(job_title_pattern, line, re.IGNORECASE)
-            company_match = re.search(company_pattern, line, re.IGNORECASE)
-            
-            # Start a new entry if line has a date and job/company info
-            if date_match and (job_match or company_match) and not line.strip().startswith(('-', '•', '*')):
-                if current_entry:
-                    all_entries.append('\n'.join(current_entry))
-                current_entry = [line]
-            elif line.strip():  # Only append non-empty lines
-                current_entry.append(line)
-        
-        if current_entry:
-            all_entries.append('\n'.join(current_entry))
+    Args:
+        entry (str): Experience entry text
         
-        entries = all_entries if len(all_entries) > 1 else [experience_section]
+    Returns:
+        tuple: (start month index, end month index or None), or None if no range was found
+    """
+    match = EXPERIENCE_DATE_PATTERN.search(entry)
+    if not match:
+        return None
+    
+    points = []
+    for month, year, open_end in DATE_POINT_PATTERN.findall(match.group(0)):
+        if open_end:
+            points.append(None)
+        else:
+            points.append(month_index(int(year), MONTH_NUMBERS[month[:3].lower()] if month else 1))
+    if len(points) < 2 or points[0] is None:
+        return None
+    return points[0], points[1]
+
+def extract_experience_details(entries):
+    """
+    Turn experience entries into structured records.
     
-    return [entry.strip() for entry in entries if entry.strip()]
+    Args:
+        entries (list): Experience entries as returned by extract_experience
+        
+    Returns:
+        list: Dicts with the entry's first line as title, the rest as description,
+              start and end month ("YYYY-MM", end may be "present") and tenure in months
+    """
+    now = current_month_index()
+    details = []
+    for entry in entries:
+        first_line, _, description = entry.partition('\n')
+        date_range = parse_date_range(entry)
+        detail = {"title": first_line.strip(), "description": description.strip(),
+                  "start": None, "end": None, "months": None}
+        if date_range:
+            start, end = date_range
+            detail["start"] = format_month_index(start)
+            detail["end"] = format_month_index(end) if end is not None else "present"
+            detail["months"] = max(0, (now if end is None else end) - start)
+        details.append(detail)
+    return details
 
-def contains_education_keywords(text):
+def total_experience_months(details):
+    """Total tenure across experience records, counting overlapping periods once."""
+    now = current_month_index()
+    periods = sorted(
+        (month_index(*map(int, detail["start"].split("-"))),
+         now if detail["end"] == "present" else month_index(*map(int, detail["end"].split("-"))))
+        for detail in details if detail["start"]
+    )
+    total = 0
+    covered_until = None
+    for start, end in periods:
+        if covered_until is not None and start < covered_until:
+            start = covered_until
+        if end > start:
+            total += end - start
+            covered_until = end if covered_until is None else max(covered_until, end)
+    return total
+
+def tenure_row(details):
     """
-    Check if text contains education-related keywords.
+    Reduce experience records to a tenure index row.
+    
+    Returns:
+        tuple: (total months of experience, month index of the last role's end, -1 if current)
     """
-    education_keywords = [
-        r'\bEDUCATION\b',
-        r'\bDEGREE\b',
-        r'\bB\.?S\.?\b', r'\bB\.?A\.?\b', r'\bM\.?S\.?\b', r'\bM\.?A\.?\b', r'\bPh\.?D\.?\b',
-        r'\bBachelor(?:\'?s)?\b', r'\bMaster(?:\'?s)?\b', r'\bDoctorate\b',
-        r'\bUniversity\b', r'\bCollege\b', r'\bInstitute\b', r'\bSchool\b',
-        r'\bAcademic\b', r'\bGPA\b', r'\bCourse(?:work)?\b',
-        r'\bMajor\b', r'\bMinor\b', r'\bGraduate[d]?\b',
-        r'\bClass of\b', r'\bCommencement\b'
+    ends = [
+        -1 if detail["end"] == "present" else month_index(*map(int, detail["end"].split("-")))
+        for detail in details if detail["end"]
     ]
+    return total_experience_months(details), -1 if -1 in ends else max(ends, default=0)
+
+def tenure_bounds(min_months, max_months, ended_within_months):
+    """Turn query arguments into (lowest total, highest total, earliest last end or None)."""
+    return (
+        min_months if min_months is not None else 0,
+        max_months if max_months is not None else float("inf"),
+        current_month_index() - ended_within_months if ended_within_months is not None else None
+    )
+
+class TenureIndex:
+    """
+    Columnar side index of candidate tenure for filtering without re-parsing text.
+    
+    Each candidate is one row, keyed by tenant and document digest; the
+    numeric columns are kept in compact arrays so queries only scan
+    integers. Candidates still in a role store an end of -1 and count as
+    ending in the current month. Beyond max_entries rows the least recently
+    added one is dropped, its place taken by the last row. The index lives
+    in the worker process that parsed the resume.
+    """
     
-    for keyword in education_keywords:
-        if re.search(keyword, text, re.IGNORECASE):
-            return True
-    return False
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.keys = []
+        self.filenames = []
+        self.total_months = array('l')
+        self.last_end = array('l')
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def add(self, tenant, digest, filename, details):
+        """Add or replace a candidate's row from their experience records."""
+        if self.max_entries <= 0:
+            return
+        total, last_end = tenure_row(details)
+        key = (tenant, digest)
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                row = self._rows[key] = len(self.keys)
+                self.keys.append(key)
+                self.filenames.append(filename)
+                self.total_months.append(total)
+                self.last_end.append(last_end)
+            else:
+                self._rows.move_to_end(key)
+                self.filenames[row] = filename
+                self.total_months[row] = total
+                self.last_end[row] = last_end
+            while len(self.keys) > self.max_entries:
+                self._evict_oldest()
+    
+    def _evict_oldest(self):
+        row = self._rows.pop(next(iter(self._rows)))
+        last = len(self.keys) - 1
+        if row != last:
+            # Move the last row into the freed slot so the columns stay dense
+            self.keys[row] = self.keys[last]
+            self.filenames[row] = self.filenames[last]
+            self.total_months[row] = self.total_months[last]
+            self.last_end[row] = self.last_end[last]
+            self._rows[self.keys[row]] = row
+        self.keys.pop()
+        self.filenames.pop()
+        self.total_months.pop()
+        self.last_end.pop()
+    
+    def query(self, tenant, min_months=None, max_months=None, ended_within_months=None):
+        """
+        Find a tenant's candidates by total tenure and recency of their last role.
+        
+        Args:
+            tenant (str): Tenant whose candidates are searched
+            min_months (int, optional): Minimum total tenure
+            max_months (int, optional): Maximum total tenure
+            ended_within_months (int, optional): Last role ended at most this many months ago
+            
+        Returns:
+            list: (digest, filename, total months) of the matching candidates
+        """
+        low, high, earliest_end = tenure_bounds(min_months, max_months, ended_within_months)
+        
+        with self._lock:
+            matches = []
+            for row, total in enumerate(self.total_months):
+                if not low <= total <= high:
+                    continue
+                if earliest_end is not None:
+                    end = self.last_end[row]
+                    if end != -1 and end < earliest_end:
+                        continue
+                row_tenant, digest = self.keys[row]
+                if row_tenant == tenant:
+                    matches.append((digest, self.filenames[row], total))
+            return matches
 
-def cut_off_at_education(text):
+class SqliteTenureIndex:
     """
-    Truncate text at the point where education-related content begins.
+    The tenure index in an SQLite database, shared by every worker that
+    opens the same file. Same interface as TenureIndex; rows beyond
+    max_entries are dropped least recently added first.
     """
-    education_keywords = [
-        r'\bEDUCATION\b',
-        r'\bDEGREE\b',
-        r'\bB\.?S\.?\b', r'\bB\.?A\.?\b', r'\bM\.?S\.?\b', r'\bM\.?A\.?\b', r'\bPh\.?D\.?\b',
-        r'\bBachelor(?:\'?s)?\b', r'\bMaster(?:\'?s)?\b', r'\bDoctorate\b',
-        r'\bUniversity\b', r'\bCollege\b', r'\bInstitute\b', r'\bSchool\b',
-        r'\bAcademic\b', r'\bGPA\b', r'\bCourse(?:work)?\b',
-        r'\bMajor\b', r'\bMinor\b', r'\bGraduate[d]?\b',
-        r'\bClass of\b', r'\bCommencement\b'
-    ]
     
-    lines = text.split('\n')
-    for i, line in enumerate(lines):
-        for keyword in education_keywords:
-            if re.search(keyword, line, re.IGNORECASE):
-                return '\n'.join(lines[:i]).strip() if i > 0 else ""
-    return text
+    def __init__(self, path, max_entries):
+        import sqlite3  # only needed when a shared index is configured
+        
+        self.max_entries = max_entries
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS tenure (tenant TEXT, digest TEXT, filename TEXT, "
+                "total_months INTEGER, last_end INTEGER, added INTEGER, PRIMARY KEY (tenant, digest))"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS tenure_added ON tenure (added)")
+    
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM tenure").fetchone()[0]
+    
+    def add(self, tenant, digest, filename, details):
+        """Add or replace a candidate's row from their experience records."""
+        if self.max_entries <= 0:
+            return
+        total, last_end = tenure_row(details)
+        with self._lock:
+            # One transaction, so concurrent workers never see the index above its bound
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO tenure VALUES (?, ?, ?, ?, ?, "
+                    "(SELECT COALESCE(MAX(added), 0) + 1 FROM tenure))",
+                    (tenant, digest, filename, total, last_end)
+                )
+                self._connection.execute(
+                    "DELETE FROM tenure WHERE added <= (SELECT MAX(added) FROM tenure) - ?",
+                    (self.max_entries,)
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+    
+    def query(self, tenant, min_months=None, max_months=None, ended_within_months=None):
+        """Find a tenant's candidates by tenure; see TenureIndex.query."""
+        low, high, earliest_end = tenure_bounds(min_months, max_months, ended_within_months)
+        sql = "SELECT digest, filename, total_months FROM tenure WHERE tenant = ? AND total_months >= ?"
+        parameters = [tenant, low]
+        if high != float("inf"):
+            sql += " AND total_months <= ?"
+            parameters.append(high)
+        if earliest_end is not None:
+            sql += " AND (last_end = -1 OR last_end >= ?)"
+            parameters.append(earliest_end)
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+# Tenure of the candidates parsed by this worker, or by all of them with TENURE_INDEX_PATH
+if app.config["TENURE_INDEX_PATH"]:
+    tenure_index = SqliteTenureIndex(app.config["TENURE_INDEX_PATH"], app.config["TENURE_INDEX_SIZE"])
+else:
+    tenure_index = TenureIndex(app.config["TENURE_INDEX_SIZE"])
 
 def has_work_experience_section(text):
     """
     Check if the resume contains a work experience section.
     """
-    experience_headers = [
-        r"(?:^|\n)\s*WORK EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*EMPLOYMENT HISTORY\s*(?:$|\n)",
-        r"(?:^|\n)\s*EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*PROFESSIONAL EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*WORK HISTORY\s*(?:$|\n)",
-        r"(?:^|\n)\s*RELEVANT EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*CAREER HISTORY\s*(?:$|\n)",
-        r"(?:^|\n)\s*EMPLOYMENT\s*(?:$|\n)",
-        r"(?:^|\n)\s*PROFESSIONAL BACKGROUND\s*(?:$|\n)",
-        r"(?:^|\n)\s*CAREER EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*JOB EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*INDUSTRY EXPERIENCE\s*(?:$|\n)",
-        r"(?:^|\n)\s*WORK PROFILE\s*(?:$|\n)",
-        r"(?:^|\n)\s*EMPLOYMENT DETAILS\s*(?:$|\n)",
-        r"(?:^|\n)\s*CAREER PROGRESSION\s*(?:$|\n)",
-        r"(?:^|\n)\s*EMPLOYMENT RECORD\s*(?:$|\n)"
-    ]
-    
-    for pattern in experience_headers:
-        if re.search(pattern, text, re.IGNORECASE):
+    for pattern in header_line_patterns("experience_headers", text):
+        if pattern.search(text):
             return True
     return False
 
@@ -1026,62 +1911,55 @@ def process_resume(text):
 #         print(entry)
 #         print()
 
-def extract_skills(text):
-    """Extract skills with strict pattern matching for predefined keywords."""
-    # Predefined skill categories
-    skill_categories = {
-        "Programming Languages": [
-            "python", "java", "c++", "c#", "javascript", "typescript", 
-            "ruby", "php", "swift", "kotlin", "go", "rust", "scala"
-        ],
-        "Web Technologies": [
-            "html", "css", "react", "angular", "vue", "django", 
-            "flask", "nodejs", "express", "spring", ".net", "asp.net"
-        ],
-        "Databases": [
-            "mysql", "postgresql", "mongodb", "sqlite", "oracle", 
-            "sql", "nosql", "redis", "cassandra" , "power bi", "Excel", "Tableau"
-        ],
-        "Cloud Platforms": [
-            "aws", "azure", "google cloud", "heroku", "digital ocean", 
-            "amazon web services", "cloud computing"
-        ],
-        "DevOps & Tools": [
-            "docker", "kubernetes", "jenkins", "git", "github", "ms office",
-            "gitlab", "ansible", "terraform", "ci/cd"
-        ],
-        "Machine Learning & AI": [
-            "tensorflow", "pytorch", "scikit-learn", "keras", "numpy", "pandas", "matlab & simulink",
-            "machine learning", "deep learning", "nlp", "computer vision"
-        ],
-        "Frameworks": [
-            "spring boot", "django", "flask", "react", "angular", 
-            "vue", "laravel", "symfony", "express"
-        ]
-    }
+@lru_cache(maxsize=None)
+def skill_keywords():
+    """Every predefined skill keyword, lowercased and without duplicates."""
+    return list(dict.fromkeys(
+        keyword.lower() for category in TABLES["skill_categories"].values() for keyword in category
+    ))
+
+@lru_cache(maxsize=None)
+def skill_pattern(keyword):
+    """Compile a whole-word pattern for a skill keyword."""
+    return re.compile(r'\b' + re.escape(keyword) + r'\b')
 
-    # Combine keywords from all categories (already lowercased)
-    all_keywords = [keyword.lower() for category in skill_categories.values() for keyword in category]
+def has_skill(keyword, text_lower):
+    """Check for the keyword as a whole word. Its pattern is only compiled once
+    the keyword occurs in some text, so most are never compiled."""
+    return keyword in text_lower and skill_pattern(keyword).search(text_lower) is not None
 
+def extract_skills(text, section=None, budget=None):
+    """Extract skills with strict pattern matching for predefined keywords.
+    If the layout pass already located the skills section, pass it as `section`.
+    The whole-document search is a fallback of `budget`."""
+    document = as_document(text)
     skills = set()
     
     # Extract skills section
-    skills_section, _ = extract_section(text, ["Skills", "Technical Skills", "Competencies", "Expertise"])
+    if section is not None:
+        skills_section = section
+    else:
+        skills_section, _ = extract_section(document.text, ["Skills", "Technical Skills", "Competencies", "Expertise"])
     
     if skills_section:
         skills_section_lower = skills_section.lower()
-        for keyword in all_keywords:
+        for keyword in skill_keywords():
             # Check for exact match of the keyword as a whole word/phrase
-            if re.search(r'\b' + re.escape(keyword) + r'\b', skills_section_lower):
+            if has_skill(keyword, skills_section_lower):
                 skills.add(keyword)
         if skills:
             return list(skills)
     
     # Fallback: Search entire document
-    text_lower = text.lower()
-    for keyword in all_keywords:
+    if not use_fallback(budget, "skills"):
+        return list(skills)
+    text_lower = document.lower
+    for keyword in skill_keywords():
+        if budget is not None and budget.expired():
+            budget.truncated("skills")
+            break
         # Check for exact match of the keyword as a whole word/phrase
-        if re.search(r'\b' + re.escape(keyword) + r'\b', text_lower):
+        if has_skill(keyword, text_lower):
             skills.add(keyword)
     
     return list(skills)
@@ -1106,65 +1984,27 @@ def is_section_header(line, headers):
             return True
     return False
 
-def extract_projects(text):
+def extract_projects(text, section=None):
     """
     Extract project details from the resume, capturing all descriptions under the section title.
     
     Args:
-        text (str): The resume text content
+        text (str or DocumentContext): The resume text content
+        section (str, optional): Projects section already located by the layout pass
         
     Returns:
-        list: List of strings, each representing a project entry with its full description
-    """
-    # Expanded list of possible project section headers
-    project_headers = [
-        "Projects",
-        "PROJECTS",
-        "Project",
-        "Project Details",
-        "Professional Projects",
-        "Academic Projects",
-        "Project Experience",
-        "Personal Projects",
-        "Key Projects"
-    ]
-    
-    # Define all possible section headers to detect the end of the projects section
-    all_section_headers = [
-        "Summary",
-        "Objective",
-        "Education",
-        "Work Experience",
-        "Professional Experience",
-        "Skills",
-        "Technical Skills",
-        "Certifications",
-        "Certificates",
-        "Awards",
-        "Publications",
-        "References",
-        "Experience",
-        "Internships",
-        "Achievements",
-        "Hobbies",
-        "Certification courses",
-        "courses",
-        "Presentations",
-        "Declaration",
-        "Extra curricular activities",
-        "Education background",
-        "Introduction",
-        "Workshops",
-        "Personal profile"
-    ]
+        list: List of strings, each representing a project entry with its full description
+    """
+    if section is not None:
+        return parse_project_entries(section)
     
     # Split the text into lines for processing
-    lines = text.split('\n')
+    lines = as_document(text).lines
     
     # Find the start of the projects section
     start_line = None
     for i, line in enumerate(lines):
-        if is_section_header(line, project_headers):
+        if is_section_header(line, TABLES["project_headers"]):
             start_line = i
             break
     
@@ -1175,7 +2015,7 @@ def extract_projects(text):
     # Find the end of the projects section
     end_line = len(lines)
     for j in range(start_line + 1, len(lines)):
-        if is_section_header(lines[j], all_section_headers):
+        if is_section_header(lines[j], TABLES["project_end_headers"]):
             end_line = j
             break
     
@@ -1183,6 +2023,20 @@ def extract_projects(text):
     section_lines = lines[start_line + 1:end_line]
     projects_section = '\n'.join(section_lines).strip()
     
+    return parse_project_entries(projects_section)
+
+def parse_project_entries(projects_section):
+    """
+    Parse the projects section into individual project entries.
+    
+    Args:
+        projects_section (str): The text content of the projects section
+        
+    Returns:
+        list: List of project entries
+    """
+    projects_section = projects_section.strip()
+    
     # If the section is empty, return an empty list
     if not projects_section:
         return []
@@ -1248,37 +2102,10 @@ def extract_section(text, possible_headers):
     start_match = matches[0]
     start_pos = start_match.start()
     
-    # Comprehensive list of common resume section headers
-    all_possible_headers = [
-        "Objective", "Career Objective", "Professional Objective", "Carrer Objectives",
-        "Summary", "Professional Summary", "Summary of Qualifications",
-        "Profile", "Personal Profile", "Professional Profile",
-        "Education", "Academic Background", "Educational Qualifications", "Educational Qualification", "Degrees", "Academic Achievements",
-        "Experience", "Work Experience", "Professional Experience", "Employment History", "Work History", "Career History",
-        "Internships", "Co-op Experience", "Volunteer Experience", 
-        "Skills", "Technical Skills", "Professional Skills", "Key Skills", "Core Competencies", "Areas of Expertise", "Proficiencies",
-        "Languages", "Programming Languages", "Software Skills", "Tools and Technologies",
-        "Certifications", "Licenses", "Professional Certifications", "Technical Certifications", "Training and Certifications", "Professional Development",
-        "Courses", "Workshops", "Seminars", "Conferences",
-        "Projects", "Academic Projects", "Research Projects", "Personal Projects", "Portfolio", "Project", "Achievements",
-        "Awards", "Honors", "Scholarships",
-        "Publications", "Patents", "Presentations",
-        "Activities", "Extracurricular Activities", "Leadership", "Memberships", "Professional Affiliations",
-        "Volunteer Work", "Community Service",
-        "Interests", "Hobbies", "Personal Interests",
-        "References", "Testimonials", "Recommendations",
-        "Contact Information", "Personal Details", "About Me",
-        "Declaration", "Additional Information", "Miscellaneous",
-        "Organizations", "Enthusiastic"
-    ]
-    
-    # Generate patterns for all possible headers
-    section_headers = [r'(?im)^' + re.escape(header) + r'[:\s]' for header in all_possible_headers]
-    
     # Determine the end of the section
     end_pos = len(text)
-    for pattern in section_headers:
-        next_section_match = re.search(pattern, text[start_pos + 1:])
+    for pattern in section_header_patterns(text):
+        next_section_match = pattern.search(text[start_pos + 1:])
         if next_section_match:
             candidate_end_pos = start_pos + 1 + next_section_match.start()
             if candidate_end_pos < end_pos:
@@ -1289,6 +2116,17 @@ def extract_section(text, possible_headers):
     
     return section_content, end_pos
 
+@lru_cache(maxsize=None)
+def section_header_pattern(header):
+    """Compile a pattern for a section header at the start of a line."""
+    return re.compile(r'(?im)^' + re.escape(header) + r'[:\s]')
+
+def section_header_patterns(text):
+    """Patterns for the common resume section headers that end a section, for
+    the headers that occur in the text (the others are never compiled)."""
+    text_lower = text.lower()
+    return [section_header_pattern(header) for header in TABLES["section_headers"] if header.lower() in text_lower]
+
 def parse_certification_entries(certifications_section):
     """
     Parse the certification section into individual entries.
@@ -1335,29 +2173,28 @@ def parse_certification_entries(certifications_section):
         entries = re.split(r'\n\s*\n', certifications_section)
         return [entry.strip() for entry in entries if entry.strip()]
 
-def extract_certifications(text):
+def extract_certifications(text, section=None, budget=None):
     """
     Extract certification details from the resume, capturing all descriptions under the section title.
     
     Args:
-        text (str): The resume text content
+        text (str or DocumentContext): The resume text content
+        section (str, optional): Certifications section already located by the layout pass
+        budget (ExtractionBudget, optional): Decides whether the "certified in" search may run
         
     Returns:
         list: List of strings, each representing a certification entry with its full description
     """
-    # Possible certification section headers
-    certification_headers = [
-        "Certifications", "Certificate", "Certificates", "CERTIFICATES", "Courses", "CERTIFICATION COURSES", 
-        "Professional Certifications", "Licenses", "Certification", "Internships", 
-        "Training and Certifications", "Professional Development", "CERTIFICATIONS",
-        "CERTIFICATION", "Certified In", "Certification and Achievements", "Internships Certifications"
-    ]
+    text = as_document(text).text
     
     # Extract the certifications section
-    certifications_section, _ = extract_section(text, certification_headers)
+    if section is not None:
+        certifications_section = section
+    else:
+        certifications_section, _ = extract_section(text, TABLES["certification_headers"])
     
     # Fallback if no dedicated section is found
-    if not certifications_section:
+    if not certifications_section and use_fallback(budget, "certifications"):
         cert_keywords = [
             r'(?i)certified in', r'(?i)certification in',
             r'(?i)certificate in', r'(?i)certified as'
@@ -1367,6 +2204,9 @@ def extract_certifications(text):
             if keyword_matches:
                 cert_info = []
                 for match in keyword_matches:
+                    if budget is not None and budget.expired():
+                        budget.truncated("certifications")
+                        break
                     start = max(0, match.start() - 50)
                     end = min(len(text), match.end() + 100)
                     context = text[start:end]
@@ -1432,6 +2272,9 @@ def generate_ats_score(parsed_data):
     
     # 3. Experience Evaluation (35 points)
     experience_score = 0
+    experience_details = parsed_data.get("experience_details")
+    if experience_details is None:
+        experience_details = extract_experience_details(parsed_data["experience"])
     if parsed_data["experience"] and len(parsed_data["experience"]) > 0:
         # Base points for having experience listed
         experience_score += 10
@@ -1443,7 +2286,7 @@ def generate_ats_score(parsed_data):
         # Additional points for experience descriptions
         has_descriptions = any(
             "description" in exp and exp["description"] and len(exp["description"]) > 10 
-            for exp in parsed_data["experience"]
+            for exp in experience_details
         )
         if has_descriptions:
             experience_score += 10
@@ -1479,7 +2322,7 @@ def generate_ats_score(parsed_data):
         "experience": {
             "score": experience_score,
             "max": 35,
-            "feedback": get_experience_feedback(parsed_data["experience"])
+            "feedback": get_experience_feedback(experience_details)
         },
         "skills": {
             "score": skills_score,
@@ -1496,8 +2339,41 @@ def generate_ats_score(parsed_data):
         "rating": get_rating(score)
     }
 
-def get_contact_feedback(contact_details):
-    """Generate feedback on contact information."""
+# Feedback sentences by section and code. Codes with a value take it as the
+# {} argument: a count, or a list of missing fields. The compact response
+# profile sends "code" or "code:value" instead of the sentence.
+FEEDBACK_MESSAGES = {
+    "contact": {
+        "complete": "All essential contact information provided.",
+        "missing": "Missing {}. Complete contact information improves ATS visibility."
+    },
+    "education": {
+        "none": "No education details found. Adding educational background enhances your profile.",
+        "basic": "Basic education information provided. Consider adding more details about courses, achievements, or additional certifications.",
+        "strong": "Strong education section with {} entries. Well structured educational background."
+    },
+    "experience": {
+        "none": "No work experience found. Adding relevant work history is crucial for most positions.",
+        "no_descriptions": "{} work experiences listed, but detailed descriptions are missing. Add specific accomplishments and responsibilities.",
+        "few": "{} work experiences with descriptions. Consider adding more relevant work history if available.",
+        "strong": "Strong work history with {} detailed positions. Good demonstration of career progression."
+    },
+    "skills": {
+        "none": "No skills listed. Adding relevant skills significantly improves ATS matching.",
+        "few": "Only {} skills listed. Consider expanding your skills section with both technical and soft skills.",
+        "good": "{} skills listed. Good range of skills, but consider adding more industry-specific keywords.",
+        "excellent": "Excellent skills section with {} skills. Good balance of technical and professional skills."
+    }
+}
+
+def render_feedback(section, code, value=None):
+    """Turn a feedback code into its sentence."""
+    if isinstance(value, list):
+        value = ", ".join(value)
+    return FEEDBACK_MESSAGES[section][code].format(value)
+
+def contact_feedback_code(contact_details):
+    """Feedback code for contact information: complete, or the missing fields."""
     missing = []
     if contact_details["Name"] == "Not Found":
         missing.append("name")
@@ -1507,23 +2383,24 @@ def get_contact_feedback(contact_details):
         missing.append("phone number")
     
     if not missing:
-        return "All essential contact information provided."
+        return "complete", None
     else:
-        return f"Missing {', '.join(missing)}. Complete contact information improves ATS visibility."
+        return "missing", missing
 
-def get_education_feedback(education):
-    """Generate feedback on education section."""
+def education_feedback_code(education):
+    """Feedback code for the education section."""
     if not education or len(education) == 0:
-        return "No education details found. Adding educational background enhances your profile."
+        return "none", None
     elif len(education) == 1:
-        return "Basic education information provided. Consider adding more details about courses, achievements, or additional certifications."
+        return "basic", None
     else:
-        return f"Strong education section with {len(education)} entries. Well structured educational background."
+        return "strong", len(education)
 
-def get_experience_feedback(experience):
-    """Generate feedback on work experience section."""
+def experience_feedback_code(experience):
+    """Feedback code for the work experience section.
+    Expects the structured records from extract_experience_details."""
     if not experience or len(experience) == 0:
-        return "No work experience found. Adding relevant work history is crucial for most positions."
+        return "none", None
     
     has_descriptions = any(
         "description" in exp and exp["description"] and len(exp["description"]) > 10 
@@ -1531,22 +2408,39 @@ def get_experience_feedback(experience):
     )
     
     if not has_descriptions:
-        return f"{len(experience)} work experiences listed, but detailed descriptions are missing. Add specific accomplishments and responsibilities."
+        return "no_descriptions", len(experience)
     elif len(experience) <= 2:
-        return f"{len(experience)} work experiences with descriptions. Consider adding more relevant work history if available."
+        return "few", len(experience)
     else:
-        return f"Strong work history with {len(experience)} detailed positions. Good demonstration of career progression."
+        return "strong", len(experience)
 
-def get_skills_feedback(skills):
-    """Generate feedback on skills section."""
+def skills_feedback_code(skills):
+    """Feedback code for the skills section."""
     if not skills or len(skills) == 0:
-        return "No skills listed. Adding relevant skills significantly improves ATS matching."
+        return "none", None
     elif len(skills) < 5:
-        return f"Only {len(skills)} skills listed. Consider expanding your skills section with both technical and soft skills."
+        return "few", len(skills)
     elif len(skills) < 10:
-        return f"{len(skills)} skills listed. Good range of skills, but consider adding more industry-specific keywords."
+        return "good", len(skills)
     else:
-        return f"Excellent skills section with {len(skills)} skills. Good balance of technical and professional skills."
+        return "excellent", len(skills)
+
+def get_contact_feedback(contact_details):
+    """Generate feedback on contact information."""
+    return render_feedback("contact", *contact_feedback_code(contact_details))
+
+def get_education_feedback(education):
+    """Generate feedback on education section."""
+    return render_feedback("education", *education_feedback_code(education))
+
+def get_experience_feedback(experience):
+    """Generate feedback on work experience section.
+    Expects the structured records from extract_experience_details."""
+    return render_feedback("experience", *experience_feedback_code(experience))
+
+def get_skills_feedback(skills):
+    """Generate feedback on skills section."""
+    return render_feedback("skills", *skills_feedback_code(skills))
 
 def get_rating(score):
     """Generate a qualitative rating based on the score."""
@@ -1563,6 +2457,943 @@ def get_rating(score):
     else:
         return "Needs Improvement"
 
+def parse_resume(text, filename, sections=None, timings=None, budget=None):
+    """Run all extractors over the resume text.
+    
+    Args:
+        text (str): The resume text content
+        filename (str): The uploaded file's name
+        sections (dict, optional): Sections already located by the layout pass
+        timings (dict, optional): Filled with the milliseconds spent in each extractor
+        budget (ExtractionBudget, optional): Tier and deadline; full tier by default
+        
+    Returns:
+        dict: Parsed resume data as returned by the upload endpoint, including
+        the source ("primary", "fallback", ...) of each field
+    """
+    sections = sections or {}
+    timings = timings if timings is not None else {}
+    budget = budget or ExtractionBudget()
+    # One context per resume, so derived views of the text are shared by the extractors
+    document = DocumentContext(text)
+    
+    def timed(stage, extractor, *args):
+        start = time.perf_counter()
+        with memory_profile.stage(stage):
+            result = extractor(*args)
+        timings[stage] = (time.perf_counter() - start) * 1000
+        return result
+    
+    contact_details = timed("contact_details", extract_contact_details, document, filename, budget)
+    education_details = timed("education", extract_education_details, document, sections.get("education"), budget)
+    experience = timed("experience", extract_experience, document, sections.get("experience"))
+    experience_details = timed("experience_details", extract_experience_details, experience)
+    # "education" and "experience" are the plain strings clients read before the
+    # structured lists existed. Each pair holds the same entries: an education
+    # string is the text of its education_details entry, and experience_details
+    # is parsed from the experience strings. The compact profile sends only the
+    # structured lists (see compact_result).
+    return {
+        "contact_details": contact_details,
+        "education": [entry["text"] for entry in education_details],
+        "education_details": education_details,
+        "experience": experience,
+        "experience_details": experience_details,
+        "total_experience_months": total_experience_months(experience_details),
+        "skills": timed("skills", extract_skills, document, sections.get("skills"), budget),
+        "projects": timed("projects", extract_projects, document, sections.get("projects")),
+        "certifications": timed("certifications", extract_certifications, document, sections.get("certifications"), budget),
+        "sources": budget.report(["contact_details", "education", "experience", "skills", "projects", "certifications"])
+    }
+
+# Digit runs that may be phone numbers (within one line), and runs that are only
+# years, such as "2014 - 2018", which redaction must keep for replays
+REDACT_PHONE_PATTERN = re.compile(r'\+?\(?\d[\d \t().-]{7,}\d')
+YEAR_RUN_PATTERN = re.compile(r'\(?(?:(?:19|20)\d{2}[\s().-]*)+')
+
+def redact_phone(match):
+    number = match.group(0)
+    if sum(char.isdigit() for char in number) < 10 or YEAR_RUN_PATTERN.fullmatch(number):
+        return number
+    return "<phone>"
+
+def redact_text(text, filename):
+    """Replace emails, phone numbers and the name parts of the filename in resume text.
+    Only digit runs of at least 10 digits count as phone numbers, and runs of years are kept."""
+    text = re.sub(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', '<email>', text)
+    text = REDACT_PHONE_PATTERN.sub(redact_phone, text)
+    name = name_from_filename(filename)
+    if name != "Not Found":
+        for part in name.split():
+            if len(part) > 1:
+                text = re.sub(r'\b' + re.escape(part) + r'\b', '<name>', text, flags=re.IGNORECASE)
+    return text
+
+def capture_slow_document(filename, digest, text, sections, timings, mode):
+    """
+    Write a slow document to the capture directory so it can be replayed offline.
+    
+    The capture holds the extracted text and sections (redacted unless
+    SLOW_DOC_REDACT is off), the per-stage timing breakdown and the SHA-256
+    digest of the uploaded file. Captures are named by digest, so the same
+    document is only stored once.
+    """
+    redact = app.config["SLOW_DOC_REDACT"]
+    capture = {
+        "digest": digest,
+        "filename": "redacted.pdf" if redact else filename,
+        "captured_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "mode": mode,
+        "redacted": redact,
+        "timings_ms": {stage: round(ms, 3) for stage, ms in timings.items()},
+        "total_ms": round(sum(timings.values()), 3),
+        "text": redact_text(text, filename) if redact else text,
+        "sections": {name: redact_text(section, filename) if redact else section
+                     for name, section in sections.items()}
+    }
+    
+    capture_dir = app.config["SLOW_DOC_CAPTURE_DIR"]
+    os.makedirs(capture_dir, exist_ok=True)
+    path = os.path.join(capture_dir, f"{digest}.json")
+    # Write to a temporary name first so readers never see half a capture
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(capture, f, indent=1)
+    os.replace(path + ".tmp", path)
+    return path
+
+class TokenBucket:
+    """Token bucket rate limiter: `rate` tokens per second, holding at most `burst`."""
+    
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def take(self, cost=1):
+        """
+        Take `cost` tokens if the bucket has them.
+        
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds until they will be available
+        """
+        if self.rate <= 0:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= cost:
+                self._tokens -= cost
+                return 0
+            return (cost - self._tokens) / self.rate
+
+class LaneScheduler:
+    """
+    Grants a limited number of parse slots to waiting work by lane and tenant.
+    
+    Each lane keeps a queue per tenant. When a slot frees up, the lane is
+    chosen by smooth weighted round-robin among the lanes with waiting work,
+    so interactive work gets its weight's share of slots even while bulk
+    work is queued, and bulk work uses every slot interactive work leaves
+    idle. Within a lane, tenants take turns, so one tenant's thousand-file
+    batch does not hold up another tenant's single file.
+    """
+    
+    def __init__(self, slots, weights):
+        self.slots = slots
+        self.weights = weights
+        self.running = 0
+        self._credit = {lane: 0 for lane in weights}
+        self._waiting = {lane: OrderedDict() for lane in weights}
+        self._granted = set()
+        self._condition = threading.Condition()
+    
+    def queue_depth(self):
+        """Number of waiting jobs in each lane."""
+        with self._condition:
+            return {lane: sum(len(jobs) for jobs in tenants.values()) for lane, tenants in self._waiting.items()}
+    
+    @contextmanager
+    def slot(self, lane, tenant):
+        """Block until a slot is granted to this job, and hold it for the with block."""
+        job = object()
+        with self._condition:
+            self._waiting[lane].setdefault(tenant, deque()).append(job)
+            self._dispatch()
+            while job not in self._granted:
+                self._condition.wait()
+            self._granted.remove(job)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.running -= 1
+                self._dispatch()
+    
+    def _next_lane(self):
+        lanes = [lane for lane in self._waiting if self._waiting[lane]]
+        if not lanes:
+            return None
+        for lane in lanes:
+            self._credit[lane] += self.weights[lane]
+        lane = max(lanes, key=self._credit.get)
+        self._credit[lane] -= sum(self.weights[lane] for lane in lanes)
+        return lane
+    
+    def _dispatch(self):
+        granted = False
+        while self.running < self.slots:
+            lane = self._next_lane()
+            if lane is None:
+                break
+            # Serve the tenant at the front and move it to the back of the lane
+            tenants = self._waiting[lane]
+            tenant, jobs = next(iter(tenants.items()))
+            self._granted.add(jobs.popleft())
+            del tenants[tenant]
+            if jobs:
+                tenants[tenant] = jobs
+            self.running += 1
+            granted = True
+        if granted:
+            self._condition.notify_all()
+
+scheduler = LaneScheduler(app.config["PARSE_SLOTS"], app.config["LANE_WEIGHTS"])
+
+class AdmissionController:
+    """
+    Tracks the work in flight in this process in pages and bytes, and sheds
+    new requests that would take it past the configured limits.
+    
+    A request's pages are estimated from its size with the average bytes per
+    page of the files parsed so far. The Retry-After for a shed request is
+    the time the process needs, at its measured pages per second, to work
+    off the excess.
+    """
+    
+    # Assumed until the first files have been measured
+    INITIAL_BYTES_PER_PAGE = 60 * 1024
+    INITIAL_SECONDS_PER_PAGE = 0.05
+    # Weight of the newest file in the moving averages
+    SMOOTHING = 0.1
+    MAX_RETRY_AFTER = 120
+    
+    def __init__(self, max_pages, max_bytes, slots):
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.slots = slots
+        self.requests = 0
+        self.pages = 0
+        self.bytes = 0
+        self.admitted = 0
+        self.shed = Counter()
+        self.bytes_per_page = self.INITIAL_BYTES_PER_PAGE
+        self.seconds_per_page = self.INITIAL_SECONDS_PER_PAGE
+        self._lock = threading.Lock()
+    
+    def pages_per_second(self):
+        return self.slots / self.seconds_per_page
+    
+    def admit(self, size):
+        """
+        Admit a request of `size` bytes if the limits allow it. A request is
+        always admitted when nothing else is in flight, however large it is.
+        
+        Returns:
+            tuple: (reservation to pass to release(), None) or (None, Retry-After seconds)
+        """
+        with self._lock:
+            pages = max(1, math.ceil(size / self.bytes_per_page))
+            over_pages = self.max_pages and self.pages + pages > self.max_pages
+            over_bytes = self.max_bytes and self.bytes + size > self.max_bytes
+            if self.requests and (over_pages or over_bytes):
+                self.shed["pages" if over_pages else "bytes"] += 1
+                # Pages that must finish before this request would fit
+                excess = max(self.pages + pages - self.max_pages if over_pages else 0,
+                             (self.bytes + size - self.max_bytes) / self.bytes_per_page if over_bytes else 0)
+                retry_after = min(self.MAX_RETRY_AFTER, math.ceil(excess / self.pages_per_second()))
+                return None, max(1, retry_after)
+            self.requests += 1
+            self.pages += pages
+            self.bytes += size
+            self.admitted += 1
+            return (pages, size), None
+    
+    def release(self, reservation):
+        pages, size = reservation
+        with self._lock:
+            self.requests -= 1
+            self.pages -= pages
+            self.bytes -= size
+    
+    def record_file(self, size, pages, seconds):
+        """Update the size and speed averages with a parsed file."""
+        if not pages:
+            return
+        with self._lock:
+            self.bytes_per_page += self.SMOOTHING * (size / pages - self.bytes_per_page)
+            self.seconds_per_page += self.SMOOTHING * (seconds / pages - self.seconds_per_page)
+    
+    def snapshot(self):
+        with self._lock:
+            return {
+                "in_flight": {"requests": self.requests, "pages": self.pages, "bytes": self.bytes},
+                "limits": {"pages": self.max_pages, "bytes": self.max_bytes},
+                "admitted": self.admitted,
+                "shed": dict(self.shed),
+                "shed_total": sum(self.shed.values()),
+                "bytes_per_page": round(self.bytes_per_page),
+                "pages_per_second": round(self.pages_per_second(), 2)
+            }
+
+admission = AdmissionController(app.config["MAX_INFLIGHT_PAGES"], app.config["MAX_INFLIGHT_BYTES"],
+                                app.config["PARSE_SLOTS"])
+
+_single_thread_warned = False
+
+def admit_request():
+    """
+    Reserve room for the current request, or build the 503 response that sheds it.
+    The reservation is released when the request ends.
+    
+    Returns:
+        Response or None: The error response if the request was shed
+    """
+    global _single_thread_warned
+    if not request.environ.get("wsgi.multithread") and not _single_thread_warned:
+        _single_thread_warned = True
+        app.logger.warning("This worker serves one request at a time, so admission control never "
+                           "sheds load; run threaded workers (see gunicorn.conf.py)")
+    reservation, retry_after = admission.admit(request.content_length or 0)
+    if reservation is None:
+        response = jsonify({"error": "Server is busy, retry later"})
+        response.headers["Retry-After"] = str(retry_after)
+        return response, 503
+    g.admission_reservation = reservation
+    return None
+
+def compress_body(data, encoding, level=6):
+    """Compress a response body with the gzip or deflate content coding."""
+    if encoding == "gzip":
+        # mtime=0 keeps the output identical for identical bodies
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    return zlib.compress(data, level)
+
+@app.after_request
+def compress_response(response):
+    """Compress JSON responses for clients that accept gzip or deflate."""
+    response.vary.add("Accept-Encoding")
+    if (response.direct_passthrough or response.is_streamed or response.content_encoding
+            or response.mimetype != "application/json"):
+        return response
+    
+    encoding = request.accept_encodings.best_match(["gzip", "deflate"])
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < app.config["COMPRESS_MIN_SIZE"]:
+        return response
+    
+    response.set_data(compress_body(data, encoding, app.config["COMPRESS_LEVEL"]))
+    response.content_encoding = encoding
+    return response
+
+@app.teardown_request
+def release_admission(exception=None):
+    reservation = g.pop("admission_reservation", None)
+    if reservation is not None:
+        admission.release(reservation)
+
+_tenants = None
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def load_tenants():
+    """Load the tenant table on first use. Returns None when tenants are not configured."""
+    global _tenants
+    if _tenants is None and app.config["TENANTS_PATH"]:
+        with open(app.config["TENANTS_PATH"], encoding="utf-8") as f:
+            _tenants = json.load(f)
+    return _tenants
+
+def identify_tenant():
+    """
+    Identify the tenant of the current request from its X-API-Key header.
+    
+    Returns:
+        tuple: (tenant settings dict, None) or (None, error response)
+    """
+    tenants = load_tenants()
+    if tenants is None:
+        tenant = {"name": "anonymous"}
+    else:
+        tenant = tenants.get(request.headers.get("X-API-Key", ""))
+        if tenant is None:
+            return None, (jsonify({"error": "Missing or unknown X-API-Key"}), 401)
+    return {
+        "name": tenant["name"],
+        "rate": tenant.get("rate", app.config["TENANT_DEFAULT_RATE"]),
+        "burst": tenant.get("burst", app.config["TENANT_DEFAULT_BURST"]),
+        "lane": tenant.get("lane", "interactive")
+    }, None
+
+def admit_tenant_request():
+    """
+    Identify the tenant, charge its token bucket and pick the request's lane.
+    
+    Clients may move a request to the bulk lane with ?lane=bulk, but a
+    tenant configured for the bulk lane cannot move up to interactive.
+    
+    Returns:
+        tuple: (tenant name, lane, None) or (None, None, error response)
+    """
+    tenant, error = identify_tenant()
+    if error:
+        return None, None, error
+    
+    with _buckets_lock:
+        bucket = _buckets.get(tenant["name"])
+        if bucket is None:
+            bucket = _buckets[tenant["name"]] = TokenBucket(tenant["rate"], tenant["burst"])
+    wait = bucket.take()
+    if wait:
+        response = jsonify({"error": "Rate limit exceeded"})
+        response.headers["Retry-After"] = str(math.ceil(wait))
+        return None, None, (response, 429)
+    
+    lane = request.args.get("lane", tenant["lane"])
+    if lane not in LANES:
+        return None, None, (jsonify({"error": f"Invalid lane {lane}. Use one of: {', '.join(LANES)}."}), 400)
+    if tenant["lane"] == "bulk":
+        lane = "bulk"
+    return tenant["name"], lane, None
+
+def charge_tenant_file(tenant):
+    """
+    Take a token from a tenant's bucket for a file beyond the first of a
+    request; the token taken by admit_tenant_request pays for the first.
+    
+    Args:
+        tenant (str): Tenant name returned by admit_tenant_request
+        
+    Returns:
+        int: 0 if the token was taken, otherwise the seconds to wait before retrying the file
+    """
+    with _buckets_lock:
+        bucket = _buckets[tenant]
+    return math.ceil(bucket.take())
+
+class PdfDecodeError(Exception):
+    """A PDF could not be decoded: it is not a readable PDF, or it crashed
+    its sandbox worker or ran out of memory or time."""
+
+def sandbox_worker_main(connection, memory_limit, cpu_limit):
+    """
+    Main loop of a sandbox child: decode PDFs received over the connection
+    until it is closed. Runs under address-space and CPU rlimits.
+    """
+    import resource
+    import pymupdf  # noqa: F401  Loaded before the limits, so they only bound decoding
+    
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit))
+    # The child is already one of a pool; it must not start a page pool of its own
+    app.config["PARALLEL_PAGE_THRESHOLD"] = 0
+    
+    while True:
+        try:
+            source, mode = connection.recv()
+        except EOFError:
+            return
+        try:
+            stats = {}
+            if mode == "layout":
+                text, sections = extract_layout_from_pdf(source, stats)
+            else:
+                text, sections = extract_text_from_pdf(source, stats), {}
+            connection.send(("ok", (text, sections, stats["pages"])))
+        except MemoryError:
+            connection.send(("error", "PDF needs more memory than the sandbox allows"))
+            return
+        except Exception as e:
+            connection.send(("error", f"Could not read PDF: {e}"))
+
+class SandboxWorker:
+    """One sandbox child process and the parent's end of its pipe."""
+    
+    def __init__(self):
+        context = multiprocessing.get_context("forkserver")
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=sandbox_worker_main, daemon=True,
+            args=(child_connection, app.config["PDF_SANDBOX_MEMORY_MB"] * 1024 * 1024,
+                  app.config["PDF_SANDBOX_CPU_SECONDS"])
+        )
+        self.process.start()
+        child_connection.close()
+        self.documents = 0
+    
+    def stat(self):
+        """(CPU seconds used, resident bytes) of the child, read from /proc."""
+        try:
+            with open(f"/proc/{self.process.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{self.process.pid}/statm") as f:
+                resident_pages = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            return 0, 0
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+        return cpu, resident_pages * os.sysconf("SC_PAGE_SIZE")
+    
+    def worn_out(self):
+        """Whether the child should be replaced before taking another document."""
+        if not self.process.is_alive() or self.documents >= app.config["PDF_SANDBOX_MAX_DOCS"]:
+            return True
+        cpu, resident = self.stat()
+        # Retire well before RLIMIT_CPU, which counts the child's whole life
+        return (resident > app.config["PDF_SANDBOX_MAX_RSS_MB"] * 1024 * 1024
+                or cpu > app.config["PDF_SANDBOX_CPU_SECONDS"] / 2)
+    
+    def stop(self):
+        self.connection.close()
+        self.process.kill()
+        self.process.join()
+
+class SandboxPool:
+    """
+    Fixed-size pool of sandbox children. Each document is handed to an idle
+    child; a child that crashes or times out is killed and replaced, and
+    worn-out children are replaced before their next document.
+    """
+    
+    def __init__(self, size):
+        self.size = size
+        self.crashes = 0
+        self.recycled = 0
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(None)  # Children are started when first needed
+    
+    def decode(self, source, mode):
+        """
+        Decode a PDF, given as its bytes or a file path, in a sandbox child.
+        
+        Returns:
+            tuple: (text, sections, page count)
+        
+        Raises:
+            PdfDecodeError: If the document could not be decoded
+        """
+        worker = self._idle.get()
+        try:
+            if worker is not None and worker.worn_out():
+                worker.stop()
+                worker = None
+                self.recycled += 1
+            if worker is None:
+                worker = SandboxWorker()
+            
+            worker.documents += 1
+            try:
+                worker.connection.send((source, mode))
+                if not worker.connection.poll(app.config["PDF_SANDBOX_TIMEOUT"]):
+                    worker.stop()
+                    worker = None
+                    self.crashes += 1
+                    raise PdfDecodeError("PDF took too long to decode")
+                status, result = worker.connection.recv()
+            except (EOFError, OSError):
+                # The child died while decoding: killed by an rlimit or crashed outright
+                worker.stop()
+                exit_code = worker.process.exitcode
+                worker = None
+                self.crashes += 1
+                raise PdfDecodeError(f"PDF crashed the decoder (exit code {exit_code})")
+            if status == "error":
+                raise PdfDecodeError(result)
+            return result
+        finally:
+            self._idle.put(worker)
+
+_sandbox_pool = None
+_sandbox_pool_lock = threading.Lock()
+
+def get_sandbox_pool():
+    """Create the sandbox pool on first use."""
+    global _sandbox_pool
+    with _sandbox_pool_lock:
+        if _sandbox_pool is None:
+            _sandbox_pool = SandboxPool(app.config["PDF_SANDBOX_WORKERS"])
+        return _sandbox_pool
+
+def decode_pdf(source, mode, stats):
+    """
+    Extract text (and, in layout mode, sections) from a PDF, given as its
+    bytes or a file path, in the sandbox pool if one is configured.
+    
+    Returns:
+        tuple: (text, sections dict)
+    
+    Raises:
+        PdfDecodeError: If the document could not be decoded
+    """
+    if app.config["PDF_SANDBOX_WORKERS"] > 0:
+        text, sections, stats["pages"] = get_sandbox_pool().decode(source, mode)
+        return text, sections
+    # In-process decoding fails the same way as the sandbox, with a per-file PdfDecodeError
+    try:
+        if mode == "layout":
+            return extract_layout_from_pdf(source, stats)
+        return extract_text_from_pdf(source, stats), {}
+    except MemoryError:
+        raise PdfDecodeError("PDF needs more memory than the decoder allows")
+    except Exception as e:
+        raise PdfDecodeError(f"Could not read PDF: {e}") from e
+
+@lru_cache(maxsize=1)
+def result_namespace():
+    """
+    Hash the parser version and the configuration that changes parse output:
+    the lookup tables, the gazetteer file and the default phone region. A
+    result stored under another parser or configuration is never reused.
+    Computed on first use, after the configuration is final.
+    
+    Returns:
+        str: Short hex digest
+    """
+    digest = hashlib.sha256(PARSER_VERSION.encode("utf-8"))
+    with open(TABLES_PATH, "rb") as f:
+        digest.update(f.read())
+    gazetteer_path = app.config["GAZETTEER_PATH"]
+    gazetteer_identity = None
+    if gazetteer_path:
+        # The gazetteer can be large, so it is identified by path, size and modification time
+        try:
+            info = os.stat(gazetteer_path)
+            gazetteer_identity = (os.path.abspath(gazetteer_path), info.st_size, info.st_mtime_ns)
+        except OSError:
+            gazetteer_identity = (gazetteer_path,)
+    digest.update(repr((gazetteer_identity, app.config["DEFAULT_PHONE_REGION"])).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+class ResultStore:
+    """
+    Parse results by tenant, extraction mode and PDF digest.
+    
+    Results are namespaced by tenant so one tenant cannot learn whether
+    another has uploaded a document, and by result_namespace() so a result
+    produced by another parser version or configuration is not served. An
+    in-memory LRU sits in front of an optional directory of JSON files, with
+    one subdirectory per namespace. Stored results must not be modified by
+    callers.
+    """
+    
+    def __init__(self, max_entries, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _path(self, key):
+        namespace, tenant, mode, digest = key
+        tenant_dir = hashlib.sha256(tenant.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, namespace, tenant_dir, f"{mode}-{digest}.json")
+    
+    def get(self, tenant, mode, digest):
+        """Return the stored parsed data, or None."""
+        key = (result_namespace(), tenant, mode, digest)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                parsed_data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember(key, parsed_data)
+        return parsed_data
+    
+    def put(self, tenant, mode, digest, parsed_data):
+        key = (result_namespace(), tenant, mode, digest)
+        self._remember(key, parsed_data)
+        if self.directory:
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write to a temporary name first so readers never see half a result
+                with open(f"{path}.{os.getpid()}.tmp", "w", encoding="utf-8") as f:
+                    json.dump(parsed_data, f)
+                os.replace(f"{path}.{os.getpid()}.tmp", path)
+            except OSError as e:
+                app.logger.warning("Could not store result %s: %s", digest, e)
+    
+    def _remember(self, key, parsed_data):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = parsed_data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+result_store = ResultStore(app.config["RESULT_STORE_SIZE"], app.config["RESULT_STORE_DIR"])
+
+def stored_result(parsed_data, filename):
+    """
+    Adapt a stored result to the filename it is requested under. The name is
+    the only field derived from the filename, so it is redone and the ATS
+    score recomputed; the stored data itself is left untouched.
+    
+    Returns:
+        tuple: (parsed data, ATS score)
+    """
+    parsed_data = dict(parsed_data, contact_details=dict(
+        parsed_data["contact_details"], Name=name_from_filename(filename)
+    ))
+    return parsed_data, generate_ats_score(parsed_data)
+
+def analyze_pdf(filename, pdf, mode, tenant="anonymous", budget=None):
+    """
+    Extract, parse and score one uploaded PDF. Identical bytes uploaded
+    before by the same tenant are answered from the result store, and only
+    full-tier results are stored.
+    
+    Args:
+        filename (str): The uploaded file's name
+        pdf (bytes or UploadBuffer): The PDF file content, or the buffer it was received into
+        mode (str): Extraction mode, "text" or "layout"
+        tenant (str): Tenant whose stored results may be reused
+        budget (ExtractionBudget, optional): Tier and deadline; full tier by default
+        
+    Returns:
+        tuple: (parsed data, ATS score)
+    """
+    if isinstance(pdf, UploadBuffer):
+        # Hashed while it was received; a spilled upload is decoded from its file
+        digest, size, source = pdf.hexdigest(), pdf.size, pdf.source()
+    else:
+        digest, size, source = hashlib.sha256(pdf).hexdigest(), len(pdf), pdf
+    stored = result_store.get(tenant, mode, digest)
+    if stored is not None:
+        tenure_index.add(tenant, digest, filename, stored["experience_details"])
+        return stored_result(stored, filename)
+    
+    timings = {}
+    stats = {}
+    start = time.perf_counter()
+    text, sections = decode_pdf(source, mode, stats)
+    timings["pdf_text"] = (time.perf_counter() - start) * 1000
+    budget = budget or ExtractionBudget()
+    parsed_data = parse_resume(text, filename, sections, timings, budget)
+    
+    # Generate ATS score
+    start = time.perf_counter()
+    ats_score = generate_ats_score(parsed_data)
+    timings["ats_score"] = (time.perf_counter() - start) * 1000
+    tenure_index.add(tenant, digest, filename, parsed_data["experience_details"])
+    # A fast-tier result may be missing fallback fields, so it must not answer later full-tier requests
+    if budget.tier == "full":
+        result_store.put(tenant, mode, digest, parsed_data)
+    admission.record_file(size, stats["pages"], sum(timings.values()) / 1000)
+    
+    threshold = app.config["SLOW_DOC_THRESHOLD_MS"]
+    if threshold and sum(timings.values()) >= threshold:
+        try:
+            capture_slow_document(filename, digest, text, sections, timings, mode)
+        except OSError as e:
+            app.logger.warning("Could not capture slow document %s: %s", filename, e)
+    
+    return parsed_data, ats_score
+
+def analyze_text(filename, text, tenant="anonymous", budget=None):
+    """
+    Parse and score resume text that needs no PDF decoding (see /parse-text).
+    Text results are not kept in the result store, which is keyed by PDF digest.
+    
+    Args:
+        filename (str): The resume's file name, from which the candidate's name is taken
+        text (str): The resume text
+        tenant (str): Tenant whose tenure index the candidate is added to
+        budget (ExtractionBudget, optional): Tier and deadline; full tier by default
+        
+    Returns:
+        tuple: (parsed data, ATS score)
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    timings = {}
+    parsed_data = parse_resume(text, filename, None, timings, budget)
+    start = time.perf_counter()
+    ats_score = generate_ats_score(parsed_data)
+    timings["ats_score"] = (time.perf_counter() - start) * 1000
+    tenure_index.add(tenant, digest, filename, parsed_data["experience_details"])
+    
+    threshold = app.config["SLOW_DOC_THRESHOLD_MS"]
+    if threshold and sum(timings.values()) >= threshold:
+        try:
+            capture_slow_document(filename, digest, text, {}, timings, "text")
+        except OSError as e:
+            app.logger.warning("Could not capture slow document %s: %s", filename, e)
+    
+    return parsed_data, ats_score
+
+class BatchSummary:
+    """
+    Aggregates of a batch, updated as each file's results arrive.
+    
+    Only counters and a bounded heap of the best scores are kept, so the
+    summary never needs the per-file results once a file has been added.
+    """
+    
+    # Width of the ATS score histogram buckets
+    SCORE_BUCKET = 10
+    
+    def __init__(self, top_k=10):
+        self.top_k = top_k
+        self.files = 0
+        self.failed = 0
+        self.score_total = 0
+        self.skills = Counter()
+        self.cities = Counter()
+        self.states = Counter()
+        self.ratings = Counter()
+        self.score_histogram = Counter()
+        # Min-heap of (score, sequence, filename); the root is the weakest of the top k
+        self._top = []
+    
+    def add(self, filename, parsed_data, ats_score):
+        score = ats_score["score"]
+        self.files += 1
+        self.score_total += score
+        self.skills.update(parsed_data["skills"])
+        self.ratings[ats_score["rating"]] += 1
+        self.score_histogram[min(score // self.SCORE_BUCKET * self.SCORE_BUCKET, 100 - self.SCORE_BUCKET)] += 1
+        
+        # Locations are "City, State" (or "City, Region, Country" with a gazetteer)
+        location = parsed_data["contact_details"]["Location"]
+        if location != "Not Found":
+            city, _, state = location.partition(", ")
+            self.cities[city] += 1
+            self.states[state] += 1
+        
+        # The sequence number keeps ties in upload order and stops filenames being compared
+        entry = (score, -self.files, filename)
+        if len(self._top) < self.top_k:
+            heapq.heappush(self._top, entry)
+        elif entry > self._top[0]:
+            heapq.heapreplace(self._top, entry)
+    
+    def to_dict(self):
+        return {
+            "files": self.files,
+            "failed": self.failed,
+            "mean_score": round(self.score_total / self.files, 1) if self.files else None,
+            "score_histogram": {
+                f"{bucket}-{bucket + self.SCORE_BUCKET - 1 if bucket + self.SCORE_BUCKET < 100 else 100}": count
+                for bucket, count in sorted(self.score_histogram.items())
+            },
+            "ratings": dict(self.ratings),
+            "skills": dict(self.skills.most_common()),
+            "cities": dict(self.cities.most_common()),
+            "states": dict(self.states.most_common()),
+            "top": [
+                {"filename": filename, "score": score}
+                for score, _, filename in sorted(self._top, reverse=True)
+            ]
+        }
+
+def compact_value(value):
+    """Drop empty values and "Not Found" sentinels, recursively. Returns None if nothing is left."""
+    if isinstance(value, dict):
+        value = {key: compact_value(item) for key, item in value.items()}
+        value = {key: item for key, item in value.items() if item is not None}
+    elif isinstance(value, list):
+        value = [item for item in (compact_value(item) for item in value) if item is not None]
+    if value in ("Not Found", "", [], {}) or value is None:
+        return None
+    return value
+
+def compact_result(filename, parsed_data, ats_score):
+    """
+    Build the compact form of one file's result.
+    
+    Empty fields and "Not Found" values are left out, the education and
+    experience entry strings are left out in favour of the structured
+    education_details and experience_details, which hold the same text,
+    and the ATS score is reduced to the total, the rating, the score of each
+    section and the section feedback as a code from FEEDBACK_MESSAGES.
+    """
+    experience_details = parsed_data["experience_details"]
+    codes = {
+        "contact": contact_feedback_code(parsed_data["contact_details"]),
+        "education": education_feedback_code(parsed_data["education"]),
+        "experience": experience_feedback_code(experience_details),
+        "skills": skills_feedback_code(parsed_data["skills"])
+    }
+    parsed = {key: value for key, value in parsed_data.items() if key not in ("education", "experience")}
+    return {
+        "filename": filename,
+        "parsed_data": compact_value(parsed) or {},
+        "ats_score": {
+            "score": ats_score["score"],
+            "rating": ats_score["rating"],
+            "scores": {section: round(detail["score"], 1) for section, detail in ats_score["detailed_scores"].items()},
+            "feedback": {
+                section: code if value is None else f"{code}:{','.join(value) if isinstance(value, list) else value}"
+                for section, (code, value) in codes.items()
+            }
+        }
+    }
+
+def summary_options():
+    """
+    Read the batch summary options of the current request.
+    
+    ?summary=1 adds a summary of the batch to the response, ?top_k=N sets the
+    size of its ranking (default 10) and ?results=0 leaves out the per-file
+    results, so they are dropped as soon as they are summarised.
+    
+    Returns:
+        tuple: (BatchSummary or None, whether to keep per-file results)
+    """
+    if request.args.get("summary") != "1":
+        return None, True
+    top_k = request.args.get("top_k", default=10, type=int) or 10
+    return BatchSummary(max(1, top_k)), request.args.get("results") != "0"
+
+def extraction_tier():
+    """
+    Read the extraction tier of the current request.
+    
+    ?tier=full (the default) runs every extractor fallback. ?tier=fast, or an
+    X-Deadline header without ?tier=, runs fallbacks only while the request's
+    budget lasts: X-Deadline milliseconds from now, or FAST_TIER_BUDGET_MS.
+    The budget covers the whole request, so late files in a batch fall back
+    less than early ones.
+    
+    Returns:
+        tuple: (tier, deadline as a time.monotonic() value or None, error response or None)
+    """
+    header = request.headers.get("X-Deadline")
+    tier = request.args.get("tier", "fast" if header else "full")
+    if tier not in EXTRACTION_TIERS:
+        return None, None, (jsonify({"error": f"Invalid tier {tier}. Use one of: {', '.join(sorted(EXTRACTION_TIERS))}."}), 400)
+    if tier == "full":
+        return tier, None, None
+    budget_ms = app.config["FAST_TIER_BUDGET_MS"]
+    if header:
+        try:
+            budget_ms = float(header)
+        except ValueError:
+            budget_ms = -1
+        if not 0 <= budget_ms < math.inf:
+            return None, None, (jsonify({"error": "X-Deadline must be a number of milliseconds"}), 400)
+    return tier, time.monotonic() + budget_ms / 1000, None
+
 # Added for root endpoint compatibility (for backward compatibility)
 @app.route("/", methods=["POST"])
 def root_upload():
@@ -1571,53 +3402,362 @@ def root_upload():
 
 @app.route("/upload", methods=["POST"])
 def upload_resume():
-    """Handle resume upload(s) and return extracted data."""
-    if "file" not in request.files:
+    """Handle resume upload(s) and return extracted data.
+    
+    The multipart body is streamed: each file is parsed as soon as its part
+    has arrived, and only that file is held in memory. See summary_options
+    for the batch summary.
+    """
+    boundary = request.mimetype_params.get("boundary")
+    if request.mimetype != "multipart/form-data" or not boundary:
         return jsonify({"error": "No file uploaded"}), 400
 
-    files = request.files.getlist("file")
-    
-    if not files or len(files) == 0 or files[0].filename == "":
-        return jsonify({"error": "No selected file"}), 400
+    mode = request.args.get("mode", app.config["EXTRACTION_MODE"])
+    if mode not in EXTRACTION_MODES:
+        return jsonify({"error": f"Invalid mode {mode}. Use one of: {', '.join(sorted(EXTRACTION_MODES))}."}), 400
+
+    profile = request.args.get("profile", "full")
+    if profile not in RESPONSE_PROFILES:
+        return jsonify({"error": f"Invalid profile {profile}. Use one of: {', '.join(sorted(RESPONSE_PROFILES))}."}), 400
+
+    tier, deadline, error = extraction_tier()
+    if error:
+        return error
 
+    shed = admit_request()
+    if shed:
+        return shed
+
+    tenant, lane, error = admit_tenant_request()
+    if error:
+        return error
+
+    summary, keep_results = summary_options()
     results = []
+    received_file = False
+    
+    try:
+        for field_name, filename, buffer in iter_multipart_files(request.stream, boundary.encode("latin-1")):
+            with buffer:
+                if field_name != "file":
+                    continue
+                if not received_file and filename == "":
+                    return jsonify({"error": "No selected file"}), 400
+                first_file = not received_file
+                received_file = True
+                
+                if not allowed_file(filename):
+                    return jsonify({"error": f"Invalid file type for {filename}. Only PDFs are allowed."}), 400
+                
+                retry_after = 0 if first_file else charge_tenant_file(tenant)
+                if retry_after:
+                    # Only this file is refused; the client retries it later
+                    if summary is not None:
+                        summary.failed += 1
+                    if keep_results:
+                        results.append({"filename": filename, "error": "Rate limit exceeded", "retry_after": retry_after})
+                    continue
+                    
+                try:
+                    # Wait for a parse slot; the lane and tenant decide the order
+                    with scheduler.slot(lane, tenant), memory_profile.request(filename):
+                        parsed_data, ats_score = analyze_pdf(
+                            filename, buffer, mode, tenant, ExtractionBudget(tier, deadline)
+                        )
+                    
+                    if summary is not None:
+                        summary.add(filename, parsed_data, ats_score)
+                    if keep_results and profile == "compact":
+                        results.append(compact_result(filename, parsed_data, ats_score))
+                    elif keep_results:
+                        results.append({
+                            "filename": filename,
+                            "parsed_data": parsed_data,
+                            "ats_score": ats_score
+                        })
+
+                except PdfDecodeError as e:
+                    # Only this file is lost; the rest of the batch carries on
+                    if summary is not None:
+                        summary.failed += 1
+                    if keep_results:
+                        results.append({"filename": filename, "error": str(e)})
+                except Exception as e:
+                    return jsonify({"error": f"Error processing file {filename}: {str(e)}"}), 500
+    except ValueError:
+        return jsonify({"error": "Malformed multipart upload"}), 400
+
+    if not received_file:
+        return jsonify({"error": "No file uploaded"}), 400
+
+    # With a summary the response is an object; without one it stays a plain list of results
+    if summary is not None:
+        response = {"summary": summary.to_dict()}
+        if keep_results:
+            response["results"] = results
+        return jsonify(response), 200
+    return jsonify(results), 200
+
+@app.route("/check", methods=["POST"])
+def check_digests():
+    """
+    Look up stored parse results by the SHA-256 digest of the PDF files.
+    
+    The body is JSON: {"files": [{"digest": "...", "filename": "a.pdf"}, ...]}
+    or {"digests": ["...", ...]}, with an optional "mode" (the extraction
+    mode, as for /upload) and "profile". Files that are found come back with
+    their results; only the digests listed under "unknown" need uploading.
     
+    With several workers this is only reliable when RESULT_STORE_DIR is set;
+    otherwise a digest is only known to the worker that parsed it.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    
+    files = body.get("files")
+    if files is None:
+        files = [{"digest": digest} for digest in body.get("digests") or []]
+    if not isinstance(files, list) or not all(isinstance(file, dict) for file in files):
+        return jsonify({"error": "files must be a list of objects with a digest"}), 400
+    if len(files) > CHECK_MAX_DIGESTS:
+        return jsonify({"error": f"At most {CHECK_MAX_DIGESTS} digests per request"}), 400
+    
+    mode = body.get("mode", app.config["EXTRACTION_MODE"])
+    if mode not in EXTRACTION_MODES:
+        return jsonify({"error": f"Invalid mode {mode}. Use one of: {', '.join(sorted(EXTRACTION_MODES))}."}), 400
+    profile = body.get("profile", "full")
+    if profile not in RESPONSE_PROFILES:
+        return jsonify({"error": f"Invalid profile {profile}. Use one of: {', '.join(sorted(RESPONSE_PROFILES))}."}), 400
+    
+    tenant, _, error = admit_tenant_request()
+    if error:
+        return error
+    
+    known = {}
+    unknown = []
     for file in files:
-        if not allowed_file(file.filename):
-            return jsonify({"error": f"Invalid file type for {file.filename}. Only PDFs are allowed."}), 400
-            
+        digest = str(file.get("digest", "")).lower()
+        if not DIGEST_PATTERN.match(digest):
+            return jsonify({"error": f"Invalid SHA-256 digest: {file.get('digest')}"}), 400
+        stored = result_store.get(tenant, mode, digest)
+        if stored is None:
+            unknown.append(digest)
+            continue
+        filename = file.get("filename") or f"{digest}.pdf"
+        parsed_data, ats_score = stored_result(stored, filename)
+        if profile == "compact":
+            known[digest] = compact_result(filename, parsed_data, ats_score)
+        else:
+            known[digest] = {"filename": filename, "parsed_data": parsed_data, "ats_score": ats_score}
+    
+    return jsonify({"known": known, "unknown": unknown}), 200
+
+def iter_jsonl_records(stream, max_bytes):
+    """
+    Read JSONL records from a stream one line at a time, so only the line
+    being parsed is held in memory. Blank lines are skipped.
+    
+    Yields:
+        tuple: (line number, record dict or None, error message or None);
+        a record that fails validation comes with its error
+    """
+    number = 0
+    while True:
+        line = stream.readline(max_bytes + 1)
+        if not line:
+            return
+        number += 1
+        if len(line) > max_bytes and not line.endswith(b"\n"):
+            # Skip the rest of the oversized line
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(UPLOAD_READ_CHUNK_SIZE)
+            yield number, None, f"Line longer than {max_bytes} bytes"
+            continue
+        if not line.strip():
+            continue
         try:
-            # Save file temporarily
-            file_path = os.path.join(app.config["UPLOAD_FOLDER"], file.filename)
-            file.save(file_path)
-
-            # Extract details
-            text = extract_text_from_pdf(file_path)
-            parsed_data = {
-                "contact_details": extract_contact_details(text, file.filename),
-                "education": extract_education(text),
-                "experience": extract_experience(text),
-                "skills": extract_skills(text),
-                "projects": extract_projects(text),
-                "certifications": extract_certifications(text)
-            }
-            
-            # Generate ATS score
-            ats_score = generate_ats_score(parsed_data)
-            
-            results.append({
-                "filename": file.filename,
-                "parsed_data": parsed_data,
-                "ats_score": ats_score
-            })
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "Expected an object with a text string"
+        elif not isinstance(record.get("text"), str):
+            yield number, record, "Expected an object with a text string"
+        elif not isinstance(record.get("filename", ""), str):
+            yield number, record, "filename must be a string"
+        else:
+            yield number, record, None
+
+@app.route("/parse-text", methods=["POST"])
+def parse_text():
+    """
+    Parse resume text without a PDF.
+    
+    A text/plain body is one resume; ?filename= names it (the candidate's
+    name is taken from the filename, as for uploads) and the response is
+    that file's result. A JSONL body (application/x-ndjson) holds one
+    {"id", "filename", "text"} record per line; results are streamed back
+    as JSONL in the same order, each carrying its record's id, as soon as
+    they are ready, so a batch is never held in memory. A line that cannot
+    be parsed gets {"id", "line", "error"} and the batch carries on, as
+    does a record refused by the tenant's rate limit, whose entry also has
+    a "retry_after". ?profile=, ?tier= and the tenant and lane rules are
+    those of /upload;
+    with ?summary=1 the stream ends with a {"summary": ...} line.
+    """
+    profile = request.args.get("profile", "full")
+    if profile not in RESPONSE_PROFILES:
+        return jsonify({"error": f"Invalid profile {profile}. Use one of: {', '.join(sorted(RESPONSE_PROFILES))}."}), 400
+    if request.mimetype != "text/plain" and request.mimetype not in JSONL_MIMETYPES:
+        return jsonify({"error": "Send a text/plain resume or application/x-ndjson records"}), 415
+    
+    tier, deadline, error = extraction_tier()
+    if error:
+        return error
+    
+    shed = admit_request()
+    if shed:
+        return shed
+    
+    tenant, lane, error = admit_tenant_request()
+    if error:
+        return error
+    
+    max_bytes = app.config["PARSE_TEXT_MAX_BYTES"]
+    
+    def result_entry(filename, parsed_data, ats_score):
+        if profile == "compact":
+            return compact_result(filename, parsed_data, ats_score)
+        return {"filename": filename, "parsed_data": parsed_data, "ats_score": ats_score}
+    
+    if request.mimetype == "text/plain":
+        if request.content_length is not None and request.content_length > max_bytes:
+            return jsonify({"error": f"Resume text longer than {max_bytes} bytes"}), 413
+        text = request.stream.read(max_bytes + 1)
+        if len(text) > max_bytes:
+            return jsonify({"error": f"Resume text longer than {max_bytes} bytes"}), 413
+        filename = request.args.get("filename", "")
+        with scheduler.slot(lane, tenant):
+            parsed_data, ats_score = analyze_text(
+                filename, text.decode(request.mimetype_params.get("charset", "utf-8"), "replace"),
+                tenant, ExtractionBudget(tier, deadline)
+            )
+        return jsonify(result_entry(filename, parsed_data, ats_score)), 200
+    
+    summary, keep_results = summary_options()
+    
+    def generate():
+        parsed_records = 0
+        for number, record, error in iter_jsonl_records(request.stream, max_bytes):
+            record_id = record.get("id") if record else None
+            retry_after = 0
+            if error is None:
+                # The request's own token paid for the first record
+                parsed_records += 1
+                retry_after = charge_tenant_file(tenant) if parsed_records > 1 else 0
+                if retry_after:
+                    error = "Rate limit exceeded"
+            if error is None:
+                filename = record.get("filename", "")
+                try:
+                    with scheduler.slot(lane, tenant):
+                        parsed_data, ats_score = analyze_text(filename, record["text"], tenant, ExtractionBudget(tier, deadline))
+                except Exception as e:
+                    error = f"Error processing record: {e}"
+            if error is not None:
+                if summary is not None:
+                    summary.failed += 1
+                if keep_results:
+                    entry = {"id": record_id, "line": number, "error": error}
+                    if retry_after:
+                        entry["retry_after"] = retry_after
+                    yield app.json.dumps(entry) + "\n"
+                continue
+            if summary is not None:
+                summary.add(filename, parsed_data, ats_score)
+            if keep_results:
+                yield app.json.dumps({"id": record_id, **result_entry(filename, parsed_data, ats_score)}) + "\n"
+        if summary is not None:
+            yield app.json.dumps({"summary": summary.to_dict()}) + "\n"
+    
+    # The request context, and with it the admission reservation, lasts until the stream ends
+    return app.response_class(stream_with_context(generate()), mimetype="application/x-ndjson")
 
-            # Cleanup uploaded file
-            os.remove(file_path)
+@app.route("/candidates/tenure", methods=["GET"])
+def query_tenure():
+    """Filter the tenant's parsed candidates by years of experience and how recently their last role ended."""
+    tenant, _, error = admit_tenant_request()
+    if error:
+        return error
+    
+    min_years = request.args.get("min_years", type=float)
+    max_years = request.args.get("max_years", type=float)
+    ended_within = request.args.get("ended_within_months", type=int)
 
-        except Exception as e:
-            return jsonify({"error": f"Error processing file {file.filename}: {str(e)}"}), 500
+    matches = tenure_index.query(
+        tenant,
+        min_months=round(min_years * 12) if min_years is not None else None,
+        max_months=round(max_years * 12) if max_years is not None else None,
+        ended_within_months=ended_within
+    )
+    return jsonify([
+        {"filename": filename, "digest": digest, "total_experience_months": months}
+        for digest, filename, months in matches
+    ]), 200
 
-    return jsonify(results), 200
+@app.route("/debug/profile", methods=["GET"])
+def debug_profile():
+    """Sample every thread's stack for ?seconds=N and return a collapsed-stack flamegraph file."""
+    token = app.config["PROFILE_TOKEN"]
+    if not token:
+        return jsonify({"error": "Not found"}), 404
+    if not hmac.compare_digest(request.headers.get("X-Debug-Token", ""), token):
+        return jsonify({"error": "Invalid or missing X-Debug-Token"}), 403
+
+    seconds = request.args.get("seconds", default=10, type=float)
+    if seconds is None or not 0 < seconds <= PROFILE_MAX_SECONDS:
+        return jsonify({"error": f"seconds must be between 0 and {PROFILE_MAX_SECONDS}"}), 400
+
+    # One profile at a time; overlapping samplers would only slow each other down
+    if not _profile_lock.acquire(blocking=False):
+        return jsonify({"error": "A profile is already being taken"}), 409
+    try:
+        stacks, samples = sample_stacks(seconds)
+    finally:
+        _profile_lock.release()
+
+    filename = f"profile-{os.getpid()}-{time.strftime('%Y%m%dT%H%M%S')}.collapsed"
+    return app.response_class(format_collapsed(stacks), mimetype="text/plain", headers={
+        "Content-Disposition": f"attachment; filename={filename}",
+        "X-Profile-Samples": str(samples)
+    })
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Report load, admission and cache counters of this worker process as JSON.
+    
+    Every counter belongs to the worker that happened to answer, named by
+    "pid"; nothing is summed across workers. Admission limits apply per
+    worker in the same way, so a server's capacity is the limits times the
+    number of workers.
+    """
+    return jsonify({
+        "pid": os.getpid(),
+        "admission": admission.snapshot(),
+        "queue_depth": scheduler.queue_depth(),
+        "parse_slots": {"total": scheduler.slots, "busy": scheduler.running},
+        "page_cache": {"entries": len(page_cache), "hits": page_cache.hits, "misses": page_cache.misses},
+        "pdf_documents": open_documents.snapshot(),
+        "memory": memory_profile.snapshot() if memory_profile.enabled else None,
+        "pdf_sandbox": {
+            "workers": app.config["PDF_SANDBOX_WORKERS"],
+            "crashes": _sandbox_pool.crashes if _sandbox_pool else 0,
+            "recycled": _sandbox_pool.recycled if _sandbox_pool else 0
+        }
+    }), 200
 
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
@@ -0,0 +1,358 @@
+"""
+Asynchronous front end for the resume parser, on aiohttp.
+
+With sync gunicorn workers a client on a slow link holds a whole worker
+while its upload trickles in. Here the event loop receives uploads, so a
+slow client only costs an open connection; each file is handed to a
+bounded thread pool for extraction and scoring once all of its bytes have
+arrived. Parsing order, admission limits, tenants, tiers, the result store
+and the response format are those of the Flask app (app.py), which this
+module imports and reuses; admission is applied to each file rather than
+to the whole request (see upload_resume).
+
+POST /upload (and POST /) are served here. Every other route is passed to
+the Flask app in-process, so /check, /metrics and the rest see the same
+worker state as the uploads. Their request bodies are streamed into the
+Flask app as it reads them and their responses streamed back as the app
+produces them, so a JSONL batch on /parse-text is neither held in memory
+nor limited by aiohttp's client_max_size. A forwarded request holds a
+thread of the loop's default executor while the Flask app serves it.
+
+Run with:
+    gunicorn async_app:application --worker-class aiohttp.GunicornWebWorker --workers 4
+or, for development:
+    python async_app.py
+"""
+import asyncio
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote_to_bytes
+
+from aiohttp import web
+from aiohttp.http_exceptions import BadHttpMessage
+from multidict import CIMultiDict
+
+from app import (
+    EXTRACTION_MODES, RESPONSE_PROFILES, UPLOAD_READ_CHUNK_SIZE, ExtractionBudget, PdfDecodeError, UploadBuffer,
+    admission, admit_tenant_request, allowed_file, charge_tenant_file, analyze_pdf, app, compact_result, extraction_tier,
+    jsonify, memory_profile, scheduler, summary_options
+)
+
+# Threads that extract and score files. Files beyond PARSE_SLOTS wait for a
+# parse slot in the lane scheduler, which picks the next file by lane and
+# tenant, so there are more threads than slots; files beyond the threads wait
+# in the pool's queue. Uploads still being received hold no thread at all.
+app.config["ASYNC_PARSE_THREADS"] = int(os.environ.get("ASYNC_PARSE_THREADS", 4 * app.config["PARSE_SLOTS"]))
+parse_executor = ThreadPoolExecutor(max_workers=app.config["ASYNC_PARSE_THREADS"], thread_name_prefix="parse")
+
+# Headers of a Flask response that are not passed on: hop-by-hop headers, and the
+# framing ones, which aiohttp sets itself for the body it sends
+DROPPED_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailer",
+    "transfer-encoding", "upgrade", "content-length"
+}
+
+def forwarded_headers(items):
+    """
+    Headers of a Flask response to send with the aiohttp one: all of them
+    (CORS headers, Retry-After, cookies...) except DROPPED_HEADERS. Every
+    Vary value is kept, merged into one header, since Flask-CORS and the
+    compression hook each add their own.
+    """
+    headers = CIMultiDict()
+    vary = []
+    for key, value in items:
+        if key.lower() in DROPPED_HEADERS:
+            continue
+        if key.lower() == "vary":
+            for field in value.split(","):
+                if field.strip() and field.strip() not in vary:
+                    vary.append(field.strip())
+        else:
+            headers.add(key, value)
+    if vary:
+        headers["Vary"] = ", ".join(vary)
+    return headers
+
+def to_aiohttp(result):
+    """
+    Convert a Flask view result (a response, or a (response, status) tuple)
+    to an aiohttp response. The Flask app's after-request hooks run on it
+    first, as on any response the Flask app sends, so errors carry the same
+    CORS and Vary headers as results. Call it inside flask_context.
+    """
+    response = app.process_response(app.make_response(result))
+    return web.Response(
+        body=response.get_data(),
+        status=response.status_code,
+        headers=forwarded_headers(response.headers.items())
+    )
+
+def flask_context(request):
+    """A Flask request context carrying the method, path, query string and headers of an aiohttp request."""
+    return app.test_request_context(
+        request.path, method=request.method, query_string=request.query_string,
+        headers=list(request.headers.items())
+    )
+
+def parse_file(filename, buffer, mode, tenant, lane, tier, deadline):
+    """Extract and score one file. Runs in the parse thread pool."""
+    with scheduler.slot(lane, tenant), memory_profile.request(filename):
+        return analyze_pdf(filename, buffer, mode, tenant, ExtractionBudget(tier, deadline))
+
+async def receive_file(part):
+    """Read one file part into an UploadBuffer, a chunk at a time. The caller closes the buffer."""
+    buffer = UploadBuffer(app.config["UPLOAD_SPOOL_MAX_MEMORY"], app.config["UPLOAD_FOLDER"])
+    try:
+        while True:
+            chunk = await part.read_chunk(UPLOAD_READ_CHUNK_SIZE)
+            if not chunk:
+                return buffer
+            buffer.write(chunk)
+    except BaseException:
+        buffer.close()
+        raise
+
+async def upload_resume(request):
+    """
+    Handle resume upload(s) and return extracted data, as /upload in app.py does.
+    
+    Admission control is applied per file, once the file's bytes have
+    arrived and its size is known, just before it is handed to the parse
+    pool; uploads still being received take no room. A file that does not
+    fit is reported as shed with a retry_after and the rest of the batch
+    carries on; only when every file was shed is the answer a 503.
+    """
+    if request.content_type != "multipart/form-data":
+        with flask_context(request):
+            return to_aiohttp((jsonify({"error": "No file uploaded"}), 400))
+
+    with flask_context(request):
+        mode = request.query.get("mode", app.config["EXTRACTION_MODE"])
+        if mode not in EXTRACTION_MODES:
+            return to_aiohttp((jsonify({"error": f"Invalid mode {mode}. Use one of: {', '.join(sorted(EXTRACTION_MODES))}."}), 400))
+        profile = request.query.get("profile", "full")
+        if profile not in RESPONSE_PROFILES:
+            return to_aiohttp((jsonify({"error": f"Invalid profile {profile}. Use one of: {', '.join(sorted(RESPONSE_PROFILES))}."}), 400))
+        tier, deadline, error = extraction_tier()
+        if error:
+            return to_aiohttp(error)
+        tenant, lane, error = admit_tenant_request()
+        if error:
+            return to_aiohttp(error)
+        summary, keep_results = summary_options()
+
+    results = []
+    received_file = False
+    files = 0
+    shed_waits = []
+    loop = asyncio.get_running_loop()
+    try:
+        reader = await request.multipart()
+        while (part := await reader.next()) is not None:
+            if part.name != "file" or part.filename is None:
+                await part.release()
+                continue
+            filename = part.filename
+            with flask_context(request):
+                if not received_file and filename == "":
+                    return to_aiohttp((jsonify({"error": "No selected file"}), 400))
+                first_file = not received_file
+                received_file = True
+                if not allowed_file(filename):
+                    return to_aiohttp((jsonify({"error": f"Invalid file type for {filename}. Only PDFs are allowed."}), 400))
+
+            with await receive_file(part) as buffer:
+                files += 1
+                reservation, retry_after = admission.admit(buffer.size)
+                if reservation is None:
+                    # Only this file is shed; the client retries it later
+                    shed_waits.append(retry_after)
+                    if summary is not None:
+                        summary.failed += 1
+                    if keep_results:
+                        results.append({"filename": filename, "error": "Server is busy, retry later", "retry_after": retry_after})
+                    continue
+                try:
+                    retry_after = 0 if first_file else charge_tenant_file(tenant)
+                    if retry_after:
+                        # Only this file is refused; the client retries it later
+                        if summary is not None:
+                            summary.failed += 1
+                        if keep_results:
+                            results.append({"filename": filename, "error": "Rate limit exceeded", "retry_after": retry_after})
+                        continue
+                    parsed_data, ats_score = await loop.run_in_executor(
+                        parse_executor, parse_file, filename, buffer, mode, tenant, lane, tier, deadline
+                    )
+                except PdfDecodeError as e:
+                    # Only this file is lost; the rest of the batch carries on
+                    if summary is not None:
+                        summary.failed += 1
+                    if keep_results:
+                        results.append({"filename": filename, "error": str(e)})
+                    continue
+                except Exception as e:
+                    with flask_context(request):
+                        return to_aiohttp((jsonify({"error": f"Error processing file {filename}: {str(e)}"}), 500))
+                finally:
+                    admission.release(reservation)
+
+            if summary is not None:
+                summary.add(filename, parsed_data, ats_score)
+            if keep_results and profile == "compact":
+                results.append(compact_result(filename, parsed_data, ats_score))
+            elif keep_results:
+                results.append({"filename": filename, "parsed_data": parsed_data, "ats_score": ats_score})
+    except (ValueError, BadHttpMessage):
+        # BadHttpMessage: a part with headers that do not parse
+        with flask_context(request):
+            return to_aiohttp((jsonify({"error": "Malformed multipart upload"}), 400))
+
+    with flask_context(request):
+        if not received_file:
+            return to_aiohttp((jsonify({"error": "No file uploaded"}), 400))
+        if len(shed_waits) == files:
+            # Nothing was parsed, so the whole request is answered as shed
+            response = jsonify({"error": "Server is busy, retry later"})
+            response.headers["Retry-After"] = str(max(shed_waits))
+            return to_aiohttp((response, 503))
+        # With a summary the response is an object; without one it stays a plain list of results
+        if summary is not None:
+            body = {"summary": summary.to_dict()}
+            if keep_results:
+                body["results"] = results
+        else:
+            body = results
+        return to_aiohttp(jsonify(body))
+
+# Response chunks a forwarded Flask response may produce ahead of the client
+FORWARD_QUEUE_CHUNKS = 8
+
+class RequestBodyReader(io.RawIOBase):
+    """
+    The body of an aiohttp request as a blocking stream, for a WSGI app
+    running in a thread: each read waits for the event loop to receive
+    the bytes.
+    """
+    
+    def __init__(self, content, loop):
+        self.content = content
+        self.loop = loop
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        data = asyncio.run_coroutine_threadsafe(self.content.read(len(buffer)), self.loop).result()
+        buffer[:len(data)] = data
+        return len(data)
+
+def wsgi_environ(request, body):
+    """A WSGI environ for an aiohttp request, reading its body from `body`."""
+    path, _, query_string = request.raw_path.partition("?")
+    host, _, port = request.host.partition(":")
+    environ = {
+        "REQUEST_METHOD": request.method,
+        "SCRIPT_NAME": "",
+        # WSGI carries the undecoded path bytes as latin-1
+        "PATH_INFO": unquote_to_bytes(path).decode("latin-1"),
+        "QUERY_STRING": query_string,
+        "SERVER_NAME": host,
+        "SERVER_PORT": port or ("443" if request.secure else "80"),
+        "SERVER_PROTOCOL": f"HTTP/{request.version.major}.{request.version.minor}",
+        "REMOTE_ADDR": request.remote or "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": request.scheme,
+        "wsgi.input": body,
+        # aiohttp ends the body itself, chunked or not, so the app may read it to the end
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False
+    }
+    for key, value in request.headers.items():
+        name = key.upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+def run_flask(environ, loop, chunks, abandoned):
+    """
+    Call the Flask app and feed the status, headers and body chunks of its
+    response to the event loop through `chunks`, a bounded queue, so a slow
+    client holds back the app rather than memory. Runs in a thread.
+    """
+    def put(item):
+        asyncio.run_coroutine_threadsafe(chunks.put(item), loop).result()
+    
+    def start_response(status, headers, exc_info=None):
+        put(("start", int(status.split()[0]), headers))
+    
+    try:
+        body = app.wsgi_app(environ, start_response)
+        try:
+            for chunk in body:
+                if abandoned.is_set():
+                    break
+                if chunk:
+                    put(("data", chunk))
+        finally:
+            # Runs the teardown hooks, e.g. releasing the admission reservation
+            if hasattr(body, "close"):
+                body.close()
+        if not abandoned.is_set():
+            put(("end", None))
+    except BaseException as e:
+        if not abandoned.is_set():
+            put(("error", e))
+
+async def forward_to_flask(request):
+    """Serve any other route with the Flask app, streaming the body both ways."""
+    loop = asyncio.get_running_loop()
+    environ = wsgi_environ(request, io.BufferedReader(RequestBodyReader(request.content, loop), UPLOAD_READ_CHUNK_SIZE))
+    chunks = asyncio.Queue(FORWARD_QUEUE_CHUNKS)
+    abandoned = threading.Event()
+    worker = loop.run_in_executor(None, run_flask, environ, loop, chunks, abandoned)
+    try:
+        start = await chunks.get()
+        if start[0] == "error":
+            raise start[1]
+        _, status, headers = start
+        response = web.StreamResponse(status=status, headers=forwarded_headers(headers))
+        length = dict((key.lower(), value) for key, value in headers).get("content-length")
+        if length is not None:
+            response.content_length = int(length)
+        await response.prepare(request)
+        while True:
+            kind, value = await chunks.get()
+            if kind == "end":
+                break
+            if kind == "error":
+                raise value
+            await response.write(value)
+        await response.write_eof()
+        return response
+    finally:
+        # If the client went away, let the app stop and unblock its pending put
+        abandoned.set()
+        while not chunks.empty():
+            chunks.get_nowait()
+        await asyncio.shield(worker)
+
+def create_app():
+    application = web.Application()
+    application.router.add_post("/upload", upload_resume)
+    application.router.add_post("/", upload_resume)
+    application.router.add_route("*", "/{path:.*}", forward_to_flask)
+    return application
+
+application = create_app()
+
+if __name__ == "__main__":
+    web.run_app(application, port=5000)
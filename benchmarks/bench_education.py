@@ -0,0 +1,92 @@
+"""
+Benchmark extract_education on the text fixtures against a git revision.
+
+Usage:
+    python benchmarks/bench_education.py --baseline REV [--iterations N]
+
+The working tree and the baseline revision are each measured in their own
+interpreter, so both versions of app.py can be imported as "app" without
+clashing. There is no default baseline: compare against the commit before
+the change being measured (for the single-pass parser, the commit before
+it), since HEAD against an unchanged tree always comes out at 1.0x.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+
+def load_fixtures():
+    """Read every .txt fixture as {name: text}."""
+    fixtures = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith(".txt"):
+            with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+                fixtures[name] = f.read()
+    return fixtures
+
+def measure(tree, iterations):
+    """Time extract_education from the app.py in `tree` and print the results as JSON."""
+    sys.path.insert(0, tree)
+    os.chdir(tree)
+    import app
+
+    results = {}
+    for name, text in load_fixtures().items():
+        entries = app.extract_education(text)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            app.extract_education(text)
+        elapsed = time.perf_counter() - start
+        results[name] = {"us": elapsed / iterations * 1e6, "entries": entries}
+    print(json.dumps(results))
+
+def run_measurement(tree, iterations):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--measure", tree, "--iterations", str(iterations)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def export_revision(revision, target):
+    """Check out `revision` of the repository into the `target` directory."""
+    archive = subprocess.run(["git", "-C", REPO_DIR, "archive", revision], check=True, capture_output=True).stdout
+    subprocess.run(["tar", "-x", "-C", target], input=archive, check=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", help="git revision to compare against (required)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.iterations)
+        return
+    if args.baseline is None:
+        parser.error("--baseline is required")
+
+    with tempfile.TemporaryDirectory() as baseline_tree:
+        export_revision(args.baseline, baseline_tree)
+        baseline = run_measurement(baseline_tree, args.iterations)
+    current = run_measurement(REPO_DIR, args.iterations)
+
+    print(f"{'fixture':32} {'baseline us':>12} {'current us':>12} {'speedup':>8} {'entries':>9}")
+    for name in current:
+        before, after = baseline[name], current[name]
+        entries = f"{len(before['entries'])}->{len(after['entries'])}"
+        print(f"{name:32} {before['us']:12.1f} {after['us']:12.1f} {before['us'] / after['us']:7.2f}x {entries:>9}")
+
+    total_before = sum(result["us"] for result in baseline.values())
+    total_after = sum(result["us"] for result in current.values())
+    print(f"{'per resume (mean)':32} {total_before / len(baseline):12.1f} {total_after / len(current):12.1f} "
+          f"{total_before / total_after:7.2f}x")
+
+if __name__ == "__main__":
+    main()
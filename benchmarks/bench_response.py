@@ -0,0 +1,80 @@
+"""
+Benchmark /upload response encoding: bytes on the wire and encoding time.
+
+Usage:
+    python benchmarks/bench_response.py [--files 200] [--iterations 5] [--level 6]
+
+A batch response is built from the text fixtures, repeated until it holds
+--files results, and then encoded in both response profiles (full and
+compact) with each content coding (identity, gzip, deflate). Serialisation
+uses the app's own JSON provider, so the timings match what jsonify does in
+a request, and compression uses the same function as the after_request hook.
+The fixtures repeat within the batch, which flatters the compression ratios;
+treat them as an upper bound and the uncompressed sizes as exact.
+"""
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+
+def build_batch(app_module, files):
+    """Parse and score the fixtures, cycling through them until there are `files` results."""
+    parsed = []
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith(".txt"):
+            with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+                text = f.read()
+            filename = name.replace(".txt", ".pdf")
+            parsed_data = app_module.parse_resume(text, filename)
+            parsed.append((filename, parsed_data, app_module.generate_ats_score(parsed_data)))
+    return [parsed[i % len(parsed)] for i in range(files)]
+
+def time_call(function, iterations):
+    """Mean seconds per call, and the result of the last call."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = function()
+    return (time.perf_counter() - start) / iterations, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200, help="results in the batch response")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--level", type=int, default=6, help="compression level")
+    args = parser.parse_args()
+
+    sys.path.insert(0, REPO_DIR)
+    import app
+
+    batch = build_batch(app, args.files)
+    profiles = {
+        "full": [
+            {"filename": filename, "parsed_data": parsed_data, "ats_score": ats_score}
+            for filename, parsed_data, ats_score in batch
+        ],
+        "compact": [app.compact_result(*result) for result in batch]
+    }
+
+    print(f"{args.files} results per response, compression level {args.level}")
+    print(f"{'profile':8} {'encoding':9} {'bytes':>11} {'vs full':>8} {'json ms':>9} {'compress ms':>12} {'total ms':>9}")
+    baseline = None
+    for profile, results in profiles.items():
+        json_seconds, body = time_call(lambda: app.app.json.dumps(results).encode("utf-8"), args.iterations)
+        baseline = baseline or len(body)
+        for encoding in ("identity", "gzip", "deflate"):
+            if encoding == "identity":
+                compress_seconds, encoded = 0, body
+            else:
+                compress_seconds, encoded = time_call(
+                    lambda: app.compress_body(body, encoding, args.level), args.iterations
+                )
+            print(f"{profile:8} {encoding:9} {len(encoded):11,d} {len(encoded) / baseline:7.1%} "
+                  f"{json_seconds * 1000:9.2f} {compress_seconds * 1000:12.2f} "
+                  f"{(json_seconds + compress_seconds) * 1000:9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Check the cold-start budget: importing app.py plus serving the first request.
+
+Usage:
+    python benchmarks/check_cold_start.py [--budget-ms 300] [--runs 5]
+
+Each run starts a fresh interpreter, imports Flask and flask_cors, then
+imports app, checks that the heavy optional modules (pymupdf, phonenumbers)
+were not imported eagerly, and then posts one resume to /upload through the
+Flask test client. The median of the runs is compared with the budget; the
+script exits with status 1 if it is exceeded, so it can gate CI.
+
+The budget covers the app's import and its first request, which pays for
+the lazy imports and the first compile of the extraction patterns. The
+Flask and flask_cors import is timed and printed but left out of it: the
+routes are registered on the Flask app when app.py is imported, so the
+framework cannot be imported lazily, and its cost (about 150-250 ms on a
+small VM) depends on the installed Flask, not on this code.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FIXTURE = os.path.join(BENCH_DIR, "fixtures", "software_engineer.txt")
+
+# Modules that must only be imported once a request needs them
+LAZY_MODULES = ["fitz", "pymupdf", "phonenumbers"]
+
+MEASURE = """
+import io, json, sys, time
+start = time.perf_counter()
+import flask, flask_cors
+framework = time.perf_counter()
+sys.path.insert(0, {repo!r})
+import app
+imported = time.perf_counter()
+eager = [name for name in {lazy!r} if name in sys.modules]
+with open({pdf!r}, "rb") as f:
+    data = f.read()
+response = app.app.test_client().post(
+    "/upload", data={{"file": (io.BytesIO(data), "software_engineer.pdf")}}, content_type="multipart/form-data"
+)
+done = time.perf_counter()
+print(json.dumps({{"framework_ms": (framework - start) * 1000, "import_ms": (imported - framework) * 1000,
+                  "request_ms": (done - imported) * 1000, "status": response.status_code, "eager": eager}}))
+"""
+
+def build_fixture_pdf(path):
+    """Render the text fixture into a PDF (in this process, so the child starts cold)."""
+    import pymupdf
+
+    with open(FIXTURE, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    doc = pymupdf.open()
+    page = doc.new_page()
+    y = 50
+    for line in lines:
+        if y > 800:
+            page = doc.new_page()
+            y = 50
+        page.insert_text((50, y), line, fontsize=10)
+        y += 14
+    doc.save(path)
+    doc.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=300,
+                        help="budget for importing app plus the first request, without the Flask import")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        pdf_path = os.path.join(workdir, "software_engineer.pdf")
+        build_fixture_pdf(pdf_path)
+        script = MEASURE.format(repo=REPO_DIR, lazy=LAZY_MODULES, pdf=pdf_path)
+
+        runs = []
+        for _ in range(args.runs):
+            output = subprocess.run([sys.executable, "-c", script], cwd=workdir, check=True,
+                                    capture_output=True, text=True).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    framework_ms = statistics.median(run["framework_ms"] for run in runs)
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    request_ms = statistics.median(run["request_ms"] for run in runs)
+    eager = sorted({name for run in runs for name in run["eager"]})
+    failed_requests = [run["status"] for run in runs if run["status"] != 200]
+
+    cold_start_ms = statistics.median(run["import_ms"] + run["request_ms"] for run in runs)
+
+    print(f"import flask, flask_cors:   {framework_ms:7.1f} ms (not budgeted)")
+    print(f"import app:                 {import_ms:7.1f} ms")
+    print(f"first request:              {request_ms:7.1f} ms")
+    print(f"import app + first request: {cold_start_ms:7.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    problems = []
+    if eager:
+        problems.append(f"imported eagerly: {', '.join(eager)}")
+    if failed_requests:
+        problems.append(f"first request failed with status {failed_requests[0]}")
+    if cold_start_ms > args.budget_ms:
+        problems.append("cold-start budget exceeded")
+
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
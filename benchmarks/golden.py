@@ -0,0 +1,202 @@
+"""
+Golden-corpus harness: check that optimised extractors still produce the same output.
+
+Usage:
+    python benchmarks/golden.py record [--revision REV] [--golden FILE] [--pdf-dir DIR]
+    python benchmarks/golden.py compare [--baseline REV] [--golden FILE] [--pdf-dir DIR]
+                                        [--iterations N] [--show N]
+
+`record` runs the six extractors (extract_contact_details, extract_education,
+extract_experience, extract_skills, extract_projects, extract_certifications)
+and generate_ats_score over the text fixtures, plus the PDFs in --pdf-dir if
+given, and writes their outputs and timings to the golden file (by default
+benchmarks/golden/golden.json). Without --revision the working tree is
+recorded.
+
+`compare` runs the working tree over the same documents and diffs every
+output against the golden file field by field, next to the speedup of each
+extractor. The speedup is measured against --baseline (a git revision,
+measured in the same run so both sides see the same machine) or, without
+it, against the timings stored in the golden file. The exit status is 1 if
+any output diverges, so the harness can gate CI.
+
+Each tree is measured in its own interpreter, as in bench_education.py.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+DEFAULT_GOLDEN = os.path.join(BENCH_DIR, "golden", "golden.json")
+
+EXTRACTORS = [
+    "extract_contact_details", "extract_education", "extract_experience",
+    "extract_skills", "extract_projects", "extract_certifications"
+]
+# Fields whose order carries no meaning (extract_skills collects a set)
+UNORDERED = {"extract_skills"}
+
+def load_documents(app, pdf_dir):
+    """Read the text fixtures and, if given, the text of the PDFs in pdf_dir, as {name: text}."""
+    documents = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith(".txt"):
+            with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+                documents[name] = f.read()
+    if pdf_dir:
+        for name in sorted(os.listdir(pdf_dir)):
+            if name.lower().endswith(".pdf"):
+                documents[name] = app.extract_text_from_pdf(os.path.join(pdf_dir, name))
+    return documents
+
+def run_extractor(app, name, text, filename):
+    if name == "extract_contact_details":
+        return getattr(app, name)(text, filename)
+    return getattr(app, name)(text)
+
+def measure(tree, iterations, pdf_dir):
+    """Run every extractor in `tree` over the documents and print outputs and timings as JSON."""
+    sys.path.insert(0, tree)
+    os.chdir(tree)
+    import app
+
+    results = {}
+    for name, text in load_documents(app, pdf_dir).items():
+        filename = os.path.splitext(name)[0] + ".pdf"
+        outputs = {}
+        timings = {}
+        for extractor in EXTRACTORS:
+            outputs[extractor] = run_extractor(app, extractor, text, filename)
+            start = time.perf_counter()
+            for _ in range(iterations):
+                run_extractor(app, extractor, text, filename)
+            timings[extractor] = (time.perf_counter() - start) / iterations * 1e6
+
+        parsed_data = {
+            "contact_details": outputs["extract_contact_details"],
+            "education": outputs["extract_education"],
+            "experience": outputs["extract_experience"],
+            "skills": outputs["extract_skills"],
+            "projects": outputs["extract_projects"],
+            "certifications": outputs["extract_certifications"]
+        }
+        outputs["generate_ats_score"] = app.generate_ats_score(parsed_data)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            app.generate_ats_score(parsed_data)
+        timings["generate_ats_score"] = (time.perf_counter() - start) / iterations * 1e6
+
+        for extractor in UNORDERED:
+            outputs[extractor] = sorted(outputs[extractor])
+        results[name] = {"outputs": outputs, "us": timings}
+    print(json.dumps(results))
+
+def run_measurement(tree, iterations, pdf_dir):
+    command = [sys.executable, os.path.abspath(__file__), "measure", "--tree", tree, "--iterations", str(iterations)]
+    if pdf_dir:
+        command += ["--pdf-dir", os.path.abspath(pdf_dir)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def export_revision(revision, target):
+    """Check out `revision` of the repository into the `target` directory."""
+    archive = subprocess.run(["git", "-C", REPO_DIR, "archive", revision], check=True, capture_output=True).stdout
+    subprocess.run(["tar", "-x", "-C", target], input=archive, check=True)
+
+def measure_revision(revision, iterations, pdf_dir):
+    with tempfile.TemporaryDirectory() as tree:
+        export_revision(revision, tree)
+        return run_measurement(tree, iterations, pdf_dir)
+
+def diff(expected, actual, path=""):
+    """Yield (path, expected, actual) for every field where the two values differ."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in sorted(set(expected) | set(actual), key=str):
+            yield from diff(expected.get(key, "<missing>"), actual.get(key, "<missing>"), f"{path}.{key}")
+    elif isinstance(expected, list) and isinstance(actual, list):
+        for index in range(max(len(expected), len(actual))):
+            yield from diff(expected[index] if index < len(expected) else "<missing>",
+                            actual[index] if index < len(actual) else "<missing>", f"{path}[{index}]")
+    elif expected != actual:
+        yield path, expected, actual
+
+def shorten(value, width=70):
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+def record(args):
+    if args.revision:
+        results = measure_revision(args.revision, args.iterations, args.pdf_dir)
+    else:
+        results = run_measurement(REPO_DIR, args.iterations, args.pdf_dir)
+    revision = args.revision or "working tree"
+    os.makedirs(os.path.dirname(os.path.abspath(args.golden)), exist_ok=True)
+    with open(args.golden, "w", encoding="utf-8") as f:
+        json.dump({"revision": revision, "documents": results}, f, indent=1, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+    print(f"Recorded {len(results)} documents from {revision} to {args.golden}")
+
+def compare(args):
+    with open(args.golden, encoding="utf-8") as f:
+        golden = json.load(f)["documents"]
+    current = run_measurement(REPO_DIR, args.iterations, args.pdf_dir)
+    baseline = measure_revision(args.baseline, args.iterations, args.pdf_dir) if args.baseline else golden
+
+    missing = sorted(set(golden) - set(current))
+    if missing:
+        print(f"Not in the current run (check --pdf-dir): {', '.join(missing)}")
+
+    divergences = {}
+    for name in sorted(set(golden) & set(current)):
+        for field in golden[name]["outputs"]:
+            for path, expected, actual in diff(golden[name]["outputs"][field], current[name]["outputs"].get(field)):
+                divergences.setdefault(field, []).append((name, path, expected, actual))
+
+    names = sorted(set(golden) & set(current) & set(baseline))
+    print(f"{'extractor':26} {'baseline us':>12} {'current us':>12} {'speedup':>8} {'diverging docs':>15}")
+    for field in EXTRACTORS + ["generate_ats_score"]:
+        before = sum(baseline[name]["us"][field] for name in names) / len(names)
+        after = sum(current[name]["us"][field] for name in names) / len(names)
+        documents = len({name for name, *_ in divergences.get(field, [])})
+        print(f"{field:26} {before:12.1f} {after:12.1f} {before / after:7.2f}x {documents:>8}/{len(names)}")
+
+    for field, rows in divergences.items():
+        print(f"\n{field}: {len(rows)} diverging fields")
+        for name, path, expected, actual in rows[:args.show]:
+            print(f"  {name}: {path.lstrip('.') or '(whole output)'}")
+            print(f"    golden:  {shorten(expected)}")
+            print(f"    current: {shorten(actual)}")
+        if len(rows) > args.show:
+            print(f"  ... {len(rows) - args.show} more")
+
+    if divergences:
+        sys.exit(1)
+    print("\nOutputs match the golden corpus")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["record", "compare", "measure"])
+    parser.add_argument("--golden", default=DEFAULT_GOLDEN, help="golden file to write or compare against")
+    parser.add_argument("--revision", help="git revision to record instead of the working tree")
+    parser.add_argument("--baseline", help="git revision to measure the speedup against")
+    parser.add_argument("--pdf-dir", help="also run over the PDFs in this directory")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--show", type=int, default=10, help="diverging fields to print per extractor")
+    parser.add_argument("--tree", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.command == "measure":
+        measure(args.tree, args.iterations, args.pdf_dir)
+    elif args.command == "record":
+        record(args)
+    else:
+        compare(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Load test /upload at rising concurrency and batch sizes.
+
+Usage:
+    python benchmarks/loadtest.py --corpus DIR [--workers 4] [--concurrency 1,2,4,8,16]
+                                  [--batch-sizes 1,5] [--duration 20] [--output run.json]
+    python benchmarks/loadtest.py --compare base.json candidate.json
+
+By default a gunicorn server is started on a free local port with the given
+number of workers, threaded as set in gunicorn.conf.py, and its worker
+processes are sampled for CPU time.
+Use --url to target a server that is already running instead (worker CPU is
+then only reported if --server-pid is given).
+
+The corpus is replayed, so the same bytes are uploaded over and over. The
+server started here runs with the result store and the page cache turned
+off (RESULT_STORE_SIZE=0, PAGE_CACHE_SIZE=0, no RESULT_STORE_DIR) so that
+every request is decoded and parsed; with them on, almost every measured
+request would be a cache hit. Start a --url server the same way unless
+cache-hit throughput is what is being measured.
+
+Each level (concurrency x batch size) replays the PDFs in the corpus
+round-robin for --duration seconds and reports throughput, p50/p95/p99
+latency, error rate and per-worker CPU. The JSON written by --output holds
+one row per level, so two builds can be compared as saturation curves with
+--compare.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+def load_corpus(corpus_dir):
+    """Read every PDF in the corpus directory as (filename, bytes)."""
+    corpus = []
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.lower().endswith(".pdf"):
+            with open(os.path.join(corpus_dir, name), "rb") as f:
+                corpus.append((name, f.read()))
+    if not corpus:
+        sys.exit(f"No PDFs found in {corpus_dir}")
+    return corpus
+
+def encode_multipart(files):
+    """Encode (filename, bytes) pairs as a multipart body of "file" fields."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for filename, data in files:
+        parts.append(
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n".encode("utf-8") + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+def build_batches(corpus, batch_size):
+    """Pre-encode request bodies so the client spends its time waiting on the server."""
+    batches = []
+    for start in range(len(corpus)):
+        files = [corpus[(start + i) % len(corpus)] for i in range(batch_size)]
+        batches.append(encode_multipart(files))
+    return batches
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+def child_pids(pid):
+    """Direct children of a process, read from /proc."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+def cpu_seconds(pid):
+    """User plus system CPU time of a process, or None if it has exited."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+def worker_cpu_snapshot(server_pid):
+    if server_pid is None:
+        return {}
+    pids = child_pids(server_pid) or [server_pid]
+    return {pid: cpu_seconds(pid) for pid in pids}
+
+def run_level(url, batches, concurrency, duration):
+    """Drive the server with `concurrency` clients for `duration` seconds."""
+    target = urlsplit(url)
+    path = (target.path or "/upload") + (f"?{target.query}" if target.query else "")
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(client_id):
+        connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=300)
+        request_number = client_id
+        while time.perf_counter() < deadline:
+            body, content_type = batches[request_number % len(batches)]
+            request_number += concurrency
+            start = time.perf_counter()
+            try:
+                connection.request("POST", path, body=body, headers={"Content-Type": content_type})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=300)
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(status)
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not start listening on {host}:{port}")
+
+def start_server(workers):
+    """Start gunicorn on a free local port. Returns (process, url)."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    # Replayed uploads would otherwise be answered from the caches
+    env = dict(os.environ, RESULT_STORE_SIZE="0", PAGE_CACHE_SIZE="0")
+    env.pop("RESULT_STORE_DIR", None)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "-b", f"127.0.0.1:{port}",
+         "--timeout", "300", "app:app"],
+        cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    wait_for_port("127.0.0.1", port)
+    # Give the workers a moment to boot after the master starts listening
+    time.sleep(1)
+    return process, f"http://127.0.0.1:{port}/upload"
+
+def run(args):
+    corpus = load_corpus(args.corpus)
+    server = None
+    server_pid = args.server_pid
+    url = args.url
+    if url is None:
+        server, url = start_server(args.workers)
+        server_pid = server.pid
+
+    rows = []
+    try:
+        for batch_size in args.batch_sizes:
+            batches = build_batches(corpus, batch_size)
+            # Warm every worker up before measuring
+            run_level(url, batches, max(args.concurrency), 1)
+            for concurrency in args.concurrency:
+                cpu_before = worker_cpu_snapshot(server_pid)
+                latencies, errors, elapsed = run_level(url, batches, concurrency, args.duration)
+                cpu_after = worker_cpu_snapshot(server_pid)
+
+                latencies.sort()
+                requests_done = len(latencies) + len(errors)
+                worker_cpu = [
+                    round((cpu_after[pid] - cpu_before[pid]) / elapsed * 100, 1)
+                    for pid in cpu_after
+                    if cpu_before.get(pid) is not None and cpu_after[pid] is not None
+                ]
+                row = {
+                    "batch_size": batch_size,
+                    "concurrency": concurrency,
+                    "requests": requests_done,
+                    "requests_per_s": round(len(latencies) / elapsed, 2),
+                    "files_per_s": round(len(latencies) * batch_size / elapsed, 2),
+                    "p50_ms": round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+                    "p95_ms": round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+                    "p99_ms": round(percentile(latencies, 0.99) * 1000, 1) if latencies else None,
+                    "error_rate": round(len(errors) / requests_done, 4) if requests_done else 0,
+                    "errors": sorted({str(error) for error in errors}),
+                    "worker_cpu_percent": worker_cpu
+                }
+                rows.append(row)
+                print_row(row)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"url": url, "workers": args.workers, "corpus_files": len(corpus), "levels": rows}, f, indent=2)
+        print(f"Wrote {args.output}")
+
+def print_row(row):
+    if not getattr(print_row, "header_printed", False):
+        print(f"{'batch':>5} {'conc':>5} {'req/s':>8} {'files/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+              f"{'p99 ms':>9} {'errors':>7}  worker cpu %")
+        print_row.header_printed = True
+    p50, p95, p99 = (f"{row[key]:9.1f}" if row[key] is not None else f"{'-':>9}" for key in ("p50_ms", "p95_ms", "p99_ms"))
+    print(f"{row['batch_size']:5d} {row['concurrency']:5d} {row['requests_per_s']:8.2f} {row['files_per_s']:8.2f} "
+          f"{p50} {p95} {p99} {row['error_rate']:7.2%}  {row['worker_cpu_percent']}")
+
+def compare(base_path, candidate_path):
+    """Print two runs side by side, level by level."""
+    with open(base_path) as f:
+        base = {(row["batch_size"], row["concurrency"]): row for row in json.load(f)["levels"]}
+    with open(candidate_path) as f:
+        candidate = {(row["batch_size"], row["concurrency"]): row for row in json.load(f)["levels"]}
+
+    print(f"{'batch':>5} {'conc':>5} {'files/s base':>13} {'files/s new':>12} {'p95 base':>9} {'p95 new':>9} "
+          f"{'p99 base':>9} {'p99 new':>9}")
+    for key in sorted(set(base) & set(candidate)):
+        before, after = base[key], candidate[key]
+        print(f"{key[0]:5d} {key[1]:5d} {before['files_per_s']:13.2f} {after['files_per_s']:12.2f} "
+              f"{before['p95_ms'] or 0:9.1f} {after['p95_ms'] or 0:9.1f} "
+              f"{before['p99_ms'] or 0:9.1f} {after['p99_ms'] or 0:9.1f}")
+
+def int_list(value):
+    return [int(item) for item in value.split(",") if item]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="directory of PDFs to replay")
+    parser.add_argument("--url", help="target an already running server, e.g. http://127.0.0.1:5000/upload")
+    parser.add_argument("--server-pid", type=int, help="pid of the server master, for worker CPU with --url")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers when starting a server")
+    parser.add_argument("--concurrency", type=int_list, default=[1, 2, 4, 8, 16])
+    parser.add_argument("--batch-sizes", type=int_list, default=[1, 5])
+    parser.add_argument("--duration", type=float, default=20, help="seconds per level")
+    parser.add_argument("--output", help="write the levels as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "CANDIDATE"), help="compare two --output files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    elif args.corpus:
+        run(args)
+    else:
+        parser.error("--corpus is required unless --compare is given")
+
+if __name__ == "__main__":
+    main()
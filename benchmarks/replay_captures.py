@@ -0,0 +1,85 @@
+"""
+Replay slow-document captures through the extractors under a profiler.
+
+Usage:
+    python benchmarks/replay_captures.py [CAPTURE ...] [--dir captures] [--repeat 5]
+                                         [--sort cumulative] [--limit 25] [--output stats.prof]
+
+The upload endpoint writes a capture for every document that takes longer
+than SLOW_DOC_THRESHOLD_MS to parse (see app.py). Each capture holds the
+extracted text, the sections found by the layout pass and the timing
+breakdown recorded in production. This command runs parse_resume and
+generate_ats_score over the captures again, prints the recorded and the
+replayed per-stage timings side by side, and then prints the cProfile
+statistics of the replay. Use --output to keep the raw statistics for
+snakeviz or pstats.
+"""
+import argparse
+import cProfile
+import glob
+import json
+import os
+import pstats
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+
+def load_captures(paths):
+    captures = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            captures.append(json.load(f))
+    return captures
+
+def replay(app_module, capture):
+    """Parse a captured document once and return its per-stage timings."""
+    timings = {}
+    parsed_data = app_module.parse_resume(capture["text"], capture["filename"], capture["sections"], timings)
+    start = time.perf_counter()
+    app_module.generate_ats_score(parsed_data)
+    timings["ats_score"] = (time.perf_counter() - start) * 1000
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="*", help="capture files (default: every capture in --dir)")
+    parser.add_argument("--dir", default=os.path.join(REPO_DIR, "captures"), help="capture directory")
+    parser.add_argument("--repeat", type=int, default=5, help="times to parse each capture")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key")
+    parser.add_argument("--limit", type=int, default=25, help="number of profile rows to print")
+    parser.add_argument("--output", help="write the raw profile statistics to this file")
+    args = parser.parse_args()
+
+    paths = args.captures or sorted(glob.glob(os.path.join(args.dir, "*.json")))
+    if not paths:
+        sys.exit(f"No captures found in {args.dir}")
+
+    sys.path.insert(0, REPO_DIR)
+    import app
+
+    captures = load_captures(paths)
+    profiler = cProfile.Profile()
+    print(f"{'capture':16} {'stage':20} {'recorded ms':>12} {'replayed ms':>12}")
+    for capture in captures:
+        # One unprofiled pass so the replayed timings are comparable with production
+        replayed = replay(app, capture)
+        profiler.enable()
+        for _ in range(args.repeat):
+            replay(app, capture)
+        profiler.disable()
+
+        for stage, recorded in sorted(capture["timings_ms"].items(), key=lambda item: -item[1]):
+            after = f"{replayed[stage]:12.2f}" if stage in replayed else f"{'-':>12}"
+            print(f"{capture['digest'][:16]:16} {stage:20} {recorded:12.2f} {after}")
+
+    print()
+    stats = pstats.Stats(profiler)
+    stats.sort_stats(args.sort).print_stats(args.limit)
+    if args.output:
+        stats.dump_stats(args.output)
+        print(f"Wrote {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Soak test: parse thousands of documents in one process and check that memory
+and handle counts level off.
+
+Usage:
+    python benchmarks/soak.py [--documents 5000] [--window 250] [--warmup 0.2]
+                              [--mode text] [--cache-size 64] [--tracemalloc]
+                              [--max-rss-growth-mb 16] [--max-traced-growth-mb 4]
+
+Every document is a distinct PDF, built from a text fixture with a unique
+reference line and a unique filename, and goes through analyze_pdf as an
+upload would, so the page cache, the result store and the tenure index see
+a new document each time. All three are shrunk to --cache-size entries so
+they are full by the end of the warmup; after that nothing should keep
+growing.
+
+Every --window documents the process RSS, open file descriptors, PDF
+documents left open (see DocumentCounter in app.py) and, with
+--tracemalloc, the bytes traced by tracemalloc are sampled after a full
+garbage collection; RSS leaves out tracemalloc's own memory. The last
+window is compared with the first one after the warmup; the exit status is
+1 if RSS or traced memory grew by more than the allowed amount, if file
+descriptors grew, if any document was left open or if the tenure index
+holds more than --cache-size candidates. With --tracemalloc the allocation
+sites that grew the most are printed too, which points at what is retained.
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+MB = 1024 * 1024
+
+def load_fixtures():
+    fixtures = []
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith(".txt"):
+            with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+                fixtures.append((os.path.splitext(name)[0] + ".pdf", f.read()))
+    return fixtures
+
+def build_pdf(text, reference):
+    """Lay the text out on as many pages as it needs, with a unique reference line first."""
+    import fitz
+
+    lines = [f"Reference {reference}"] + text.splitlines()
+    doc = fitz.open()
+    try:
+        for start in range(0, len(lines), 50):
+            page = doc.new_page()
+            page.insert_text((50, 60), "\n".join(lines[start:start + 50]), fontsize=10)
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+def sample(app_module, processed):
+    gc.collect()
+    return {
+        "documents": processed,
+        # tracemalloc's own tables are not the application's memory
+        "rss": rss_bytes() - (tracemalloc.get_tracemalloc_memory() if tracemalloc.is_tracing() else 0),
+        "fds": len(os.listdir("/proc/self/fd")),
+        "open_documents": app_module.open_documents.snapshot()["open"],
+        "traced": tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    }
+
+def print_sample(row, elapsed):
+    traced = f"{row['traced'] / MB:11.2f}" if row["traced"] is not None else f"{'-':>11}"
+    print(f"{row['documents']:>9} {row['rss'] / MB:9.1f} {traced} {row['fds']:>5} "
+          f"{row['open_documents']:>9} {elapsed:9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--window", type=int, default=250, help="documents between samples")
+    parser.add_argument("--warmup", type=float, default=0.2, help="fraction of the documents to warm up with")
+    parser.add_argument("--mode", default="text", help="extraction mode, as for /upload")
+    parser.add_argument("--cache-size", type=int, default=64,
+                        help="page cache, result store and tenure index entries")
+    parser.add_argument("--tracemalloc", action="store_true", help="also trace allocations (much slower)")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=16)
+    parser.add_argument("--max-traced-growth-mb", type=float, default=4)
+    args = parser.parse_args()
+
+    # The app reads its configuration at import time
+    os.environ["PAGE_CACHE_SIZE"] = str(args.cache_size)
+    os.environ["RESULT_STORE_SIZE"] = str(args.cache_size)
+    os.environ["TENURE_INDEX_SIZE"] = str(args.cache_size)
+    os.environ.pop("RESULT_STORE_DIR", None)
+    os.environ.pop("TENURE_INDEX_PATH", None)
+    sys.path.insert(0, REPO_DIR)
+    import app
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    fixtures = load_fixtures()
+    warmup = max(args.window, int(args.documents * args.warmup) // args.window * args.window)
+
+    print(f"{'documents':>9} {'rss MB':>9} {'traced MB':>11} {'fds':>5} {'open docs':>9} {'seconds':>9}")
+    rows = []
+    baseline_snapshot = None
+    start = time.perf_counter()
+    for number in range(1, args.documents + 1):
+        name, text = fixtures[number % len(fixtures)]
+        filename = f"{os.path.splitext(name)[0]}-{number}.pdf"
+        app.analyze_pdf(filename, build_pdf(text, number), args.mode, "soak")
+        if number % args.window and number != args.documents:
+            continue
+        if number == warmup and args.tracemalloc:
+            # Taken before sampling, so the memory the snapshot holds is in the baseline
+            baseline_snapshot = tracemalloc.take_snapshot()
+        rows.append(sample(app, number))
+        print_sample(rows[-1], time.perf_counter() - start)
+
+    settled = [row for row in rows if row["documents"] >= warmup]
+    if len(settled) < 2:
+        sys.exit("Not enough samples after the warmup; use more --documents or a smaller --window")
+    first, last = settled[0], settled[-1]
+
+    failures = []
+    rss_growth = (last["rss"] - first["rss"]) / MB
+    if rss_growth > args.max_rss_growth_mb:
+        failures.append(f"RSS grew {rss_growth:.1f} MB after the warmup (limit {args.max_rss_growth_mb} MB)")
+    if last["fds"] > first["fds"]:
+        failures.append(f"Open file descriptors grew from {first['fds']} to {last['fds']}")
+    leaked = max(row["open_documents"] for row in rows)
+    if leaked:
+        failures.append(f"Up to {leaked} PDF documents were left open")
+    if len(app.tenure_index) > args.cache_size:
+        failures.append(f"The tenure index holds {len(app.tenure_index)} candidates (limit {args.cache_size})")
+    if args.tracemalloc:
+        traced_growth = (last["traced"] - first["traced"]) / MB
+        if traced_growth > args.max_traced_growth_mb:
+            failures.append(f"Traced memory grew {traced_growth:.2f} MB after the warmup "
+                            f"(limit {args.max_traced_growth_mb} MB)")
+        print(f"\nTop allocation growth since document {warmup}:")
+        for statistic in tracemalloc.take_snapshot().compare_to(baseline_snapshot, "lineno")[:10]:
+            print(f"  {statistic}")
+
+    print()
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print(f"Stable: RSS {rss_growth:+.1f} MB, file descriptors {last['fds'] - first['fds']:+d} "
+          f"over {last['documents'] - first['documents']} documents after the warmup")
+
+if __name__ == "__main__":
+    main()
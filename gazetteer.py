@@ -0,0 +1,169 @@
+"""
+Compact, memory-mapped gazetteer of place names.
+
+The gazetteer is a single read-only binary file holding a sorted string
+table of normalised place names and a table of region labels. It is opened
+with mmap, so every worker process shares the same pages through the OS
+page cache and only the pages touched by a lookup are ever read in. No
+Python object is built per place; lookups binary-search the file directly.
+
+File layout (all integers little-endian uint32):
+
+    magic            b"GZT1"
+    entry_count
+    region_count
+    max_words        longest place name, in words
+    name_offsets     entry_count + 1 offsets into the names blob
+    region_ids       entry_count region indexes, one per name
+    region_offsets   region_count + 1 offsets into the regions blob
+    names blob       UTF-8 names, sorted bytewise
+    regions blob     UTF-8 region labels, e.g. "Karnataka, India"
+
+Build a gazetteer from a tab-separated file with the columns
+name, region, country and (optionally) population:
+
+    python gazetteer.py build places.tsv places.gzt
+"""
+import mmap
+import re
+import struct
+import sys
+
+MAGIC = b"GZT1"
+HEADER = struct.Struct("<4sIII")
+UINT32 = struct.Struct("<I")
+
+def normalize_place(text):
+    """Lowercase a place name and collapse it to single-space separated words."""
+    return " ".join(re.findall(r"[^\W_]+", text.lower()))
+
+class Gazetteer:
+    """Read-only view over a gazetteer file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.entry_count, self.region_count, self.max_words = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a gazetteer file")
+
+        self._name_offsets = HEADER.size
+        self._region_ids = self._name_offsets + 4 * (self.entry_count + 1)
+        self._region_offsets = self._region_ids + 4 * self.entry_count
+        self._names = self._region_offsets + 4 * (self.region_count + 1)
+        self._regions = self._names + self._offset(self._name_offsets, self.entry_count)
+
+    def close(self):
+        self._map.close()
+
+    def __len__(self):
+        return self.entry_count
+
+    def _offset(self, table, index):
+        return UINT32.unpack_from(self._map, table + 4 * index)[0]
+
+    def _name(self, index):
+        start = self._names + self._offset(self._name_offsets, index)
+        end = self._names + self._offset(self._name_offsets, index + 1)
+        return self._map[start:end]
+
+    def _region(self, index):
+        region_id = self._offset(self._region_ids, index)
+        start = self._regions + self._offset(self._region_offsets, region_id)
+        end = self._regions + self._offset(self._region_offsets, region_id + 1)
+        return self._map[start:end].decode("utf-8")
+
+    def _lower_bound(self, key):
+        low, high = 0, self.entry_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def lookup(self, name):
+        """
+        Look up a place name.
+
+        Args:
+            name (str): Place name in any case
+
+        Returns:
+            str: The region label, or None if the name is not in the gazetteer
+        """
+        key = normalize_place(name).encode("utf-8")
+        index = self._lower_bound(key)
+        if index < self.entry_count and self._name(index) == key:
+            return self._region(index)
+        return None
+
+def build_gazetteer(rows, output_path):
+    """
+    Write a gazetteer file.
+
+    When a name occurs more than once, the row with the largest population
+    is kept (the first one if populations are equal or missing).
+
+    Args:
+        rows (iterable): (name, region label, population) tuples
+        output_path (str): Path of the gazetteer file to write
+
+    Returns:
+        int: Number of place names written
+    """
+    best = {}
+    for name, region, population in rows:
+        key = normalize_place(name)
+        if key and (key not in best or population > best[key][1]):
+            best[key] = (region, population)
+
+    names = sorted(key.encode("utf-8") for key in best)
+    regions = sorted({region for region, _ in best.values()})
+    region_index = {region: i for i, region in enumerate(regions)}
+    encoded_regions = [region.encode("utf-8") for region in regions]
+
+    def offsets(blobs):
+        result = [0]
+        for blob in blobs:
+            result.append(result[-1] + len(blob))
+        return result
+
+    max_words = max((name.count(b" ") + 1 for name in names), default=0)
+    with open(output_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, len(names), len(regions), max_words))
+        out.write(struct.pack(f"<{len(names) + 1}I", *offsets(names)))
+        out.write(struct.pack(f"<{len(names)}I", *(region_index[best[name.decode('utf-8')][0]] for name in names)))
+        out.write(struct.pack(f"<{len(regions) + 1}I", *offsets(encoded_regions)))
+        out.write(b"".join(names))
+        out.write(b"".join(encoded_regions))
+    return len(names)
+
+def read_places_tsv(path):
+    """Read name, region, country[, population] rows from a tab-separated file."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            columns = line.rstrip("\n").split("\t")
+            if len(columns) < 2 or line.startswith("#"):
+                continue
+            name, region = columns[0], columns[1]
+            country = columns[2] if len(columns) > 2 else ""
+            population = int(columns[3]) if len(columns) > 3 and columns[3].isdigit() else 0
+            label = f"{region}, {country}" if country else region
+            yield name, label, population
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "build":
+        count = build_gazetteer(read_places_tsv(sys.argv[2]), sys.argv[3])
+        print(f"Wrote {count} place names to {sys.argv[3]}")
+    elif len(sys.argv) == 4 and sys.argv[1] == "lookup":
+        # The same lookup the parser makes for each piece of a contact or address line
+        gazetteer = Gazetteer(sys.argv[2])
+        print(gazetteer.lookup(sys.argv[3]))
+    else:
+        print("Usage: python gazetteer.py build places.tsv places.gzt")
+        print("       python gazetteer.py lookup places.gzt \"place name\"")
+        sys.exit(1)
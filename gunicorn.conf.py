@@ -0,0 +1,30 @@
+"""
+Gunicorn settings for app:app, read automatically when gunicorn is started
+from this directory (gunicorn app:app).
+
+Admission control (MAX_INFLIGHT_PAGES, MAX_INFLIGHT_BYTES) and the lane
+scheduler only see the requests a worker has accepted. A sync worker
+accepts one request at a time, so everything else waits in the listen
+backlog where neither can see it: nothing is ever shed, and lanes have
+nothing to choose between. Threaded workers accept up to `threads`
+requests each, more than the PARSE_SLOTS parsing at once, so the queue
+forms inside the worker where it is measured, prioritised and shed.
+
+The asynchronous front end (async_app.py) uses its own worker class,
+given on the command line, which takes precedence over this file.
+"""
+import os
+
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+# Requests accepted per worker; those beyond PARSE_SLOTS wait in the lane scheduler
+threads = int(os.environ.get("GUNICORN_THREADS", 4 * int(os.environ.get("PARSE_SLOTS", 2))))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 300))
+
+def on_starting(server):
+    # Each worker keeps its own in-memory result store, so /check only finds
+    # the documents parsed by whichever worker answers it
+    store_on = int(os.environ.get("RESULT_STORE_SIZE", 4096)) > 0
+    if server.cfg.workers > 1 and store_on and not os.environ.get("RESULT_STORE_DIR"):
+        server.log.warning("RESULT_STORE_DIR is not set, so /check only knows the results of the worker "
+                           "that answers it; set it to a directory shared by all %d workers", server.cfg.workers)
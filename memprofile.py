@@ -0,0 +1,108 @@
+"""
+Allocation profiling with tracemalloc, for finding growth in long-running workers.
+
+While a MemoryProfile is enabled, tracemalloc traces every Python
+allocation. Each extractor call is measured by the bytes it left allocated
+(net) and the most it had allocated at once (peak), and each request by
+the bytes it left allocated and the source lines that allocated them,
+from a snapshot taken before and after the request.
+
+A worker whose memory is stable shows request net deltas around zero once
+its caches are warm; a line that keeps appearing at the top of the
+per-request sites with a positive size is where memory is retained.
+
+tracemalloc traces the whole process, so concurrent requests see each
+other's allocations. Profile with one request in flight at a time (one
+sync worker, or PARSE_SLOTS=1) for exact figures. Tracing makes every
+allocation several times slower and the snapshots cost tens of
+milliseconds, so this is a diagnostic mode, not something to leave on.
+"""
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+def format_site(statistic):
+    frame = statistic.traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+class MemoryProfile:
+    """
+    Per-stage and per-request allocation deltas.
+
+    Args:
+        frames (int): Frames of traceback stored per allocation
+        top (int): Allocation sites reported per request
+        history (int): Request reports kept for snapshot()
+    """
+
+    # Allocations made by tracemalloc itself and by this module are not the application's
+    IGNORED = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+
+    def __init__(self, frames=1, top=10, history=50):
+        self.frames = frames
+        self.top = top
+        self.stages = {}
+        self.requests = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self):
+        tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name):
+        """Measure the allocations of one stage (e.g. an extractor call)."""
+        if not tracemalloc.is_tracing():
+            yield
+            return
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                totals = self.stages.setdefault(name, {"calls": 0, "net_bytes": 0, "max_peak_bytes": 0})
+                totals["calls"] += 1
+                totals["net_bytes"] += current - before
+                totals["max_peak_bytes"] = max(totals["max_peak_bytes"], peak - before)
+
+    @contextmanager
+    def request(self, label):
+        """Measure the allocations of one request, down to the lines that made them."""
+        if not tracemalloc.is_tracing():
+            yield None
+            return
+        before = tracemalloc.take_snapshot().filter_traces(self.IGNORED)
+        report = {"request": label, "time": time.time()}
+        try:
+            yield report
+        finally:
+            after = tracemalloc.take_snapshot().filter_traces(self.IGNORED)
+            differences = after.compare_to(before, "lineno")
+            report["net_bytes"] = sum(statistic.size_diff for statistic in differences)
+            report["top"] = [
+                {"site": format_site(statistic), "size_diff": statistic.size_diff, "count_diff": statistic.count_diff}
+                for statistic in differences[:self.top] if statistic.size_diff
+            ]
+            with self._lock:
+                self.requests.append(report)
+
+    def snapshot(self):
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            return {
+                "traced_bytes": current,
+                "traced_peak_bytes": peak,
+                "stages": {name: dict(totals) for name, totals in self.stages.items()},
+                "requests": list(self.requests)
+            }